@@ -0,0 +1,206 @@
+"""Admission control for connector subprocesses.
+
+Every stdio process holds a ``Slot`` from the moment it is spawned until it
+exits. The controller caps live processes globally and per connector, lets a
+bounded number of callers wait for capacity, and paces spawns with a token
+bucket so reconnect bursts cannot fork hundreds of processes at once.
+Waiters are served first come, first served, and a caller takes its spawn
+token before it queues for a slot, so pacing never holds capacity idle.
+Callers that cannot be admitted get ``AdmissionRejected`` carrying a
+``retry_after`` hint.
+"""
+
+import asyncio
+import time
+from collections import Counter, deque
+
+from log.logWrapper import get_logger
+
+clog = get_logger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a process cannot be admitted; retry after ``retry_after`` s."""
+
+    def __init__(self, message: str, retry_after: float = 1.0) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Classic token bucket; ``rate`` <= 0 disables limiting."""
+
+    def __init__(self, rate: float, burst: float | None = None) -> None:
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self, tokens: float = 1.0) -> bool:
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def delay(self, tokens: float = 1.0) -> float:
+        """Seconds until ``tokens`` would be available."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(tokens - self._tokens, 0.0) / self.rate
+
+    @property
+    def tokens(self) -> float | None:
+        if self.rate <= 0:
+            return None
+        self._refill()
+        return self._tokens
+
+
+class Slot:
+    """Capacity held by one live process."""
+
+    def __init__(self, controller: "AdmissionController", connector: str) -> None:
+        self._controller = controller
+        self.connector = connector
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(self.connector)
+
+
+class AdmissionController:
+    """Global and per-connector process limits; 0 means unlimited."""
+
+    def __init__(
+        self,
+        max_processes: int = 0,
+        max_per_connector: int = 0,
+        max_queue: int = 100,
+        queue_timeout: float = 10.0,
+        spawn_rate: float = 0.0,
+        spawn_burst: float | None = None,
+    ) -> None:
+        self.max_processes = max_processes
+        self.max_per_connector = max_per_connector
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.spawn_bucket = TokenBucket(spawn_rate, spawn_burst)
+        self._active = 0
+        self._per_connector: Counter[str] = Counter()
+        self._waiters: deque[tuple[str, asyncio.Future]] = deque()
+        self._admitted = 0
+        self._rejected: Counter[str] = Counter()
+
+    def _has_capacity(self, connector: str) -> bool:
+        if self.max_processes and self._active >= self.max_processes:
+            return False
+        if self.max_per_connector and self._per_connector[connector] >= self.max_per_connector:
+            return False
+        return True
+
+    def _take(self, connector: str) -> Slot:
+        self._active += 1
+        self._per_connector[connector] += 1
+        self._admitted += 1
+        return Slot(self, connector)
+
+    def _release(self, connector: str) -> None:
+        self._active -= 1
+        self._per_connector[connector] -= 1
+        if self._per_connector[connector] <= 0:
+            del self._per_connector[connector]
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free capacity to waiters in arrival order."""
+        for entry in list(self._waiters):
+            connector, waiter = entry
+            if self._has_capacity(connector):
+                self._waiters.remove(entry)
+                waiter.set_result(self._take(connector))
+            elif self.max_processes and self._active >= self.max_processes:
+                break
+
+    def _reject(self, reason: str, message: str, retry_after: float) -> AdmissionRejected:
+        self._rejected[reason] += 1
+        clog.info(f"Admission rejected ({reason}): {message}")
+        return AdmissionRejected(message, retry_after)
+
+    def try_acquire(self, connector: str) -> Slot | None:
+        """Admit without waiting; used for speculative work such as pool refill."""
+        if self._waiters or not self._has_capacity(connector):
+            return None
+        if not self.spawn_bucket.try_take():
+            return None
+        return self._take(connector)
+
+    async def acquire(self, connector: str) -> Slot:
+        """Wait (bounded) for a spawn token, then for capacity."""
+        deadline = time.monotonic() + self.queue_timeout
+        while not self.spawn_bucket.try_take():
+            delay = self.spawn_bucket.delay()
+            if time.monotonic() + delay > deadline:
+                raise self._reject(
+                    "spawn_rate",
+                    f"Spawn rate limit reached for {connector}",
+                    delay,
+                )
+            await asyncio.sleep(delay)
+
+        if not self._waiters and self._has_capacity(connector):
+            return self._take(connector)
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject(
+                "queue_full",
+                f"Too many connections waiting for {connector}",
+                self.queue_timeout,
+            )
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (connector, waiter)
+        self._waiters.append(entry)
+        self._dispatch()
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(waiter), max(deadline - time.monotonic(), 0.0)
+            )
+        except asyncio.TimeoutError:
+            if waiter.done():
+                return waiter.result()
+            waiter.cancel()
+            self._waiters.remove(entry)
+            raise self._reject(
+                "timeout",
+                f"No process capacity for {connector} within {self.queue_timeout}s",
+                self.queue_timeout,
+            ) from None
+        except BaseException:
+            if waiter.cancel():
+                self._waiters.remove(entry)
+            else:
+                # Granted while we were being cancelled; pass it on.
+                waiter.result().release()
+            raise
+
+    def stats(self) -> dict:
+        return {
+            "active_processes": self._active,
+            "max_processes": self.max_processes,
+            "per_connector": dict(self._per_connector),
+            "max_per_connector": self.max_per_connector,
+            "waiting": len(self._waiters),
+            "max_queue": self.max_queue,
+            "admitted": self._admitted,
+            "rejected": dict(self._rejected),
+            "spawn_tokens": self.spawn_bucket.tokens,
+        }
@@ -0,0 +1 @@
+"""Load-test and benchmark harness for the MCP SSE proxy."""
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Stand-in for the ``docker`` CLI to exercise the container launchers locally.
+
+    fake_container_cli.py run -i --rm -e TOKEN /usr/bin/python3 stub_server.py
+
+The "image" is the program to run and everything after it its arguments.
+``create`` sleeps ``FAKE_CONTAINER_CREATE_DELAY`` seconds (default 2) to
+stand in for container creation, records the command and its ``-e``
+variables under ``FAKE_CONTAINER_STATE`` and prints the container id;
+``start -a -i`` execs the recorded command, so signals reach it directly.
+``run`` creates and starts a container that is not kept; ``stop``, ``rm`` and ``ps``
+work on the recorded containers. Only the subset of the CLI the proxy uses
+is implemented.
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+
+STATE = os.environ.get("FAKE_CONTAINER_STATE", "/tmp/fake-containers")
+CREATE_DELAY = float(os.environ.get("FAKE_CONTAINER_CREATE_DELAY", "2"))
+# Options that take a value as the next argument.
+VALUED = {"-e", "--env", "--name", "-v", "--volume", "-w", "--workdir", "--network", "-p", "-t"}
+
+
+def _path(container_id: str) -> str:
+    return os.path.join(STATE, f"{container_id}.json")
+
+
+def _parse(args: list[str]) -> dict:
+    env = {}
+    index = 0
+    while index < len(args) and args[index].startswith("-"):
+        option = args[index]
+        value = None
+        if option in VALUED and option != "-t":
+            index += 1
+            value = args[index]
+        elif "=" in option:
+            option, value = option.split("=", 1)
+        if option in ("-e", "--env") and value is not None:
+            name, _, given = value.partition("=")
+            env[name] = given if "=" in value else os.environ.get(name, "")
+        index += 1
+    if index >= len(args):
+        sys.exit("fake_container_cli: missing image")
+    time.sleep(CREATE_DELAY)
+    return {"command": args[index:], "env": env, "starts": 0}
+
+
+def create(args: list[str]) -> str:
+    container = _parse(args)
+    os.makedirs(STATE, exist_ok=True)
+    container_id = uuid.uuid4().hex[:12]
+    with open(_path(container_id), "w") as file:
+        json.dump(container, file)
+    return container_id
+
+
+def _exec(container: dict) -> None:
+    command = container["command"]
+    os.execvpe(command[0], command, {**os.environ, **container["env"]})
+
+
+def start(container_id: str) -> None:
+    with open(_path(container_id)) as file:
+        container = json.load(file)
+    container["starts"] += 1
+    with open(_path(container_id), "w") as file:
+        json.dump(container, file)
+    _exec(container)
+
+
+def main() -> None:
+    if len(sys.argv) < 2:
+        sys.exit("usage: fake_container_cli.py run|create|start|stop|rm|ps ...")
+    command, args = sys.argv[1], sys.argv[2:]
+    if command == "create":
+        print(create(args))
+    elif command == "run":
+        # Nothing is recorded, as if run with ``--rm``.
+        _exec(_parse(args))
+    elif command == "start":
+        start([arg for arg in args if not arg.startswith("-")][-1])
+    elif command == "stop":
+        for container_id in args:
+            if not container_id.startswith("-") and os.path.exists(_path(container_id)):
+                print(container_id)
+    elif command == "rm":
+        for container_id in args:
+            if not container_id.startswith("-"):
+                try:
+                    os.unlink(_path(container_id))
+                except FileNotFoundError:
+                    pass
+                print(container_id)
+    elif command == "ps":
+        names = os.listdir(STATE) if os.path.isdir(STATE) else []
+        for name in sorted(names):
+            print(name.removesuffix(".json"))
+    else:
+        sys.exit(f"fake_container_cli: unsupported command {command}")
+
+
+if __name__ == "__main__":
+    main()
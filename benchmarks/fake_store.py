@@ -0,0 +1,124 @@
+"""In-memory stand-in for ``database.mongodb.AsyncMongoConnection``.
+
+Implements just the slice of the motor API the proxy uses: ``find_one``,
+``find`` (async iteration, ``to_list``), ``replace_one``, ``delete_many`` and
+a ``watch`` that reports change streams as unsupported so the config cache
+falls back to polling. ``install()`` registers it as ``database.mongodb``
+before ``run_MCP`` is imported.
+"""
+
+import asyncio
+import copy
+import sys
+import types
+import typing as t
+
+COLLECTIONS: dict[str, list[dict]] = {}
+
+
+def _matches(document: dict, filter: dict) -> bool:
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(_matches(document, part) for part in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(document, part) for part in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = document.get(key)
+            for operator, operand in condition.items():
+                if operator == "$exists" and (key in document) != operand:
+                    return False
+                if operator == "$gt" and (value is None or not value > operand):
+                    return False
+                if operator == "$in" and value not in operand:
+                    return False
+        elif document.get(key) != condition:
+            return False
+    return True
+
+
+def _project(document: dict, projection: dict | None) -> dict:
+    if not projection:
+        return copy.deepcopy(document)
+    keys = {key for key, include in projection.items() if include} | {"_id"}
+    return {key: copy.deepcopy(value) for key, value in document.items() if key in keys}
+
+
+class _Cursor:
+    def __init__(self, documents: list[dict]) -> None:
+        self._documents = documents
+
+    def __aiter__(self) -> t.AsyncIterator[dict]:
+        async def _iterate() -> t.AsyncIterator[dict]:
+            for document in self._documents:
+                yield document
+
+        return _iterate()
+
+    async def to_list(self, length: int | None = None) -> list[dict]:
+        return list(self._documents[:length])
+
+
+class FakeCollection:
+    def __init__(self, name: str, latency: float = 0.0) -> None:
+        self.name = name
+        self.latency = latency
+
+    @property
+    def _documents(self) -> list[dict]:
+        return COLLECTIONS.setdefault(self.name, [])
+
+    async def find_one(self, filter: dict | None = None, projection: dict | None = None) -> dict | None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for document in self._documents:
+            if _matches(document, filter or {}):
+                return _project(document, projection)
+        return None
+
+    def find(self, filter: dict | None = None, projection: dict | None = None) -> _Cursor:
+        return _Cursor(
+            [_project(document, projection) for document in self._documents if _matches(document, filter or {})]
+        )
+
+    async def replace_one(self, filter: dict, replacement: dict, upsert: bool = False) -> None:
+        for index, document in enumerate(self._documents):
+            if _matches(document, filter):
+                self._documents[index] = copy.deepcopy(replacement)
+                return
+        if upsert:
+            self._documents.append(copy.deepcopy(replacement))
+
+    async def delete_many(self, filter: dict) -> None:
+        COLLECTIONS[self.name] = [d for d in self._documents if not _matches(d, filter)]
+
+    def watch(self, *args: t.Any, **kwargs: t.Any) -> t.Any:  # noqa: ANN401
+        raise NotImplementedError("change streams are not supported by the fake store")
+
+
+class FakeDatabase:
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+
+    def get_collection(self, name: str) -> FakeCollection:
+        return FakeCollection(name, self.latency)
+
+
+class AsyncMongoConnection:
+    latency = 0.0
+
+    async def get_connection(self, db_name: str | None = None) -> FakeDatabase:
+        return FakeDatabase(self.latency)
+
+
+def install(collections: dict[str, list[dict]], latency: float = 0.0) -> None:
+    """Serve ``collections`` from memory as ``database.mongodb``."""
+    COLLECTIONS.clear()
+    COLLECTIONS.update(copy.deepcopy(collections))
+    AsyncMongoConnection.latency = latency
+    package = sys.modules.setdefault("database", types.ModuleType("database"))
+    module = types.ModuleType("database.mongodb")
+    module.AsyncMongoConnection = AsyncMongoConnection
+    package.mongodb = module
+    sys.modules["database.mongodb"] = module
@@ -0,0 +1,260 @@
+"""Drive many SSE sessions through the proxy and report where time goes.
+
+    python -m benchmarks.load_test --sessions 200 --concurrency 50 --calls 20
+
+Starts ``benchmarks.serve`` in a subprocess (unless ``--url`` points at a
+running proxy), opens ``--sessions`` SSE connections to ``/sse/{connector}``,
+issues ``--calls`` tool calls per session through ``/messages/`` and prints
+connect-time percentiles, calls/sec, proxy memory per session and the
+number of connector subprocesses while all sessions are open.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import typing as t
+from contextlib import AsyncExitStack
+
+import httpx
+from mcp.client.session import ClientSession
+from mcp.client.sse import sse_client
+
+from benchmarks.serve import CONNECTOR_ID
+
+
+def percentile(values: list[float], fraction: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _children(pid: int) -> list[int]:
+    """Direct children of ``pid`` (Linux ``/proc``)."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                fields = stat.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return children
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Session:
+    def __init__(self) -> None:
+        self.connect_seconds: float | None = None
+        self.call_seconds: list[float] = []
+        self.error: str | None = None
+
+
+async def _open(stack: AsyncExitStack, url: str, result: Session) -> ClientSession:
+    started = time.perf_counter()
+    read_stream, write_stream = await stack.enter_async_context(sse_client(url, timeout=30))
+    session = await stack.enter_async_context(ClientSession(read_stream, write_stream))
+    await session.initialize()
+    result.connect_seconds = time.perf_counter() - started
+    return session
+
+
+async def _run_session(
+    url: str,
+    calls: int,
+    opened: asyncio.Semaphore,
+    all_open: asyncio.Event,
+    hold: bool,
+) -> Session:
+    result = Session()
+    try:
+        async with AsyncExitStack() as stack:
+            try:
+                session = await _open(stack, url, result)
+            finally:
+                opened.release()
+            for index in range(calls):
+                started = time.perf_counter()
+                await session.call_tool("echo", {"index": index})
+                result.call_seconds.append(time.perf_counter() - started)
+            if hold:
+                await all_open.wait()
+    except Exception as err:  # noqa: BLE001
+        result.error = f"{type(err).__name__}: {err}"
+    return result
+
+
+async def run_load(
+    base_url: str,
+    server_pid: int | None,
+    sessions: int,
+    concurrency: int,
+    calls: int,
+) -> dict:
+    url = f"{base_url}/sse/{CONNECTOR_ID}"
+    baseline_rss = _rss_bytes(server_pid) if server_pid else 0
+    gate = asyncio.Semaphore(concurrency)
+    opened = asyncio.Semaphore(0)
+    all_open = asyncio.Event()
+
+    async def _gated() -> Session:
+        async with gate:
+            return await _run_session(url, calls, opened, all_open, hold=False)
+
+    # Phase 1: throughput with bounded concurrency.
+    started = time.perf_counter()
+    results = await asyncio.gather(*[_gated() for _ in range(sessions)])
+    elapsed = time.perf_counter() - started
+
+    # Phase 2: hold ``concurrency`` sessions open at once to size them.
+    held = [
+        asyncio.create_task(_run_session(url, 0, opened, all_open, hold=True))
+        for _ in range(concurrency)
+    ]
+    for _ in range(concurrency):
+        await opened.acquire()
+    await asyncio.sleep(0.5)
+    peak_rss = _rss_bytes(server_pid) if server_pid else 0
+    children = _children(server_pid) if server_pid else []
+    children_rss = sum(_rss_bytes(pid) for pid in children)
+    all_open.set()
+    held_results = await asyncio.gather(*held)
+
+    connect = [r.connect_seconds for r in results if r.connect_seconds is not None]
+    call_latencies = [value for r in results for value in r.call_seconds]
+    errors = [r.error for r in results + held_results if r.error]
+    open_sessions = sum(1 for r in held_results if r.connect_seconds is not None)
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "calls_per_session": calls,
+        "elapsed_seconds": round(elapsed, 3),
+        "connect_p50": percentile(connect, 0.5),
+        "connect_p95": percentile(connect, 0.95),
+        "connect_p99": percentile(connect, 0.99),
+        "call_p50": percentile(call_latencies, 0.5),
+        "call_p95": percentile(call_latencies, 0.95),
+        "calls_per_second": round(len(call_latencies) / elapsed, 1) if elapsed else None,
+        "errors": len(errors),
+        "first_errors": errors[:5],
+        "held_sessions": open_sessions,
+        "proxy_rss_bytes_per_session": (
+            (peak_rss - baseline_rss) // open_sessions if server_pid and open_sessions else None
+        ),
+        "subprocesses": len(children) if server_pid else None,
+        "subprocess_rss_bytes": children_rss if server_pid else None,
+    }
+
+
+async def _wait_ready(base_url: str, process: subprocess.Popen | None, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"benchmark server exited with {process.returncode}")
+            try:
+                if (await client.get(f"{base_url}/ready")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError(f"{base_url} did not become ready")
+
+
+def _format(report: dict) -> str:
+    def _ms(value: t.Any) -> str:  # noqa: ANN401
+        return "-" if value is None else f"{value * 1000:.1f} ms"
+
+    def _mib(value: t.Any) -> str:  # noqa: ANN401
+        return "-" if value is None else f"{value / 1024 / 1024:.2f} MiB"
+
+    return "\n".join(
+        [
+            f"sessions           {report['sessions']} (concurrency {report['concurrency']}, "
+            f"{report['calls_per_session']} calls each)",
+            f"connect p50/p95/p99 {_ms(report['connect_p50'])} / {_ms(report['connect_p95'])} / "
+            f"{_ms(report['connect_p99'])}",
+            f"call p50/p95       {_ms(report['call_p50'])} / {_ms(report['call_p95'])}",
+            f"calls/sec          {report['calls_per_second']}",
+            f"errors             {report['errors']}",
+            f"proxy RSS/session  {_mib(report['proxy_rss_bytes_per_session'])}",
+            f"subprocesses       {report['subprocesses']} "
+            f"({_mib(report['subprocess_rss_bytes'])} total) with {report['held_sessions']} open",
+        ]
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Benchmark an already running proxy instead")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub seconds per call")
+    parser.add_argument("--payload-bytes", type=int, default=256)
+    parser.add_argument("--startup-delay", type=float, default=0.0, help="Stub start-up time")
+    parser.add_argument("--store-latency", type=float, default=0.0)
+    parser.add_argument("--container", action="store_true", help="Run the stub as a fake container")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        process = subprocess.Popen(
+            [
+                sys.executable, "-m", "benchmarks.serve",
+                "--port", str(port),
+                "--latency", str(args.latency),
+                "--payload-bytes", str(args.payload_bytes),
+                "--startup-delay", str(args.startup_delay),
+                "--store-latency", str(args.store_latency),
+                *(["--container"] if args.container else []),
+            ],
+        )
+    try:
+        asyncio.run(_wait_ready(base_url, process))
+        report = asyncio.run(
+            run_load(
+                base_url,
+                process.pid if process else None,
+                args.sessions,
+                args.concurrency,
+                args.calls,
+            )
+        )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+    print(json.dumps(report, indent=2) if args.json else _format(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Run the proxy against the fake store with one stub connector configured.
+
+    python -m benchmarks.serve --port 8300 --latency 0.01 --payload-bytes 4096
+
+The connector id is ``bench-user``. Proxy settings (``MCP_POOL_*``,
+``MCP_LAZY_SPAWN``, ``MCP_PASSTHROUGH``, ...) are read from the environment
+as usual. ``--container`` runs the stub through ``fake_container_cli.py run``
+so the container launchers (``MCP_LAUNCHER``) can be compared without docker.
+"""
+
+import argparse
+import os
+import sys
+
+from benchmarks import fake_store
+
+CONNECTOR_ID = "bench-user"
+STUB_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_server.py")
+CONTAINER_CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_container_cli.py")
+
+
+def connector_documents(
+    latency: float, payload_bytes: int, startup_delay: float, container: bool = False
+) -> dict:
+    command, args = sys.executable, [
+        STUB_SERVER,
+        f"--latency={latency}",
+        f"--payload-bytes={payload_bytes}",
+        f"--startup-delay={startup_delay}",
+    ]
+    if container:
+        command, args = CONTAINER_CLI, ["run", "-i", "--rm", sys.executable, *args]
+    return {
+        "mcp_tool_configuration": [
+            {
+                "name": "bench",
+                "configurations": {
+                    "transport": "stdio",
+                    "command": command,
+                    "args": args,
+                },
+            }
+        ],
+        "mcp_credentials": [{"tool_name": "bench", "user_id": "user", "secrets": {}}],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8300)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--payload-bytes", type=int, default=256)
+    parser.add_argument("--startup-delay", type=float, default=0.0)
+    parser.add_argument("--store-latency", type=float, default=0.0, help="Seconds per find_one")
+    parser.add_argument("--container", action="store_true", help="Run the stub as a fake container")
+    args = parser.parse_args()
+
+    fake_store.install(
+        connector_documents(args.latency, args.payload_bytes, args.startup_delay, args.container),
+        latency=args.store_latency,
+    )
+    if args.container:
+        os.environ.setdefault("MCP_CONTAINER_CLIS", f"docker,podman,{os.path.basename(CONTAINER_CLI)}")
+    os.environ.setdefault("PREFIX_URL", "")
+
+    import uvicorn
+
+    import run_MCP
+
+    uvicorn.run(run_MCP.create_starlette_app(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Stub stdio MCP server with configurable latency and payload size.
+
+    python benchmarks/stub_server.py --latency 0.01 --payload-bytes 4096
+"""
+
+import argparse
+import os
+
+import anyio
+from mcp import types
+from mcp.server.lowlevel import Server
+from mcp.server.stdio import stdio_server
+from pydantic import AnyUrl
+
+
+def build_server(latency: float, payload_bytes: int) -> Server:
+    app: Server = Server("benchmark-stub")
+    payload = "x" * payload_bytes
+
+    @app.list_tools()
+    async def _list_tools() -> list[types.Tool]:
+        return [
+            types.Tool(
+                name="echo",
+                description="Return the arguments plus a fixed-size payload.",
+                inputSchema={"type": "object"},
+                annotations=types.ToolAnnotations(readOnlyHint=True),
+            ),
+        ]
+
+    @app.call_tool()
+    async def _call_tool(name: str, arguments: dict) -> list[types.TextContent]:
+        if latency:
+            await anyio.sleep(latency)
+        return [types.TextContent(type="text", text=f"{name} {arguments} {os.getpid()} {payload}")]
+
+    @app.list_resources()
+    async def _list_resources() -> list[types.Resource]:
+        return [types.Resource(uri=AnyUrl("stub:///payload"), name="payload")]
+
+    @app.read_resource()
+    async def _read_resource(uri: AnyUrl) -> str:
+        if latency:
+            await anyio.sleep(latency)
+        return payload
+
+    @app.list_prompts()
+    async def _list_prompts() -> list[types.Prompt]:
+        return [types.Prompt(name="stub")]
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per call")
+    parser.add_argument("--payload-bytes", type=int, default=256, help="Result payload size")
+    parser.add_argument("--startup-delay", type=float, default=0.0, help="Seconds before serving")
+    args, _ = parser.parse_known_args()
+
+    app = build_server(args.latency, args.payload_bytes)
+
+    async def _serve() -> None:
+        if args.startup_delay:
+            await anyio.sleep(args.startup_delay)
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(read_stream, write_stream, app.create_initialization_options())
+
+    anyio.run(_serve)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Per-connector cache of tool, prompt and resource listings.
+
+Listings are shared by every session whose upstream was launched with the
+same resolved parameters (see ``session_pool.pool_key``), so connectors whose
+catalog depends on the caller's credentials never leak it across users. An
+entry is dropped when any upstream of that connector announces a
+``*/list_changed`` notification, and otherwise expires after ``ttl`` seconds.
+
+By default only the first upstream page is cached and requests carrying a
+cursor are passed through to the upstream. With ``page_size`` set, the
+catalog follows the upstream's cursors once, caches the whole listing and
+serves it in pages of ``page_size`` items with cursors of its own.
+
+Each catalog also carries the connector's ``SingleFlight`` group, which the
+proxy uses to coalesce identical uncached requests across sessions, its
+``ResourceCache`` of subscription-backed resource contents and its
+``CompletionCache``.
+"""
+
+import asyncio
+import base64
+import time
+import typing as t
+
+from mcp import types
+from mcp.shared.exceptions import McpError
+
+from completion_cache import CompletionCache
+from connector_cache import TTLCache
+from log.logWrapper import get_logger
+from resource_cache import ResourceCache
+from single_flight import SingleFlight, flight_key
+
+clog = get_logger(__name__)
+
+TOOLS = "tools"
+PROMPTS = "prompts"
+RESOURCES = "resources"
+RESOURCE_TEMPLATES = "resource_templates"
+
+# Result field holding the items of each listing.
+_ITEMS = {
+    TOOLS: "tools",
+    PROMPTS: "prompts",
+    RESOURCES: "resources",
+    RESOURCE_TEMPLATES: "resourceTemplates",
+}
+
+# Upper bound on upstream pages followed for one listing.
+MAX_UPSTREAM_PAGES = 1000
+
+_LIST_CHANGED: dict[type, tuple[str, ...]] = {
+    types.ToolListChangedNotification: (TOOLS,),
+    types.PromptListChangedNotification: (PROMPTS,),
+    types.ResourceListChangedNotification: (RESOURCES, RESOURCE_TEMPLATES),
+}
+
+Loader = t.Callable[..., t.Awaitable[t.Any]]
+
+
+async def collect_pages(kind: str, loader: Loader) -> t.Any:  # noqa: ANN401
+    """Follow the upstream's cursors and merge every page into one result."""
+    field = _ITEMS[kind]
+    result = await loader()
+    items = list(getattr(result, field))
+    cursor, seen = result.nextCursor, set()
+    while cursor and cursor not in seen and len(seen) < MAX_UPSTREAM_PAGES:
+        seen.add(cursor)
+        page = await loader(cursor)
+        items.extend(getattr(page, field))
+        cursor = page.nextCursor
+    if cursor:
+        clog.info(f"Stopped following {kind} pages after {len(seen) + 1} pages")
+    return result.model_copy(update={field: items, "nextCursor": None})
+
+
+def _encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"offset:{offset}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        prefix, _, offset = base64.urlsafe_b64decode(cursor.encode()).decode().partition(":")
+        if prefix == "offset" and offset.isdigit():
+            return int(offset)
+    except ValueError:
+        pass
+    raise McpError(types.ErrorData(code=types.INVALID_PARAMS, message=f"Invalid cursor: {cursor}"))
+
+
+class Catalog:
+    """Cached list results for one connector."""
+
+    def __init__(
+        self,
+        ttl: float,
+        resource_entries: int = 256,
+        resource_ttl: float = 300.0,
+        page_size: int = 0,
+        completion_entries: int = 1024,
+        completion_ttl: float = 30.0,
+    ) -> None:
+        self.ttl = ttl
+        self.page_size = page_size
+        self._results: dict[str, tuple[float, t.Any]] = {}
+        # Bumped on invalidation so a fetch that started earlier cannot
+        # store a listing that is already known to be stale.
+        self._generation: dict[str, int] = {}
+        self.flights = SingleFlight()
+        self.resources = ResourceCache(resource_entries, resource_ttl)
+        self.completions = CompletionCache(completion_entries, completion_ttl)
+
+    def get(self, kind: str) -> t.Any | None:  # noqa: ANN401
+        entry = self._results.get(kind)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self._results[kind]
+            return None
+        return result
+
+    async def fetch(
+        self,
+        kind: str,
+        loader: t.Callable[[], t.Awaitable[t.Any]],
+    ) -> t.Any:  # noqa: ANN401
+        """Return the cached listing, loading it at most once concurrently."""
+        result = self.get(kind)
+        if result is not None:
+            return result
+
+        async def _load() -> t.Any:  # noqa: ANN401
+            generation = self._generation.get(kind, 0)
+            result = await (collect_pages(kind, loader) if self.page_size else loader())
+            if self._generation.get(kind, 0) == generation:
+                self._results[kind] = (time.monotonic() + self.ttl, result)
+            return result
+
+        return await self.flights.run(kind, _load)
+
+    async def list_page(
+        self,
+        kind: str,
+        loader: Loader,
+        cursor: str | None = None,
+    ) -> t.Any:  # noqa: ANN401
+        """Answer a list request for ``kind`` starting at ``cursor``.
+
+        ``loader(cursor=None)`` fetches one upstream page.
+        """
+        if self.page_size:
+            listing = await self.fetch(kind, loader)
+            return self._page(kind, listing, cursor)
+        if cursor is None:
+            return await self.fetch(kind, loader)
+        return await self.flights.run(flight_key(f"{kind}/list", cursor), lambda: loader(cursor))
+
+    def _page(self, kind: str, listing: t.Any, cursor: str | None) -> t.Any:  # noqa: ANN401
+        field = _ITEMS[kind]
+        items = getattr(listing, field)
+        offset = _decode_cursor(cursor) if cursor is not None else 0
+        end = offset + self.page_size
+        return listing.model_copy(
+            update={
+                field: items[offset:end],
+                "nextCursor": _encode_cursor(end) if end < len(items) else None,
+            }
+        )
+
+    def seed(self, kind: str, result: t.Any) -> None:  # noqa: ANN401
+        """Store ``result`` unless a fresher listing is already cached."""
+        if self.get(kind) is None and not self.flights.inflight(kind):
+            self._results[kind] = (time.monotonic() + self.ttl, result)
+
+    def invalidate(self, kind: str | None = None) -> None:
+        kinds = [kind] if kind else list(_ITEMS)
+        for name in kinds:
+            self._results.pop(name, None)
+            self._generation[name] = self._generation.get(name, 0) + 1
+
+    async def handle_notification(self, notification: types.ServerNotification) -> None:
+        for kind in _LIST_CHANGED.get(type(notification.root), ()):
+            self.invalidate(kind)
+            # Completions of a prompt or template that changed may be stale.
+            self.completions.clear()
+        await self.resources.handle_notification(notification)
+
+    async def prefill(
+        self,
+        remote_app: t.Any,  # noqa: ANN401
+        capabilities: types.ServerCapabilities,
+    ) -> None:
+        """Load every listing the server advertises, off the request path."""
+        loaders = []
+        if capabilities.tools:
+            loaders.append(self.fetch(TOOLS, remote_app.list_tools))
+        if capabilities.prompts:
+            loaders.append(self.fetch(PROMPTS, remote_app.list_prompts))
+        if capabilities.resources:
+            loaders.append(self.fetch(RESOURCES, remote_app.list_resources))
+        for outcome in await asyncio.gather(*loaders, return_exceptions=True):
+            if isinstance(outcome, Exception):
+                clog.info(f"Catalog prefill failed: {outcome}")
+
+
+class CatalogCache:
+    """Bounded set of ``Catalog`` objects keyed by connector."""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+        resource_entries: int = 256,
+        resource_ttl: float = 300.0,
+        page_size: int = 0,
+        completion_entries: int = 1024,
+        completion_ttl: float = 30.0,
+    ) -> None:
+        self.ttl = ttl
+        self.resource_entries = resource_entries
+        self.resource_ttl = resource_ttl
+        self.page_size = page_size
+        self.completion_entries = completion_entries
+        self.completion_ttl = completion_ttl
+        self._catalogs = TTLCache(max_entries, ttl)
+
+    def catalog(self, key: str) -> Catalog:
+        catalog = self._catalogs.get(key, None)
+        if catalog is None:
+            catalog = Catalog(
+                self.ttl,
+                self.resource_entries,
+                self.resource_ttl,
+                self.page_size,
+                self.completion_entries,
+                self.completion_ttl,
+            )
+        # Re-set on every access so actively used connectors never expire.
+        self._catalogs.set(key, catalog)
+        return catalog
+
+    def stats(self) -> dict:
+        """Resource and completion cache totals over every live catalog."""
+        totals: dict = {"catalogs": 0, "resources": {}, "completions": {}}
+        for key in self._catalogs.keys():
+            catalog = self._catalogs.get(key, None)
+            if catalog is None:
+                continue
+            totals["catalogs"] += 1
+            sections = {"resources": catalog.resources, "completions": catalog.completions}
+            for section, cache in sections.items():
+                for name, value in cache.stats().items():
+                    totals[section][name] = totals[section].get(name, 0) + value
+        return totals
@@ -0,0 +1,102 @@
+"""Per-connector cache of ``completion/complete`` results with prefix reuse.
+
+Results are stored per reference, argument name and typed prefix. A later
+keystroke is answered locally when a cached, shorter prefix of what the user
+typed has a complete result: every option for the longer prefix is then
+among the cached values, and filtering them keeps the server's order.
+
+A result is only reused that way if it was not truncated (``hasMore`` unset
+and ``total`` no larger than the values returned) and all its values start
+with the prefix, i.e. the server completes by prefix rather than fuzzily.
+Other results are served for their exact prefix only. Lookups walk the typed
+value from its longest prefix down, so finding the closest cached prefix
+costs one dict probe per character. Entries are bounded in number, evicted
+least recently used, and expire after ``ttl`` seconds.
+"""
+
+import json
+import time
+from collections import OrderedDict
+
+from mcp import types
+
+from log.logWrapper import get_logger
+
+clog = get_logger(__name__)
+
+
+def reference_key(ref: types.ResourceReference | types.PromptReference) -> str:
+    return json.dumps(ref.model_dump(mode="json", exclude_none=True), sort_keys=True)
+
+
+class _Entry:
+    def __init__(self, completion: types.Completion, prefix: str, expires_at: float) -> None:
+        self.completion = completion
+        self.expires_at = expires_at
+        truncated = bool(completion.hasMore) or (
+            completion.total is not None and completion.total > len(completion.values)
+        )
+        # An empty prefix says nothing about how the server matches.
+        self.extendable = bool(prefix) and not truncated and all(
+            value.startswith(prefix) for value in completion.values
+        )
+
+
+class CompletionCache:
+    """Completion results of one connector keyed by ``(ref, argument, prefix)``."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[str, str, str], _Entry] = OrderedDict()
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+
+    def _entry(self, key: tuple[str, str, str], now: float) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < now:
+            del self._entries[key]
+            return None
+        return entry
+
+    def get(self, ref: str, argument: str, value: str) -> types.Completion | None:
+        now = time.monotonic()
+        for end in range(len(value), -1, -1):
+            key = (ref, argument, value[:end])
+            entry = self._entry(key, now)
+            if entry is None:
+                continue
+            if end == len(value):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.completion
+            if entry.extendable:
+                self._entries.move_to_end(key)
+                self.prefix_hits += 1
+                values = [option for option in entry.completion.values if option.startswith(value)]
+                return types.Completion(values=values, total=len(values), hasMore=False)
+        self.misses += 1
+        return None
+
+    def put(self, ref: str, argument: str, value: str, completion: types.Completion) -> None:
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        key = (ref, argument, value)
+        self._entries[key] = _Entry(completion, value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "prefix_hits": self.prefix_hits,
+            "misses": self.misses,
+        }
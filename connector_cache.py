@@ -0,0 +1,306 @@
+"""In-process cache of connector configuration and credential documents.
+
+Tool configurations (``mcp_tool_configuration``, keyed by ``name``) and
+credentials (``mcp_credentials``, keyed by ``tool_name`` and ``user_id``) are
+read on every SSE connect. This module keeps them in bounded TTL caches and
+evicts entries as soon as the backing documents change, either by watching
+Mongo change streams or, when those are unavailable (standalone servers),
+by polling a version field such as ``updated_at``.
+"""
+
+import asyncio
+import time
+import typing as t
+from collections import OrderedDict
+
+from log.logWrapper import get_logger
+from metrics import ERRORS, MONGO_LOOKUP_SECONDS
+
+clog = get_logger(__name__)
+
+TOOL_COLLECTION = "mcp_tool_configuration"
+CREDENTIALS_COLLECTION = "mcp_credentials"
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire ``ttl`` seconds after insert.
+
+    ``on_evict(key, value)`` is called for every entry that leaves the cache,
+    whether it expired, was pushed out, replaced or removed.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+        on_evict: t.Callable[[t.Hashable, t.Any], None] | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data: OrderedDict[t.Hashable, tuple[float, t.Any]] = OrderedDict()
+
+    def _evicted(self, key: t.Hashable, value: t.Any) -> None:  # noqa: ANN401
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+    def get(self, key: t.Hashable, default: t.Any = _MISSING) -> t.Any:  # noqa: ANN401
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self._evicted(key, value)
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: t.Hashable, value: t.Any, ttl: float | None = None) -> None:  # noqa: ANN401
+        """Store ``value``; ``ttl`` overrides the cache's lifetime for this entry."""
+        previous = self._data.pop(key, None)
+        if previous is not None:
+            self._evicted(key, previous[1])
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        while len(self._data) > self.max_entries:
+            evicted, (_, old) = self._data.popitem(last=False)
+            self._evicted(evicted, old)
+
+    def pop(self, key: t.Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._evicted(key, entry[1])
+
+    def keys(self) -> list:
+        return list(self._data)
+
+    def clear(self) -> None:
+        data, self._data = self._data, OrderedDict()
+        for key, (_, value) in data.items():
+            self._evicted(key, value)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ConnectorConfigCache:
+    """Serve connection-time configuration lookups from memory.
+
+    Lookups that find no document are cached for ``negative_ttl`` seconds
+    only, so a connector created without a change event shows up quickly.
+    """
+
+    def __init__(
+        self,
+        get_database: t.Callable[[], t.Awaitable[t.Any]],
+        ttl: float = 300.0,
+        max_entries: int = 1024,
+        poll_interval: float = 5.0,
+        version_field: str = "updated_at",
+        negative_ttl: float = 5.0,
+    ) -> None:
+        self._get_database = get_database
+        self._database = None
+        self.poll_interval = poll_interval
+        self.version_field = version_field
+        self.negative_ttl = negative_ttl
+        self.tools = TTLCache(
+            max_entries, ttl, lambda key, document: self._forget(self.tools, key, document)
+        )
+        self.credentials = TTLCache(
+            max_entries, ttl, lambda key, document: self._forget(self.credentials, key, document)
+        )
+        # Mongo _id -> cache key, so deletes (which carry no document) can evict.
+        # Entries leave together with the cached document.
+        self._keys_by_id: dict[t.Any, tuple[TTLCache, t.Hashable]] = {}
+        self._inflight: dict[t.Hashable, asyncio.Future] = {}
+        self._watchers: list[asyncio.Task] = []
+        self._invalidation_listeners: list[t.Callable[[str], None]] = []
+
+    async def database(self) -> t.Any:  # noqa: ANN401
+        if self._database is None:
+            self._database = await self._get_database()
+        return self._database
+
+    async def get_tool_config(self, tool_name: str) -> dict | None:
+        return await self._lookup(
+            self.tools,
+            tool_name,
+            TOOL_COLLECTION,
+            {"name": tool_name},
+            tool_name,
+        )
+
+    async def get_credentials(self, tool_name: str, user_id: str | None) -> dict | None:
+        filter_conditions = [{"tool_name": tool_name}]
+        if user_id:
+            filter_conditions.append({"user_id": user_id})
+        return await self._lookup(
+            self.credentials,
+            (tool_name, user_id),
+            CREDENTIALS_COLLECTION,
+            {"$and": filter_conditions},
+            tool_name,
+        )
+
+    async def _lookup(
+        self,
+        cache: TTLCache,
+        key: t.Hashable,
+        collection_name: str,
+        filter: dict,
+        connector: str,
+    ) -> dict | None:
+        value = cache.get(key)
+        if value is not _MISSING:
+            return value
+
+        # Collapse concurrent misses for the same key into one round-trip.
+        inflight_key = (collection_name, key)
+        while True:
+            future = self._inflight.get(inflight_key)
+            if future is None:
+                break
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The leader was cancelled; retry (one of the waiters takes
+                # over) unless we were the ones cancelled.
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[inflight_key] = future
+        try:
+            with MONGO_LOOKUP_SECONDS.time(connector=connector, collection=collection_name):
+                database = await self.database()
+                document = await database.get_collection(collection_name).find_one(filter=filter)
+            if document is not None:
+                cache.set(key, document)
+                if "_id" in document:
+                    self._keys_by_id[document["_id"]] = (cache, key)
+            elif self.negative_ttl > 0:
+                cache.set(key, None, self.negative_ttl)
+            future.set_result(document)
+            return document
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as err:
+            if isinstance(err, Exception):
+                ERRORS.inc(connector=connector, stage="mongo_lookup")
+            future.set_exception(err)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._inflight[inflight_key]
+
+    def _forget(self, cache: TTLCache, key: t.Hashable, document: dict | None) -> None:
+        if document is None:
+            return
+        document_id = document.get("_id")
+        indexed = self._keys_by_id.get(document_id)
+        if indexed is not None and indexed[0] is cache and indexed[1] == key:
+            del self._keys_by_id[document_id]
+
+    def add_invalidation_listener(self, listener: t.Callable[[str], None]) -> None:
+        """Call ``listener(tool_name)`` whenever a tool configuration changes."""
+        self._invalidation_listeners.append(listener)
+
+    def invalidate_tool(self, tool_name: str) -> None:
+        self.tools.pop(tool_name)
+        for listener in self._invalidation_listeners:
+            listener(tool_name)
+
+    def invalidate_credentials(self, tool_name: str, user_id: str | None = None) -> None:
+        if user_id is not None:
+            self.credentials.pop((tool_name, user_id))
+            self.credentials.pop((tool_name, None))
+            return
+        for key in self.credentials.keys():
+            if key[0] == tool_name:
+                self.credentials.pop(key)
+
+    def _evict_document(self, collection_name: str, document_id: t.Any, document: dict | None) -> None:  # noqa: ANN401
+        indexed = self._keys_by_id.pop(document_id, None)
+        if indexed is not None:
+            cache, key = indexed
+            if cache is self.tools:
+                self.invalidate_tool(key)
+            else:
+                cache.pop(key)
+        if document is None:
+            return
+        if collection_name == TOOL_COLLECTION:
+            self.invalidate_tool(document.get("name"))
+        else:
+            self.invalidate_credentials(document.get("tool_name"), document.get("user_id"))
+
+    async def start(self) -> None:
+        """Start watching both collections for changes."""
+        for collection_name in (TOOL_COLLECTION, CREDENTIALS_COLLECTION):
+            self._watchers.append(asyncio.create_task(self._watch(collection_name)))
+
+    async def _watch(self, collection_name: str) -> None:
+        try:
+            database = await self.database()
+            collection = database.get_collection(collection_name)
+            async with collection.watch(full_document="updateLookup") as stream:
+                clog.info(f"Watching {collection_name} change stream for cache invalidation")
+                async for change in stream:
+                    self._evict_document(
+                        collection_name,
+                        change.get("documentKey", {}).get("_id"),
+                        change.get("fullDocument"),
+                    )
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            # Events may have been missed while the stream was down.
+            for tool_name in self.tools.keys():
+                self.invalidate_tool(tool_name)
+            self.credentials.clear()
+            clog.info(
+                f"Change stream unavailable for {collection_name} ({err}); "
+                f"polling {self.version_field} every {self.poll_interval}s"
+            )
+            await self._poll(collection_name)
+
+    async def _poll(self, collection_name: str) -> None:
+        """Evict documents whose version field moved past the last seen value.
+
+        Polling cannot observe deletes; those age out through the TTL.
+        """
+        watermark = None
+        primed = False
+        while True:
+            try:
+                database = await self.database()
+                collection = database.get_collection(collection_name)
+                version_filter = {self.version_field: {"$exists": True}}
+                if watermark is not None:
+                    version_filter = {self.version_field: {"$gt": watermark}}
+                projection = {
+                    "_id": 1,
+                    self.version_field: 1,
+                    "name": 1,
+                    "tool_name": 1,
+                    "user_id": 1,
+                }
+                async for document in collection.find(filter=version_filter, projection=projection):
+                    version = document.get(self.version_field)
+                    if primed:
+                        self._evict_document(collection_name, document.get("_id"), document)
+                    if version is not None and (watermark is None or version > watermark):
+                        watermark = version
+                primed = True
+            except Exception as err:
+                clog.info(f"Polling {collection_name} for changes failed: {err}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def close(self) -> None:
+        for task in self._watchers:
+            task.cancel()
+        self._watchers.clear()
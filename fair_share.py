@@ -0,0 +1,352 @@
+"""Per-user rate limits and fair scheduling of proxied requests.
+
+Connector ids carry the user (``<tool>-<user>``), so one user hammering a
+connector can be told apart from everyone else on it. Limits apply per
+connector and are configured with ``configurations.rate_limits``; anything
+not set there falls back to the ``MCP_*_RATE`` defaults:
+
+    "rate_limits": {
+        "user": {"requests": 5, "burst": 20, "sessions": 0.2, "session_burst": 3},
+        "connector": {"requests": 100, "sessions": 5},
+        "concurrency": 8,
+        "queue": 100,
+        "queue_timeout": 10,
+        "weights": {"batch": 0.5, "support": 2}
+    }
+
+* Token buckets per user and per connector, for requests and for new
+  sessions. Rates are per second and 0 means unlimited. Anything over a
+  limit is rejected right away with ``RateLimited``, carrying the time until
+  a token is available.
+* With ``concurrency``, at most that many requests of the connector are
+  dispatched upstream at once, and the rest queue. Waiting requests are
+  released in start-time fair order: each user's requests are tagged with a
+  virtual start time that advances by ``1 / weight`` per request, so a user
+  with a deep backlog cannot crowd out one who sends a request now and then.
+  A full queue, or a wait longer than ``queue_timeout``, is rejected too.
+
+State is per worker process.
+"""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import time
+import typing as t
+from collections import Counter
+from dataclasses import dataclass, field
+
+from mcp import types
+from mcp.shared.exceptions import McpError
+
+from admission import AdmissionRejected, TokenBucket
+from log.logWrapper import get_logger
+from metrics import FAIR_QUEUE_DEPTH, FAIR_QUEUE_WAIT_SECONDS, RATE_LIMITED
+
+clog = get_logger(__name__)
+
+# JSON-RPC error code of requests rejected by a limit; ``data`` carries
+# ``retry_after`` in seconds and the ``scope`` of the limit.
+RETRY_LATER = -32029
+
+
+def _noop() -> None:
+    pass
+
+
+class RateLimited(AdmissionRejected):
+    """Rejected by a rate limit or a full fair queue."""
+
+    def __init__(self, message: str, retry_after: float = 1.0, scope: str = "user") -> None:
+        super().__init__(message, retry_after)
+        self.scope = scope
+
+    def error(self) -> McpError:
+        """The rejection as a structured JSON-RPC error."""
+        return McpError(
+            types.ErrorData(
+                code=RETRY_LATER,
+                message=str(self),
+                data={"retry_after": round(self.retry_after, 3), "scope": self.scope},
+            )
+        )
+
+
+class Rate(t.NamedTuple):
+    rate: float = 0.0
+    burst: float | None = None
+
+
+def _rate(section: dict, name: str, burst_name: str, default: Rate) -> Rate:
+    burst = section.get(burst_name, default.burst)
+    return Rate(
+        float(section.get(name, default.rate)),
+        float(burst) if burst is not None else None,
+    )
+
+
+@dataclass(frozen=True)
+class RateLimits:
+    """Limits of one connector."""
+
+    user_requests: Rate = Rate()
+    user_sessions: Rate = Rate()
+    connector_requests: Rate = Rate()
+    connector_sessions: Rate = Rate()
+    concurrency: int = 0
+    max_queue: int = 100
+    queue_timeout: float = 10.0
+    weights: dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(cls, config: t.Any, defaults: "RateLimits") -> "RateLimits":  # noqa: ANN401
+        """Build limits from ``configurations.rate_limits`` over ``defaults``."""
+        if not isinstance(config, dict):
+            return defaults
+        user = config.get("user") or {}
+        connector = config.get("connector") or {}
+        return cls(
+            user_requests=_rate(user, "requests", "burst", defaults.user_requests),
+            user_sessions=_rate(user, "sessions", "session_burst", defaults.user_sessions),
+            connector_requests=_rate(connector, "requests", "burst", defaults.connector_requests),
+            connector_sessions=_rate(
+                connector, "sessions", "session_burst", defaults.connector_sessions
+            ),
+            concurrency=int(config.get("concurrency", defaults.concurrency)),
+            max_queue=int(config.get("queue", defaults.max_queue)),
+            queue_timeout=float(config.get("queue_timeout", defaults.queue_timeout)),
+            weights={
+                user_id: float(weight)
+                for user_id, weight in (config.get("weights") or {}).items()
+                if float(weight) > 0
+            },
+        )
+
+    def weight(self, user: str) -> float:
+        return self.weights.get(user, 1.0)
+
+
+class FairQueue:
+    """Weighted fair dispatch of one connector's requests."""
+
+    def __init__(self, connector: str, concurrency: int, max_queue: int) -> None:
+        self.connector = connector
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self.dispatched = 0
+        self.rejected = 0
+        self._virtual = 0.0
+        # Virtual finish time of each user's last request.
+        self._finish: dict[str, float] = {}
+        self._heap: list[tuple[float, int, asyncio.Future]] = []
+        self._order = itertools.count()
+
+    def _tag(self, user: str, weight: float) -> float:
+        start = max(self._virtual, self._finish.get(user, 0.0))
+        self._finish[user] = start + 1.0 / weight
+        return start
+
+    def _grant(self, start: float) -> None:
+        self._virtual = start
+        self.active += 1
+        self.dispatched += 1
+
+    def _dispatch(self) -> None:
+        while self._heap and self._has_capacity():
+            start, _, waiter = heapq.heappop(self._heap)
+            if waiter.done():
+                continue
+            self._grant(start)
+            waiter.set_result(None)
+
+    def release(self) -> None:
+        """Give back a slot taken with ``acquire``."""
+        self.active -= 1
+        self._dispatch()
+        if len(self._finish) > 1024:
+            # Users whose tags fell behind are tagged as if they were new.
+            self._finish = {
+                user: finish for user, finish in self._finish.items() if finish > self._virtual
+            }
+
+    def _has_capacity(self) -> bool:
+        return self.concurrency <= 0 or self.active < self.concurrency
+
+    def configure(self, concurrency: int, max_queue: int) -> None:
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self._dispatch()
+
+    async def _acquire(self, user: str, weight: float, timeout: float) -> None:
+        if not self.waiting and self._has_capacity():
+            self._grant(self._tag(user, weight))
+            return
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise RateLimited(
+                f"Too many requests queued for {self.connector}", timeout, "queue"
+            )
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (self._tag(user, weight), next(self._order), waiter))
+        self._dispatch()
+        if waiter.done():
+            return
+        self.waiting += 1
+        FAIR_QUEUE_DEPTH.set(self.waiting, connector=self.connector)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                waiter.cancel()
+                self.rejected += 1
+                raise RateLimited(
+                    f"Request for {self.connector} not dispatched within {timeout}s",
+                    timeout,
+                    "queue",
+                ) from None
+        except BaseException:
+            if not waiter.cancel():
+                # Granted while we were being cancelled; pass the turn on.
+                self.release()
+            raise
+        finally:
+            self.waiting -= 1
+            FAIR_QUEUE_DEPTH.set(self.waiting, connector=self.connector)
+
+    async def acquire(self, user: str, weight: float = 1.0, timeout: float = 10.0) -> None:
+        """Wait in fair order for one of the connector's dispatch slots."""
+        started = time.perf_counter()
+        await self._acquire(user, weight, timeout)
+        FAIR_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - started, connector=self.connector)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, user: str, weight: float = 1.0, timeout: float = 10.0) -> t.AsyncIterator[None]:
+        """Hold one of the connector's dispatch slots, waiting in fair order."""
+        await self.acquire(user, weight, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "dispatched": self.dispatched,
+            "rejected": self.rejected,
+        }
+
+
+class RequestGate:
+    """Limits and fair queue for the requests of one downstream session."""
+
+    def __init__(self, share: "FairShare", connector: str, user: str, limits: RateLimits) -> None:
+        self._share = share
+        self.connector = connector
+        self.user = user
+        self.limits = limits
+        self._queue = share.queue(connector, limits) if limits.concurrency > 0 else None
+
+    def check(self) -> None:
+        """Take a request token; raises ``RateLimited`` if none is left."""
+        self._share.take(
+            "requests",
+            self.connector,
+            self.user,
+            self.limits.user_requests,
+            self.limits.connector_requests,
+        )
+
+    async def acquire(self) -> t.Callable[[], None]:
+        """Wait for a fair turn; returns the function that gives it back.
+
+        For requests that complete elsewhere; handlers use ``slot()``.
+        """
+        if self._queue is None:
+            return _noop
+        await self._queue.acquire(
+            self.user, self.limits.weight(self.user), self.limits.queue_timeout
+        )
+        return self._queue.release
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> t.AsyncIterator[None]:
+        release = await self.acquire()
+        try:
+            yield
+        finally:
+            release()
+
+
+class FairShare:
+    """Token buckets and fair queues of every connector on this worker."""
+
+    def __init__(self, max_buckets: int = 10000) -> None:
+        self.max_buckets = max_buckets
+        self._buckets: dict[tuple[str, str, str], TokenBucket] = {}
+        self._queues: dict[str, FairQueue] = {}
+        self._rejected: Counter[str] = Counter()
+
+    def _bucket(self, key: tuple[str, str, str], limit: Rate) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None or (bucket.rate, bucket.burst) != (
+            limit.rate,
+            limit.burst if limit.burst is not None else max(limit.rate, 1.0),
+        ):
+            if len(self._buckets) >= self.max_buckets:
+                # Full buckets have been idle long enough to be recreated as is.
+                self._buckets = {
+                    other: kept
+                    for other, kept in self._buckets.items()
+                    if kept.tokens is not None and kept.tokens < kept.burst
+                }
+            bucket = self._buckets[key] = TokenBucket(limit.rate, limit.burst)
+        return bucket
+
+    def take(self, kind: str, connector: str, user: str, per_user: Rate, per_connector: Rate) -> None:
+        """Take one token from the user's and the connector's bucket or neither."""
+        buckets = []
+        if per_user.rate > 0:
+            buckets.append(("user", self._bucket((kind, connector, user), per_user)))
+        if per_connector.rate > 0:
+            buckets.append(("connector", self._bucket((kind, connector, ""), per_connector)))
+        delays = [(bucket.delay(), scope) for scope, bucket in buckets]
+        delay, scope = max(delays, default=(0.0, ""))
+        if delay > 0:
+            self._rejected[f"{kind}:{scope}"] += 1
+            RATE_LIMITED.inc(connector=connector, kind=kind, scope=scope)
+            clog.info(f"Rate limited {kind} of {user or 'anonymous'} on {connector} ({scope})")
+            raise RateLimited(
+                f"{kind.capitalize()} rate limit reached for {connector}", delay, scope
+            )
+        for _, bucket in buckets:
+            bucket.try_take()
+
+    def admit_session(self, connector: str, user: str, limits: RateLimits) -> None:
+        """Take a session token; raises ``RateLimited`` if none is left."""
+        self.take("sessions", connector, user, limits.user_sessions, limits.connector_sessions)
+
+    def queue(self, connector: str, limits: RateLimits) -> FairQueue:
+        queue = self._queues.get(connector)
+        if queue is None:
+            queue = self._queues[connector] = FairQueue(
+                connector, limits.concurrency, limits.max_queue
+            )
+        elif (queue.concurrency, queue.max_queue) != (limits.concurrency, limits.max_queue):
+            queue.configure(limits.concurrency, limits.max_queue)
+        return queue
+
+    def gate(self, connector: str, user: str, limits: RateLimits) -> RequestGate:
+        return RequestGate(self, connector, user, limits)
+
+    def stats(self) -> dict:
+        return {
+            "buckets": len(self._buckets),
+            "rejected": dict(self._rejected),
+            "queues": {connector: queue.stats() for connector, queue in self._queues.items()},
+        }
@@ -0,0 +1,238 @@
+"""Streamable HTTP endpoint serving the same per-connector proxy as SSE.
+
+``POST /mcp/{connector_id}`` without an ``mcp-session-id`` header starts a
+session: the upstream is resolved exactly like an SSE connection and an
+``StreamableHTTPServerTransport`` runs the proxy server in a background task.
+Later requests carry the session id and are routed to that transport; with
+JSON responses enabled a tool call is one plain request/response and no
+stream is held open. Sessions end on ``DELETE`` or after ``idle_ttl``
+seconds without a request.
+
+Session ids are prefixed with the worker index, so with several workers a
+request is forwarded to the worker that owns the session.
+"""
+
+import asyncio
+import itertools
+import time
+import typing as t
+from collections import deque
+from uuid import uuid4
+
+from mcp import server, types
+from mcp.server.streamable_http import (
+    MCP_SESSION_ID_HEADER,
+    EventCallback,
+    EventId,
+    EventMessage,
+    EventStore,
+    StreamId,
+    StreamableHTTPServerTransport,
+)
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from log.logWrapper import get_logger
+from metrics import ACTIVE_SESSIONS
+from worker_routing import WorkerMessageRouter
+
+clog = get_logger(__name__)
+
+
+class InMemoryEventStore(EventStore):
+    """Keeps the last ``max_events`` events of every stream for replay."""
+
+    def __init__(self, max_events: int = 256) -> None:
+        self.max_events = max_events
+        self._counter = itertools.count()
+        self._streams: dict[StreamId, deque[tuple[int, types.JSONRPCMessage]]] = {}
+
+    async def store_event(self, stream_id: StreamId, message: types.JSONRPCMessage) -> EventId:
+        events = self._streams.get(stream_id)
+        if events is None:
+            events = self._streams[stream_id] = deque(maxlen=self.max_events)
+        sequence = next(self._counter)
+        events.append((sequence, message))
+        return f"{stream_id}/{sequence}"
+
+    async def replay_events_after(
+        self,
+        last_event_id: EventId,
+        send_callback: EventCallback,
+    ) -> StreamId | None:
+        stream_id, _, sequence = last_event_id.rpartition("/")
+        events = self._streams.get(stream_id)
+        if events is None or not sequence.isdigit():
+            return None
+        for event_sequence, message in events:
+            if event_sequence > int(sequence):
+                await send_callback(EventMessage(message, f"{stream_id}/{event_sequence}"))
+        return stream_id
+
+
+class StreamableSession:
+    def __init__(
+        self,
+        session_id: str,
+        connector: str,
+        transport: StreamableHTTPServerTransport,
+        upstream: t.Any,  # noqa: ANN401
+    ) -> None:
+        self.session_id = session_id
+        self.connector = connector
+        self.transport = transport
+        self.upstream = upstream
+        self.last_seen = time.monotonic()
+        self.active = 0
+        self.task: asyncio.Task | None = None
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.active += 1
+        try:
+            await self.transport.handle_request(scope, receive, send)
+        finally:
+            self.active -= 1
+            self.last_seen = time.monotonic()
+
+
+SessionFactory = t.Callable[[str], t.Awaitable[tuple[server.Server, t.Any, str]]]
+
+
+class StreamableHTTPEndpoint:
+    """ASGI app for ``/mcp/{connector_id}``.
+
+    ``open_session(connector_id)`` returns ``(mcp_server, upstream, connector)``
+    or raises; ``on_error(err)`` turns such an error into a ``Response``.
+    """
+
+    def __init__(
+        self,
+        open_session: SessionFactory,
+        on_error: t.Callable[[Exception], Response],
+        worker_id: int = 0,
+        worker_count: int = 1,
+        socket_dir: str = "",
+        json_response: bool = True,
+        idle_ttl: float = 300.0,
+        max_events: int = 256,
+    ) -> None:
+        self.open_session = open_session
+        self.on_error = on_error
+        self.router = WorkerMessageRouter(self, worker_id, worker_count, socket_dir)
+        self.json_response = json_response
+        self.idle_ttl = idle_ttl
+        self.max_events = max_events
+        self._sessions: dict[str, StreamableSession] = {}
+        self._sweeper: asyncio.Task | None = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request = Request(scope, receive)
+        session_id = request.headers.get(MCP_SESSION_ID_HEADER)
+        if session_id is None:
+            if request.method != "POST":
+                response = Response("Bad Request: missing session id", status_code=400)
+                await response(scope, receive, send)
+                return
+            await self._start(request, send)
+            return
+
+        owner, _, _ = session_id.partition(".")
+        if owner.isdigit() and int(owner) != self.router.worker_id:
+            scope["path_params"] = {**scope.get("path_params", {}), "worker_id": int(owner)}
+            await self.router(scope, receive, send)
+            return
+
+        session = self._sessions.get(session_id)
+        if session is None:
+            response = Response("Could not find session", status_code=404)
+            await response(scope, receive, send)
+            return
+        await session.handle(scope, receive, send)
+
+    async def _start(self, request: Request, send: Send) -> None:
+        connector_id = request.path_params.get("connector_id")
+        try:
+            mcp_server, upstream, connector = await self.open_session(connector_id)
+        except Exception as err:
+            await self.on_error(err)(request.scope, request.receive, send)
+            return
+
+        session_id = f"{self.router.worker_id}.{uuid4().hex}"
+        transport = StreamableHTTPServerTransport(
+            mcp_session_id=session_id,
+            is_json_response_enabled=self.json_response,
+            event_store=InMemoryEventStore(self.max_events) if self.max_events else None,
+        )
+        session = StreamableSession(session_id, connector, transport, upstream)
+        ready = asyncio.get_running_loop().create_future()
+        session.task = asyncio.create_task(self._run(session, mcp_server, ready))
+        try:
+            await ready
+        except Exception as err:
+            clog.info(f"Could not start streamable session for {connector_id}: {err}")
+            response = JSONResponse(
+                content={"output": "failure", "message": f"Could not start connector: {connector_id}"},
+                status_code=502,
+            )
+            await response(request.scope, request.receive, send)
+            return
+        self._sessions[session_id] = session
+        self._ensure_sweeper()
+        clog.info(f"Streamable HTTP session {session_id} started for {connector_id}")
+        await session.handle(request.scope, request.receive, send)
+
+    async def _run(
+        self,
+        session: StreamableSession,
+        mcp_server: server.Server,
+        ready: asyncio.Future,
+    ) -> None:
+        ACTIVE_SESSIONS.inc(connector=session.connector, transport="streamable_http")
+        try:
+            async with session.transport.connect() as (read_stream, write_stream):
+                ready.set_result(None)
+                await mcp_server.run(
+                    read_stream,
+                    write_stream,
+                    mcp_server.create_initialization_options(),
+                    stateless=False,
+                )
+        except Exception as err:
+            if not ready.done():
+                ready.set_exception(err)
+            clog.info(f"Streamable HTTP session {session.session_id} failed: {err}")
+        finally:
+            if not ready.done():
+                ready.cancel()
+            self._sessions.pop(session.session_id, None)
+            ACTIVE_SESSIONS.dec(connector=session.connector, transport="streamable_http")
+            await session.upstream.close()
+            clog.info(f"Streamable HTTP session {session.session_id} closed")
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def _sweep(self) -> None:
+        interval = max(min(self.idle_ttl / 2, 30.0), 1.0)
+        while self._sessions:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for session in list(self._sessions.values()):
+                idle = not session.active and now - session.last_seen > self.idle_ttl
+                if idle and session.task is not None:
+                    clog.info(f"Streamable HTTP session {session.session_id} idle; closing")
+                    session.task.cancel()
+
+    def stats(self) -> dict:
+        return {"sessions": len(self._sessions)}
+
+    async def close(self) -> None:
+        await self.router.close()
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        tasks = [session.task for session in self._sessions.values() if session.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,117 @@
+"""Compiled, immutable launch plans for stdio connectors.
+
+Resolving a connector's argument vector means walking ``runtime_args`` and
+``env``, looking up every secret alias and splicing ``-e NAME=value`` pairs in
+front of the last argument. A ``LaunchPlan`` captures the result once per
+(tool_name, user_id) and is reused until the configuration or credential
+document it was compiled from changes.
+"""
+
+import hashlib
+import json
+import typing as t
+from dataclasses import dataclass
+
+from mcp.client.stdio import StdioServerParameters
+
+from connector_cache import TTLCache
+
+
+@dataclass(frozen=True)
+class LaunchPlan:
+    """Everything needed to spawn a connector process."""
+
+    command: str
+    args: tuple[str, ...]
+    env: tuple[tuple[str, str], ...]
+    revision: tuple[t.Any, t.Any] = (None, None)
+
+    def to_params(self) -> StdioServerParameters:
+        """Build fresh parameters; callers may mutate them freely."""
+        return StdioServerParameters(
+            command=self.command, args=list(self.args), env=dict(self.env)
+        )
+
+
+def compile_launch_plan(
+    configuration: dict,
+    runtime_args: list[str],
+    envs: dict[str, str],
+    env_args: list[str],
+    revision: tuple[t.Any, t.Any] = (None, None),
+) -> LaunchPlan:
+    """Splice resolved runtime arguments and env flags into the base args."""
+    args = list(configuration.get("args", []))
+    for env in env_args:
+        args.insert(-1, env)
+    args.extend(runtime_args)
+
+    return LaunchPlan(
+        command=configuration.get("command", ""),
+        args=tuple(args),
+        env=tuple(envs.items()),
+        revision=revision,
+    )
+
+
+def pool_key(params: StdioServerParameters) -> str:
+    """Stable digest of everything that determines the spawned process."""
+    payload = json.dumps(
+        [params.command, params.args, params.env or {}, str(params.cwd or "")],
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LaunchPlanCache:
+    """Plans keyed by (tool_name, user_id), valid for the documents they came from.
+
+    The configuration cache hands out the same document objects until they
+    are invalidated, and a plan is only current for those objects at the
+    revision (version fields) they had when it was compiled, so documents
+    updated in place are recompiled as well. ``invalidate`` drops the plans
+    of a tool whose configuration changed.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0) -> None:
+        self._plans = TTLCache(max_entries, ttl)
+
+    def get(
+        self,
+        tool_name: str,
+        user_id: str | None,
+        configuration: dict,
+        credentials: dict | None,
+        revision: tuple[t.Any, t.Any] = (None, None),
+    ) -> LaunchPlan | None:
+        entry = self._plans.get((tool_name, user_id), None)
+        if entry is None:
+            return None
+        compiled_configuration, compiled_credentials, plan = entry
+        if compiled_configuration is not configuration or compiled_credentials is not credentials:
+            return None
+        if plan.revision != revision:
+            return None
+        return plan
+
+    def put(
+        self,
+        tool_name: str,
+        user_id: str | None,
+        configuration: dict,
+        credentials: dict | None,
+        plan: LaunchPlan,
+    ) -> None:
+        self._plans.set((tool_name, user_id), (configuration, credentials, plan))
+
+    def invalidate(self, tool_name: str, user_id: str | None = None) -> None:
+        """Drop the plan of one user, or of every user if ``user_id`` is ``None``."""
+        if user_id is not None:
+            self._plans.pop((tool_name, user_id))
+            return
+        for key in self._plans.keys():
+            if key[0] == tool_name:
+                self._plans.pop(key)
+
+    def __len__(self) -> int:
+        return len(self._plans)
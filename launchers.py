@@ -0,0 +1,392 @@
+"""Launcher backends that turn resolved launch parameters into a process.
+
+Most connectors are exec'd exactly as configured. Connectors configured as
+``docker run ...`` (or ``podman run ...``) spend most of their start-up
+creating the container, so two container backends take that off the
+connection path:
+
+* ``precreated`` keeps ``warm`` containers per launch key (``pool_key``)
+  created ahead of time with ``<cli> create``. A launch only runs
+  ``<cli> start -a -i <id>``; the container is removed once its process has
+  exited and a replacement is created in the background.
+* ``recycled`` puts a container whose process exited back into the pool to
+  be started again, up to ``max_uses`` times. The launch key includes the
+  user's credentials, so a container is only ever reused by the same user,
+  but its file system survives between sessions; that is why it is opt in.
+
+A connector picks its backend with ``configurations.launcher``; otherwise
+the default backend applies. Commands that are not ``<cli> run`` are always
+exec'd. Every launch reports how long preparing it took, by backend, and
+whether a pre-created container was ready.
+"""
+
+import asyncio
+import os
+import time
+import typing as t
+from collections import deque
+
+from mcp.client.stdio import StdioServerParameters, get_default_environment
+
+from launch_plan import pool_key
+from log.logWrapper import get_logger
+from metrics import LAUNCH_SECONDS, LAUNCHES
+
+clog = get_logger(__name__)
+
+EXEC = "exec"
+CONTAINER_CLIS = ("docker", "podman")
+
+# ``run`` options that do not apply to a container created ahead of time;
+# the launcher removes containers itself and names would collide.
+_DROPPED_FLAGS = {"--rm", "-d", "--detach"}
+_DROPPED_OPTIONS = {"--name"}
+
+# docker and podman global options that take their value as the next argument.
+_GLOBAL_OPTIONS = {
+    "-c",
+    "--context",
+    "--config",
+    "-H",
+    "--host",
+    "-l",
+    "--log-level",
+    "--tlscacert",
+    "--tlscert",
+    "--tlskey",
+    "--connection",
+    "--url",
+    "--identity",
+    "--root",
+    "--runroot",
+    "--storage-driver",
+    "--cgroup-manager",
+    "--events-backend",
+    "--network-cmd-path",
+    "--tmpdir",
+}
+
+
+def _noop() -> None:
+    pass
+
+
+class Launch(t.NamedTuple):
+    """Parameters to spawn, and what to do once that process has exited."""
+
+    params: StdioServerParameters
+    backend: str
+    on_exit: t.Callable[[], None] = _noop
+
+
+def container_run(params: StdioServerParameters, clis: t.Iterable[str] = CONTAINER_CLIS) -> int | None:
+    """Index of the ``run`` argument if ``params`` start a container.
+
+    Global options before ``run`` may take a separate value (``--context
+    foo``) when they are listed in ``_GLOBAL_OPTIONS``; any other bare word
+    is taken for a different subcommand.
+    """
+    if os.path.basename(params.command) not in clis:
+        return None
+    value = False
+    for index, arg in enumerate(params.args):
+        if value:
+            value = False
+            continue
+        if arg == "run":
+            return index
+        if not arg.startswith("-"):
+            return None
+        value = arg in _GLOBAL_OPTIONS
+    return None
+
+
+def _create_args(args: list[str], run: int) -> list[str]:
+    options = []
+    skip = False
+    for arg in args[run + 1 :]:
+        if skip:
+            skip = False
+            continue
+        if arg in _DROPPED_FLAGS:
+            continue
+        if arg in _DROPPED_OPTIONS:
+            skip = True
+            continue
+        if arg.split("=", 1)[0] in _DROPPED_OPTIONS:
+            continue
+        options.append(arg)
+    if "-i" not in options and "--interactive" not in options:
+        options.insert(0, "-i")
+    return [*args[:run], "create", *options]
+
+
+class _Containers:
+    def __init__(self, params: StdioServerParameters, run: int) -> None:
+        self.params = params
+        self.create_args = _create_args(list(params.args), run)
+        self.global_args = list(params.args[:run])
+        # (container id, times started)
+        self.ready: deque[tuple[str, int]] = deque()
+        self.creating = 0
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        self.refill_task: asyncio.Task | None = None
+        self.changed = asyncio.Event()
+
+    def notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def start_params(self, container_id: str) -> StdioServerParameters:
+        return StdioServerParameters(
+            command=self.params.command,
+            args=[*self.global_args, "start", "-a", "-i", container_id],
+            env=self.params.env,
+            cwd=self.params.cwd,
+        )
+
+
+class ContainerLauncher:
+    """Starts ``<cli> run`` connectors from containers created ahead of time."""
+
+    def __init__(
+        self,
+        name: str = "precreated",
+        recycle: bool = False,
+        warm: int = 1,
+        max_uses: int = 20,
+        idle_ttl: float = 300.0,
+        timeout: float = 120.0,
+    ) -> None:
+        self.name = name
+        self.recycle = recycle
+        self.warm = max(warm, 0)
+        self.max_uses = max(max_uses, 1)
+        self.idle_ttl = idle_ttl
+        self.timeout = timeout
+        self._pools: dict[str, _Containers] = {}
+        self._sweeper: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.created = 0
+        self.removed = 0
+        self.failures = 0
+
+    async def _cli(self, params: StdioServerParameters, *args: str) -> str:
+        env = get_default_environment()
+        env.update(params.env or {})
+        process = await asyncio.create_subprocess_exec(
+            params.command,
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+            cwd=params.cwd,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+            raise
+        if process.returncode != 0:
+            raise RuntimeError(
+                f"{params.command} {args[0]} failed: {stderr.decode(errors='replace').strip()}"
+            )
+        return stdout.decode(errors="replace")
+
+    async def _create(self, pool: _Containers) -> str:
+        pool.creating += 1
+        try:
+            output = await self._cli(pool.params, *pool.create_args)
+            container_id = output.split()[-1]
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            pool.creating -= 1
+            pool.notify()
+        self.created += 1
+        return container_id
+
+    async def _remove(self, pool: _Containers, container_ids: list[str]) -> None:
+        if not container_ids:
+            return
+        try:
+            await self._cli(pool.params, *pool.global_args, "rm", "-f", *container_ids)
+            self.removed += len(container_ids)
+        except Exception as err:
+            clog.info(f"Could not remove containers {container_ids}: {err}")
+
+    def _pool(self, params: StdioServerParameters, run: int) -> _Containers:
+        key = pool_key(params)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = _Containers(params, run)
+        pool.last_used = time.monotonic()
+        self._ensure_sweeper()
+        return pool
+
+    def prepare(self, params: StdioServerParameters, run: int) -> None:
+        """Create the warm containers for ``params`` in the background."""
+        self._refill(self._pool(params, run))
+
+    async def launch(self, params: StdioServerParameters, run: int) -> Launch:
+        pool = self._pool(params, run)
+        while not pool.ready and pool.creating > 0:
+            # A container created ahead of time is on its way.
+            await pool.changed.wait()
+        if pool.ready:
+            container_id, uses = pool.ready.popleft()
+            LAUNCHES.inc(backend=self.name, outcome="warm")
+        else:
+            container_id, uses = await self._create(pool), 0
+            LAUNCHES.inc(backend=self.name, outcome="cold")
+        pool.in_use += 1
+        self._refill(pool)
+        return Launch(
+            pool.start_params(container_id),
+            self.name,
+            lambda: self._exited(pool, container_id, uses + 1),
+        )
+
+    def _exited(self, pool: _Containers, container_id: str, uses: int) -> None:
+        pool.in_use -= 1
+        pool.last_used = time.monotonic()
+        reusable = (
+            self.recycle
+            and uses < self.max_uses
+            and self._pools.get(pool_key(pool.params)) is pool
+        )
+        if reusable:
+            self._spawn(self._recycle(pool, container_id, uses))
+        else:
+            self._spawn(self._remove(pool, [container_id]))
+
+    async def _recycle(self, pool: _Containers, container_id: str, uses: int) -> None:
+        try:
+            # The CLI may have been killed before the container stopped.
+            await self._cli(pool.params, *pool.global_args, "stop", "-t", "1", container_id)
+        except Exception as err:
+            clog.info(f"Could not stop container {container_id}; removing it: {err}")
+            await self._remove(pool, [container_id])
+            return
+        if len(pool.ready) >= self.warm or self._pools.get(pool_key(pool.params)) is not pool:
+            await self._remove(pool, [container_id])
+            return
+        pool.ready.append((container_id, uses))
+        pool.notify()
+
+    def _refill(self, pool: _Containers) -> None:
+        if pool.refill_task is None or pool.refill_task.done():
+            pool.refill_task = asyncio.create_task(self._fill(pool))
+
+    async def _fill(self, pool: _Containers) -> None:
+        # Recycled containers come back, so they count towards the warm set.
+        returning = pool.in_use if self.recycle else 0
+        while len(pool.ready) + pool.creating + returning < self.warm:
+            try:
+                container_id = await self._create(pool)
+            except Exception as err:
+                clog.info(f"Could not create a container for {pool.params.command}: {err}")
+                return
+            pool.ready.append((container_id, 0))
+            pool.notify()
+            returning = pool.in_use if self.recycle else 0
+
+    def _spawn(self, coro: t.Coroutine) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def _sweep(self) -> None:
+        interval = max(min(self.idle_ttl / 2, 30.0), 1.0)
+        while self._pools:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for key, pool in list(self._pools.items()):
+                if pool.in_use <= 0 and now - pool.last_used > self.idle_ttl:
+                    del self._pools[key]
+                    ready = [container_id for container_id, _ in pool.ready]
+                    pool.ready.clear()
+                    await self._remove(pool, ready)
+
+    def stats(self) -> dict:
+        pools = list(self._pools.values())
+        return {
+            "keys": len(pools),
+            "ready": sum(len(pool.ready) for pool in pools),
+            "in_use": sum(pool.in_use for pool in pools),
+            "created": self.created,
+            "removed": self.removed,
+            "failures": self.failures,
+        }
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            if pool.refill_task is not None:
+                pool.refill_task.cancel()
+            await self._remove(pool, [container_id for container_id, _ in pool.ready])
+            pool.ready.clear()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class Launchers:
+    """Picks the backend for every connector process that is spawned.
+
+    ``choose(connector)`` returns the backend a connector asked for, if any;
+    unknown names fall back to ``default``.
+    """
+
+    def __init__(
+        self,
+        backends: dict[str, ContainerLauncher] | None = None,
+        default: str = EXEC,
+        choose: t.Callable[[str], t.Awaitable[str | None]] | None = None,
+        clis: t.Iterable[str] = CONTAINER_CLIS,
+    ) -> None:
+        self.backends = backends or {}
+        self.default = default
+        self.choose = choose
+        self.clis = tuple(clis)
+
+    def _backend(self, name: str | None) -> ContainerLauncher | None:
+        name = name or self.default
+        if name != EXEC and name not in self.backends:
+            name = self.default
+        return self.backends.get(name)
+
+    def prepare(self, params: StdioServerParameters, backend: str | None = None) -> None:
+        """Get containers ready for a launch that is likely to follow."""
+        launcher = self._backend(backend)
+        run = container_run(params, self.clis)
+        if launcher is not None and run is not None:
+            launcher.prepare(params, run)
+
+    async def launch(self, params: StdioServerParameters, connector: str = "") -> Launch:
+        started = time.perf_counter()
+        run = container_run(params, self.clis)
+        launcher = None
+        if run is not None:
+            launcher = self._backend(await self.choose(connector) if self.choose else None)
+        if launcher is None:
+            launch = Launch(params, EXEC)
+            LAUNCHES.inc(backend=EXEC, outcome=EXEC)
+        else:
+            launch = await launcher.launch(params, run)
+        LAUNCH_SECONDS.observe(time.perf_counter() - started, connector=connector, backend=launch.backend)
+        return launch
+
+    def stats(self) -> dict:
+        return {name: backend.stats() for name, backend in self.backends.items()}
+
+    async def close(self) -> None:
+        for backend in self.backends.values():
+            await backend.close()
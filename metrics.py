@@ -0,0 +1,177 @@
+"""In-process latency and throughput metrics in Prometheus text format.
+
+Recording is a dict lookup plus a bisect over a handful of bucket bounds, so
+it is cheap enough to leave on everywhere. Metrics live in the module-level
+``registry`` and are rendered by the ``/metrics`` route; like the loggers,
+modules record into it directly instead of having it threaded through.
+"""
+
+import bisect
+import time
+import typing as t
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _labels(labels: dict[str, str]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format(labels: Labels, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    body = ",".join(f'{name}="{value}"' for name, value in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _labels(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> t.Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format(labels)} {value}"
+
+
+class Gauge:
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _labels(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[_labels(labels)] = value
+
+    def replace(self, values: dict[Labels, float]) -> None:
+        """Swap in a fresh set of samples, e.g. from a snapshot at scrape time."""
+        self._values = values
+
+    def render(self) -> t.Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format(labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[Labels, list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _labels(labels)
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = [0.0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> t.Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> t.Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in self._values.items():
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_format(labels, (('le', str(bound)),))} {cumulative}"
+            cumulative += series[len(self.buckets)]
+            yield f"{self.name}_bucket{_format(labels, (('le', '+Inf'),))} {cumulative}"
+            yield f"{self.name}_sum{_format(labels)} {series[-1]}"
+            yield f"{self.name}_count{_format(labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+
+    def _register(self, metric: t.Any) -> t.Any:  # noqa: ANN401
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._register(Counter(name, help))
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._register(Gauge(name, help))
+
+    def histogram(self, name: str, help: str) -> Histogram:
+        return self._register(Histogram(name, help))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+MONGO_LOOKUP_SECONDS = registry.histogram(
+    "mcp_mongo_lookup_seconds", "Latency of configuration and credential lookups in Mongo."
+)
+PROCESS_SPAWN_SECONDS = registry.histogram(
+    "mcp_process_spawn_seconds", "Time to spawn a connector subprocess, by launcher backend."
+)
+LAUNCH_SECONDS = registry.histogram(
+    "mcp_launch_seconds", "Time a launcher backend took to prepare a connector launch."
+)
+LAUNCHES = registry.counter(
+    "mcp_launches_total", "Connector launches by backend and whether a container was ready."
+)
+INITIALIZE_SECONDS = registry.histogram(
+    "mcp_initialize_seconds", "Latency of the upstream initialize() handshake, by launcher backend."
+)
+REQUEST_SECONDS = registry.histogram(
+    "mcp_request_seconds", "Latency of proxied MCP requests by method."
+)
+RESULT_CACHE_LOOKUPS = registry.counter(
+    "mcp_result_cache_lookups_total", "Tool result cache lookups by outcome."
+)
+PAYLOAD_BYTES = registry.gauge(
+    "mcp_payload_bytes", "Bytes of tool and resource results currently held by the proxy."
+)
+PEAK_RSS_BYTES = registry.gauge("mcp_peak_rss_bytes", "Peak resident set size of the worker.")
+PROGRESS_NOTIFICATIONS = registry.counter(
+    "mcp_progress_notifications_total", "Progress notifications forwarded or coalesced away."
+)
+RATE_LIMITED = registry.counter(
+    "mcp_rate_limited_total", "Requests and sessions rejected by a rate limit or a full queue."
+)
+FAIR_QUEUE_DEPTH = registry.gauge(
+    "mcp_fair_queue_depth", "Requests waiting in a connector's fair queue."
+)
+FAIR_QUEUE_WAIT_SECONDS = registry.histogram(
+    "mcp_fair_queue_wait_seconds", "Time requests waited for a connector's dispatch slot."
+)
+ERRORS = registry.counter("mcp_errors_total", "Errors by connector and stage.")
+ACTIVE_SESSIONS = registry.gauge("mcp_active_sessions", "Open downstream sessions.")
+LIVE_PROCESSES = registry.gauge("mcp_live_processes", "Live connector subprocesses.")
@@ -0,0 +1,356 @@
+"""Share a few upstream sessions between many downstream clients.
+
+Connectors that declare themselves stateless (``configurations.multiplex``)
+do not get a process per downstream session. Instead every session of the
+same launch key (``session_pool.pool_key``) borrows one of a small group of
+shared ``UpstreamSession`` objects for each request:
+
+    "multiplex": true
+    "multiplex": {"sessions": 2, "max_inflight": 16}
+
+Request IDs need no bookkeeping here: each request is issued by the shared
+``ClientSession``, which numbers and matches them itself, and progress comes
+back through the per-request ``progress_callback``. A request goes to the
+least busy upstream; a new one is started (up to ``sessions``) only when all
+of them are busy, and once every upstream has ``max_inflight`` requests in
+flight further requests wait for one to finish. Groups without downstream
+sessions are closed after ``idle_ttl`` seconds. Every new downstream session
+brings the connector's current settings, which the group adopts.
+
+Server notifications are routed rather than broadcast: log messages go to
+the clients whose ``logging/setLevel`` admits them (the shared upstreams run
+at the most verbose level any client asked for), and a resource update goes
+to the clients subscribed to that URI on the upstream that sent it. Only
+clients bound to their downstream session (``bind``) receive anything.
+"""
+
+import asyncio
+import contextlib
+import time
+import typing as t
+
+from mcp import types
+from mcp.client.stdio import StdioServerParameters
+
+from admission import AdmissionController
+from launchers import Launchers
+from log.logWrapper import get_logger
+from reaper import ProcessReaper
+from session_pool import pool_key
+from upstream import UpstreamSession
+
+clog = get_logger(__name__)
+
+# Most to least verbose, as ordered by the MCP specification.
+_LEVELS: tuple[types.LoggingLevel, ...] = t.get_args(types.LoggingLevel)
+
+# Strong references to notification sends still under way.
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _spawn(coro: t.Coroutine) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _deliver(send: t.Awaitable[None]) -> None:
+    try:
+        await send
+    except Exception as err:
+        clog.info(f"Could not forward a notification to a multiplexed client: {err}")
+
+
+class _Shared:
+    def __init__(self, upstream: UpstreamSession) -> None:
+        self.upstream = upstream
+        self.inflight = 0
+
+
+class MultiplexGroup:
+    """Shared upstreams of one launch key."""
+
+    def __init__(
+        self,
+        start: t.Callable[[], t.Awaitable[UpstreamSession]],
+        sessions: int,
+        max_inflight: int,
+    ) -> None:
+        self._start_upstream = start
+        self.sessions = max(sessions, 1)
+        self.max_inflight = max(max_inflight, 1)
+        self._shared: list[_Shared] = []
+        self._clients: set[MultiplexedSession] = set()
+        self._level: types.LoggingLevel | None = None
+        self._starting = 0
+        self._freed = asyncio.Event()
+        self.leases = 0
+        self.last_used = time.monotonic()
+        self.waits = 0
+
+    def configure(
+        self,
+        start: t.Callable[[], t.Awaitable[UpstreamSession]],
+        sessions: int,
+        max_inflight: int,
+    ) -> None:
+        """Adopt the connector's current settings for upstreams started from now on."""
+        self._start_upstream = start
+        self.sessions = max(sessions, 1)
+        self.max_inflight = max(max_inflight, 1)
+        self._notify()
+
+    async def _prune(self) -> None:
+        for shared in [shared for shared in self._shared if not shared.upstream.alive]:
+            self._shared.remove(shared)
+            await shared.upstream.close()
+
+    def _can_grow(self) -> bool:
+        return len(self._shared) + self._starting < self.sessions
+
+    async def _grow(self) -> _Shared:
+        self._starting += 1
+        try:
+            upstream = await self._start_upstream()
+        finally:
+            self._starting -= 1
+        upstream.add_listener(lambda notification: self._route(upstream, notification))
+        if self._level is not None:
+            try:
+                await upstream.session.set_logging_level(self._level)
+            except Exception as err:
+                clog.info(f"Could not set the logging level of a shared upstream: {err}")
+        shared = _Shared(upstream)
+        self._shared.append(shared)
+        self._notify()
+        return shared
+
+    async def _route(self, upstream: UpstreamSession, notification: types.ServerNotification) -> None:
+        root = notification.root
+        if isinstance(root, types.LoggingMessageNotification):
+            params = root.params
+            for client in self._clients:
+                if client.downstream is not None and client.wants(params.level):
+                    send = client.downstream.send_log_message(params.level, params.data, params.logger)
+                    _spawn(_deliver(send))
+        elif isinstance(root, types.ResourceUpdatedNotification):
+            uri = str(root.params.uri)
+            for client in self._clients:
+                if client.downstream is not None and client.subscribed(uri, upstream):
+                    _spawn(_deliver(client.downstream.send_resource_updated(root.params.uri)))
+
+    async def update_logging_level(self) -> None:
+        """Run the shared upstreams at the most verbose level a client wants."""
+        levels = [client.logging_level for client in self._clients if client.logging_level]
+        level = min(levels, key=_LEVELS.index, default=None)
+        if level is None or level == self._level:
+            return
+        self._level = level
+        await self._prune()
+        for shared in list(self._shared):
+            await shared.upstream.session.set_logging_level(level)
+
+    def _notify(self) -> None:
+        self._freed.set()
+        self._freed = asyncio.Event()
+
+    async def ready(self) -> UpstreamSession:
+        """Return a live upstream, starting the first one if needed."""
+        await self._prune()
+        if self._shared:
+            return self._shared[0].upstream
+        return (await self._pick()).upstream
+
+    async def _pick(self) -> _Shared:
+        while True:
+            await self._prune()
+            available = [shared for shared in self._shared if shared.inflight < self.max_inflight]
+            best = min(available, key=lambda shared: shared.inflight, default=None)
+            if best is not None and (best.inflight == 0 or not self._can_grow()):
+                return best
+            if self._can_grow():
+                try:
+                    return await self._grow()
+                except Exception as err:
+                    if best is None:
+                        raise
+                    clog.info(f"Could not add a shared upstream: {err}")
+                    return best
+            self.waits += 1
+            await self._freed.wait()
+
+    @contextlib.asynccontextmanager
+    async def lease(self) -> t.AsyncIterator[UpstreamSession]:
+        """Borrow an upstream for one request."""
+        shared = await self._pick()
+        shared.inflight += 1
+        self.last_used = time.monotonic()
+        try:
+            yield shared.upstream
+        finally:
+            shared.inflight -= 1
+            self._notify()
+
+    def stats(self) -> dict:
+        return {
+            "upstreams": len(self._shared),
+            "inflight": sum(shared.inflight for shared in self._shared),
+            "leases": self.leases,
+            "waits": self.waits,
+        }
+
+    async def close(self) -> None:
+        shared, self._shared = self._shared, []
+        for entry in shared:
+            await entry.upstream.close()
+
+
+class MultiplexedSession:
+    """``ClientSession`` stand-in that sends each request to a shared upstream."""
+
+    def __init__(self, group: MultiplexGroup) -> None:
+        self._group = group
+        # Subscriptions stay on the upstream they were made on.
+        self._subscriptions: dict[str, UpstreamSession] = {}
+        self._closed = False
+        self.logging_level: types.LoggingLevel | None = None
+        self.downstream: t.Any = None
+        group._clients.add(self)
+
+    def bind(self, downstream: t.Any) -> None:  # noqa: ANN401
+        """Deliver this client's notifications on ``downstream``, a ``ServerSession``."""
+        self.downstream = downstream
+
+    def wants(self, level: types.LoggingLevel) -> bool:
+        if self.logging_level is None:
+            return False
+        return _LEVELS.index(level) >= _LEVELS.index(self.logging_level)
+
+    def subscribed(self, uri: str, upstream: UpstreamSession) -> bool:
+        return self._subscriptions.get(uri) is upstream
+
+    async def ready(self) -> types.InitializeResult:
+        """Initialize result of a live shared upstream, starting one if needed."""
+        return (await self._group.ready()).initialize_result
+
+    async def subscribe_resource(self, uri: t.Any) -> types.EmptyResult:  # noqa: ANN401
+        async with self._group.lease() as upstream:
+            result = await upstream.session.subscribe_resource(uri)
+        self._subscriptions[str(uri)] = upstream
+        return result
+
+    async def unsubscribe_resource(self, uri: t.Any) -> types.EmptyResult:  # noqa: ANN401
+        upstream = self._subscriptions.pop(str(uri), None)
+        if upstream is None or not upstream.alive:
+            return types.EmptyResult()
+        return await upstream.session.unsubscribe_resource(uri)
+
+    async def set_logging_level(self, level: types.LoggingLevel) -> types.EmptyResult:
+        self.logging_level = level
+        await self._group.update_logging_level()
+        return types.EmptyResult()
+
+    async def send_progress_notification(self, *args: t.Any, **kwargs: t.Any) -> None:  # noqa: ANN401
+        # Client progress refers to server-initiated requests, which a shared
+        # upstream cannot attribute to one client.
+        return None
+
+    def __getattr__(self, name: str) -> t.Callable[..., t.Awaitable[t.Any]]:
+        async def _forward(*args: t.Any, **kwargs: t.Any) -> t.Any:  # noqa: ANN401
+            async with self._group.lease() as upstream:
+                return await getattr(upstream.session, name)(*args, **kwargs)
+
+        return _forward
+
+    async def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._group._clients.discard(self)
+            self._group.leases -= 1
+            self._group.last_used = time.monotonic()
+
+
+class MultiplexPool:
+    """``MultiplexGroup`` per launch key, closed once idle."""
+
+    def __init__(
+        self,
+        admission: AdmissionController | None = None,
+        reaper: ProcessReaper | None = None,
+        idle_ttl: float = 300.0,
+        launcher: Launchers | None = None,
+        max_frame_bytes: int = 0,
+    ) -> None:
+        self.admission = admission
+        self.reaper = reaper
+        self.idle_ttl = idle_ttl
+        self.launcher = launcher
+        self.max_frame_bytes = max_frame_bytes
+        self._groups: dict[str, MultiplexGroup] = {}
+        self._sweeper: asyncio.Task | None = None
+
+    def session(
+        self,
+        params: StdioServerParameters,
+        connector: str = "",
+        sessions: int = 2,
+        max_inflight: int = 16,
+        on_start: t.Callable[[UpstreamSession], None] | None = None,
+    ) -> MultiplexedSession:
+        """Open a downstream session's view of the shared upstreams."""
+        key = pool_key(params)
+
+        async def _start() -> UpstreamSession:
+            slot = await self.admission.acquire(connector) if self.admission else None
+            try:
+                upstream = await UpstreamSession(
+                    params, slot, self.reaper, connector, self.launcher, self.max_frame_bytes
+                ).start()
+            except BaseException:
+                if slot is not None:
+                    slot.release()
+                raise
+            if on_start is not None:
+                on_start(upstream)
+            return upstream
+
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = MultiplexGroup(_start, sessions, max_inflight)
+        else:
+            group.configure(_start, sessions, max_inflight)
+        group.leases += 1
+        group.last_used = time.monotonic()
+        self._ensure_sweeper()
+        return MultiplexedSession(group)
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def _sweep(self) -> None:
+        interval = max(min(self.idle_ttl / 2, 30.0), 1.0)
+        while self._groups:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for key, group in list(self._groups.items()):
+                if group.leases <= 0 and now - group.last_used > self.idle_ttl:
+                    del self._groups[key]
+                    await group.close()
+
+    def stats(self) -> dict:
+        groups = [group.stats() for group in self._groups.values()]
+        return {
+            "groups": len(groups),
+            "upstreams": sum(group["upstreams"] for group in groups),
+            "inflight": sum(group["inflight"] for group in groups),
+            "leases": sum(group["leases"] for group in groups),
+            "waits": sum(group["waits"] for group in groups),
+        }
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        groups, self._groups = list(self._groups.values()), {}
+        for group in groups:
+            await group.close()
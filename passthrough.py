@@ -0,0 +1,426 @@
+"""Raw JSON-RPC passthrough between an SSE client and a stdio MCP server.
+
+The regular proxy decodes every frame into ``mcp.types`` models and encodes
+it again on the way out. For connectors that opt in, this engine instead
+moves frames as bytes: the SSE stream relays the server's stdout lines
+verbatim and POSTed messages are written straight to its stdin. Only request
+IDs are rewritten, so the proxy owns the upstream ID space.
+
+Responses are recognised without decoding their (possibly large) payload by
+matching the ``id`` at the start or the end of the frame; anything else falls
+back to a full, but still model-free, JSON parse.
+
+Requests pass the same limits as in the regular proxy: the session's
+``RequestGate`` (rate limits and the connector's fair queue) and its in-flight
+cap, both held until the server's response goes by. Queued requests wait in
+the background, so the POST returns right away; at most ``max_queued`` of
+them wait at once. Requests over a rate limit or the queue bound are answered
+by the proxy with a ``RETRY_LATER`` error on the SSE stream. Batches are split
+into single messages.
+"""
+
+import asyncio
+import itertools
+import re
+import time
+import typing as t
+from uuid import uuid4
+
+from mcp.client.stdio import StdioServerParameters, get_default_environment
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from admission import AdmissionController, Slot
+from fair_share import RateLimited, RequestGate
+from launchers import Launch, Launchers
+from log.logWrapper import get_logger
+from metrics import ACTIVE_SESSIONS, ERRORS, REQUEST_SECONDS
+from reaper import ProcessReaper
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:  # pragma: no cover - orjson is optional
+    import json
+
+    _loads = json.loads
+
+    def _dumps(obj: t.Any) -> bytes:  # noqa: ANN401
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+
+clog = get_logger(__name__)
+
+# Upstream ids are always integers assigned by the proxy.
+_ID = rb"(\d+)"
+_JSONRPC = rb'(?:"jsonrpc"\s*:\s*"2\.0"\s*,\s*)?'
+# {"jsonrpc":"2.0","id":N,"result"... as written by the Python SDK.
+_LEADING_ID = re.compile(
+    rb"^\{\s*" + _JSONRPC + rb'"id"\s*:\s*' + _ID + rb"\s*,\s*" + _JSONRPC + rb'"(?:result|error)"\s*:'
+)
+# {"result":...,"jsonrpc":"2.0","id":N} as written by the TypeScript SDK. A
+# number followed by exactly one closing brace can only be a top-level value.
+_TRAILING_ID = re.compile(rb'"id"\s*:\s*' + _ID + rb"\s*\}\s*$")
+_RESPONSE_START = re.compile(rb'^\{\s*"(?:result|error)"\s*:')
+_TAIL_BYTES = 64
+
+# Requests that skip the gate and the in-flight cap, as in the regular proxy.
+_PRIORITY_METHODS = frozenset(
+    {
+        "initialize",
+        "tools/list",
+        "prompts/list",
+        "resources/list",
+        "resources/templates/list",
+        "completion/complete",
+        "logging/setLevel",
+    }
+)
+
+
+class _Request(t.NamedTuple):
+    """A request forwarded to the server and not answered yet."""
+
+    original: bytes
+    method: str
+    started: float
+    release: t.Callable[[], None] | None
+
+
+class PassthroughSession:
+    """One SSE client wired to one stdio process."""
+
+    def __init__(
+        self,
+        session_id: str,
+        process: asyncio.subprocess.Process,
+        slot: Slot | None = None,
+        connector: str = "",
+        launch: Launch | None = None,
+        gate: RequestGate | None = None,
+        max_inflight: int = 0,
+        max_queued: int = 0,
+    ) -> None:
+        self.session_id = session_id
+        self.process = process
+        self.slot = slot
+        self.connector = connector
+        self.launch = launch
+        self.gate = gate
+        self._slots = asyncio.Semaphore(max_inflight) if max_inflight > 0 else None
+        self.max_queued = max_queued
+        self._next_id = itertools.count()
+        # upstream id -> the client's request, its id already JSON-encoded.
+        self._pending: dict[int, _Request] = {}
+        self._upstream_ids: dict[bytes, int] = {}
+        # The client's id -> the task waiting for its request's turn.
+        self._queued: dict[bytes, asyncio.Task] = {}
+        self._stdin_lock = asyncio.Lock()
+        # Frames for the client: the server's output and the proxy's replies.
+        self.outbox: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=1)
+
+    async def send(self, body: bytes) -> None:
+        """Forward one client frame (or batch) to the server's stdin."""
+        message = _loads(body)
+        for item in message if isinstance(message, list) else [message]:
+            if not self._is_request(item) or item["method"] in _PRIORITY_METHODS:
+                await self._write(item)
+                continue
+            started = time.perf_counter()
+            if self.gate is not None and item["method"] != "ping":
+                try:
+                    self.gate.check()
+                except RateLimited as err:
+                    await self._reject(item, err, started)
+                    continue
+            if 0 < self.max_queued <= len(self._queued):
+                err = RateLimited(f"Too many requests queued for {self.connector}", 1.0, "session")
+                await self._reject(item, err, started)
+                continue
+            original = _dumps(item["id"])
+            task = asyncio.create_task(self._dispatch(item, started))
+            self._queued[original] = task
+            task.add_done_callback(lambda _, original=original: self._queued.pop(original, None))
+
+    @staticmethod
+    def _is_request(message: t.Any) -> bool:  # noqa: ANN401
+        return isinstance(message, dict) and "method" in message and "id" in message
+
+    async def _dispatch(self, message: dict, started: float) -> None:
+        """Wait for an in-flight slot and a fair turn, then forward ``message``."""
+        releases = []
+        try:
+            if self._slots is not None:
+                await self._slots.acquire()
+                releases.append(self._slots.release)
+            if self.gate is not None and message["method"] != "ping":
+                releases.append(await self.gate.acquire())
+        except RateLimited as err:
+            for release in releases:
+                release()
+            await self._reject(message, err, started)
+            return
+        except BaseException:
+            for release in releases:
+                release()
+            raise
+
+        def release() -> None:
+            for release in releases:
+                release()
+
+        try:
+            await self._write(message, started, release)
+        except BaseException:
+            release()
+            raise
+
+    async def _write(
+        self,
+        message: t.Any,  # noqa: ANN401
+        started: float = 0.0,
+        release: t.Callable[[], None] | None = None,
+    ) -> None:
+        frame = self._rewrite_outgoing(message, started, release)
+        if frame is None:
+            return
+        async with self._stdin_lock:
+            self.process.stdin.write(frame + b"\n")
+            await self.process.stdin.drain()
+
+    async def _reject(self, message: dict, err: RateLimited, started: float) -> None:
+        method = message["method"]
+        ERRORS.inc(connector=self.connector, stage="request", method=method)
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started, connector=self.connector, method=method
+        )
+        error = err.error().error.model_dump(mode="json", exclude_none=True)
+        await self.outbox.put(_dumps({"jsonrpc": "2.0", "id": message["id"], "error": error}))
+
+    def _rewrite_outgoing(
+        self,
+        message: t.Any,  # noqa: ANN401
+        started: float = 0.0,
+        release: t.Callable[[], None] | None = None,
+    ) -> bytes | None:
+        if not isinstance(message, dict):
+            return _dumps(message)
+        if "method" in message and "id" in message:
+            upstream_id = next(self._next_id)
+            original = _dumps(message["id"])
+            self._pending[upstream_id] = _Request(
+                original, message["method"], started or time.perf_counter(), release
+            )
+            self._upstream_ids[original] = upstream_id
+            message["id"] = upstream_id
+        elif message.get("method") == "notifications/cancelled":
+            params = message.get("params") or {}
+            original = _dumps(params.get("requestId"))
+            queued = self._queued.pop(original, None)
+            if queued is not None:
+                # Never sent; nothing for the server to cancel.
+                queued.cancel()
+                return None
+            upstream_id = self._upstream_ids.get(original)
+            if upstream_id is not None:
+                params["requestId"] = upstream_id
+                # The server need not answer a cancelled request.
+                request = self._pending[upstream_id]
+                if request.release is not None:
+                    request.release()
+                    self._pending[upstream_id] = request._replace(release=None)
+        # Responses to server-initiated requests keep the server's ids.
+        return _dumps(message)
+
+    def rewrite_incoming(self, line: bytes) -> bytes | None:
+        """Restore the client's id on a response frame from the server.
+
+        Returns ``None`` for lines that are not JSON at all.
+        """
+        match = _LEADING_ID.match(line)
+        if match is not None:
+            return self._splice(line, match.start(1), match.end(1))
+        if _RESPONSE_START.match(line):
+            offset = max(len(line) - _TAIL_BYTES, 0)
+            match = _TRAILING_ID.search(line, offset)
+            if match is not None:
+                return self._splice(line, match.start(1), match.end(1))
+
+        # Requests and notifications from the server, or unusual key orders.
+        try:
+            message = _loads(line)
+        except ValueError:
+            return None
+        if isinstance(message, dict) and "method" not in message and "id" in message:
+            original = self._restore(_dumps(message["id"]))
+            if original is not None:
+                message["id"] = _loads(original)
+                return _dumps(message)
+        return line
+
+    def _splice(self, line: bytes, start: int, end: int) -> bytes:
+        original = self._restore(line[start:end])
+        if original is None:
+            return line
+        return line[:start] + original + line[end:]
+
+    def _restore(self, raw_id: bytes) -> bytes | None:
+        try:
+            upstream_id = int(raw_id)
+        except ValueError:
+            return None
+        request = self._pending.pop(upstream_id, None)
+        if request is None:
+            return None
+        self._upstream_ids.pop(request.original, None)
+        if request.release is not None:
+            request.release()
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - request.started, connector=self.connector, method=request.method
+        )
+        return request.original
+
+    async def pump(self, command: str) -> None:
+        """Move the server's output to ``outbox``; ``None`` marks its end."""
+        try:
+            while True:
+                line = await self.process.stdout.readline()
+                if not line:
+                    break
+                frame = self.rewrite_incoming(line.rstrip(b"\r\n"))
+                if frame is None:
+                    clog.info(f"Dropping non-JSON output from {command}")
+                    continue
+                await self.outbox.put(frame)
+        except Exception as err:
+            clog.info(f"Passthrough session {self.session_id} stopped reading: {err}")
+        await self.outbox.put(None)
+
+    def close(self) -> None:
+        """Drop queued requests and give back the slots of unanswered ones."""
+        for task in list(self._queued.values()):
+            task.cancel()
+        for request in self._pending.values():
+            if request.release is not None:
+                request.release()
+        self._pending.clear()
+
+
+class PassthroughTransport:
+    """SSE endpoint plus message route for passthrough sessions."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        max_line_bytes: int = 64 * 1024 * 1024,
+        admission: AdmissionController | None = None,
+        reaper: ProcessReaper | None = None,
+        launcher: Launchers | None = None,
+    ) -> None:
+        self.endpoint = endpoint
+        self.admission = admission
+        self.reaper = reaper
+        self.launcher = launcher
+        self.max_line_bytes = max_line_bytes
+        self._sessions: dict[str, PassthroughSession] = {}
+
+    async def _spawn(self, params: StdioServerParameters) -> asyncio.subprocess.Process:
+        env = get_default_environment()
+        env.update(params.env or {})
+        return await asyncio.create_subprocess_exec(
+            params.command,
+            *params.args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            env=env,
+            cwd=params.cwd,
+            limit=self.max_line_bytes,
+        )
+
+    async def handle_sse(
+        self,
+        request: Request,
+        params: StdioServerParameters,
+        connector: str = "",
+        gate: RequestGate | None = None,
+        max_inflight: int = 0,
+        max_queued: int = 0,
+    ) -> Response:
+        """Spawn the server and stream its output.
+
+        The session's requests pass ``gate``, at most ``max_inflight`` of
+        them are unanswered and at most ``max_queued`` wait for a turn at
+        once. Raises ``AdmissionRejected`` before
+        anything is sent to the client.
+        """
+        slot = await self.admission.acquire(connector) if self.admission else None
+        launch = None
+        try:
+            if self.launcher is not None:
+                launch = await self.launcher.launch(params, connector)
+            process = await self._spawn(launch.params if launch is not None else params)
+            if self.reaper is not None:
+                self.reaper.track(process)
+        except BaseException:
+            if slot is not None:
+                slot.release()
+            if launch is not None:
+                launch.on_exit()
+            raise
+        session = PassthroughSession(
+            uuid4().hex, process, slot, connector, launch, gate, max_inflight, max_queued
+        )
+        self._sessions[session.session_id] = session
+        ACTIVE_SESSIONS.inc(connector=connector, transport="passthrough")
+        clog.info(f"Passthrough session {session.session_id} started")
+
+        async def _events() -> t.AsyncIterator[bytes]:
+            pump = asyncio.create_task(session.pump(params.command))
+            try:
+                endpoint = f"{self.endpoint}?session_id={session.session_id}"
+                yield f"event: endpoint\r\ndata: {endpoint}\r\n\r\n".encode()
+                while (frame := await session.outbox.get()) is not None:
+                    yield b"event: message\r\ndata: " + frame + b"\r\n\r\n"
+            finally:
+                pump.cancel()
+                await self._close(session)
+
+        return StreamingResponse(
+            _events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    async def _close(self, session: PassthroughSession) -> None:
+        self._sessions.pop(session.session_id, None)
+        session.close()
+        ACTIVE_SESSIONS.dec(connector=session.connector, transport="passthrough")
+
+        def on_exit() -> None:
+            if session.slot is not None:
+                session.slot.release()
+            if session.launch is not None:
+                session.launch.on_exit()
+
+        if self.reaper is not None:
+            self.reaper.reap(session.process, session.session_id, on_exit)
+        else:
+            if session.process.returncode is None:
+                session.process.terminate()
+            on_exit()
+        clog.info(f"Passthrough session {session.session_id} closed")
+
+    async def handle_post_message(self, scope, receive, send) -> None:  # noqa: ANN001
+        request = Request(scope, receive)
+        session = self._sessions.get(request.query_params.get("session_id", ""))
+        if session is None:
+            response = Response("Could not find session", status_code=404)
+        else:
+            try:
+                await session.send(await request.body())
+                response = Response("Accepted", status_code=202)
+            except ValueError as err:
+                response = Response(f"Could not parse message: {err}", status_code=400)
+        await response(scope, receive, send)
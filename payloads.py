@@ -0,0 +1,281 @@
+"""Memory budgets and disk spooling for large tool results and resource blobs.
+
+Every ``tools/call`` and ``resources/read`` result is weighed by the UTF-8
+size of its text, base64 ``data`` and ``blob`` fields. While a request's
+handler holds its result, the bytes count against a global and a per-session
+budget, and a result that does not fit is refused with an error. The budget
+is checked once a result has been read, so it does not bound memory by
+itself; ``frame_limit`` is meant for the upstream reader, which drops a
+server before it buffers a message larger than any budget could admit.
+
+Spooling is opt-in per connector through ``configurations.spool`` in
+``mcp_tool_configuration``: ``true`` uses the proxy's ``threshold`` and a
+number sets the connector's own. Content items larger than the threshold are
+decoded and written to a file under ``directory`` in bounded chunks, and the
+item is replaced by a resource with ``mimeType`` ``text/uri-list`` whose text
+is the download URL, ``/spool/{worker_id}/{token}``. Clients of a spooling
+connector therefore get a link instead of the content and must fetch it; the
+endpoint streams the file back in chunks. Spooled files expire after ``ttl``
+seconds. Tokens are random and act as the credential for the download, like
+the session ids of the message endpoints.
+"""
+
+import asyncio
+import base64
+import os
+import resource
+import time
+import typing as t
+from uuid import uuid4
+
+from mcp import types
+
+from log.logWrapper import get_logger
+from metrics import PAYLOAD_BYTES
+
+clog = get_logger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+
+
+class PayloadRejected(RuntimeError):
+    """A result does not fit in the remaining payload budget."""
+
+
+def _item_size(item: t.Any) -> int:  # noqa: ANN401
+    if isinstance(item, types.EmbeddedResource):
+        return _item_size(item.resource)
+    for field in ("text", "data", "blob"):
+        value = getattr(item, field, None)
+        if isinstance(value, str):
+            return len(value) if value.isascii() else len(value.encode())
+    return 0
+
+
+def payload_size(result: t.Any) -> int:  # noqa: ANN401
+    """Bytes of text and encoded data carried by a tool or resource result."""
+    items = getattr(result, "content", None) or getattr(result, "contents", None) or []
+    return sum(_item_size(item) for item in items)
+
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss is in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _write(path: str, value: str, encoded: bool) -> int:
+    written = 0
+    if encoded:
+        # Line breaks in the data would misalign the 4-character groups.
+        value = "".join(value.split())
+    with open(path, "wb") as file:
+        # CHUNK_SIZE is a multiple of 4, so every base64 slice is decodable.
+        for start in range(0, len(value), CHUNK_SIZE):
+            piece = value[start : start + CHUNK_SIZE]
+            data = base64.b64decode(piece) if encoded else piece.encode()
+            file.write(data)
+            written += len(data)
+    return written
+
+
+class _Spooled(t.NamedTuple):
+    path: str
+    mime_type: str
+    expires_at: float
+
+
+class PayloadGuard:
+    """Budgets in-memory payloads and spools oversized content to disk."""
+
+    def __init__(
+        self,
+        threshold: int = 0,
+        directory: str = "",
+        url_prefix: str = "/spool/",
+        ttl: float = 600.0,
+        max_bytes: int = 0,
+        max_session_bytes: int = 0,
+    ) -> None:
+        self.threshold = threshold
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_session_bytes = max_session_bytes
+        self._files: dict[str, _Spooled] = {}
+        self._sessions: dict[t.Hashable, int] = {}
+        # (session, request id) -> bytes held until the handler returns
+        self._pending: dict[tuple[t.Hashable, t.Any], int] = {}
+        self._sweeper: asyncio.Task | None = None
+        self.in_use = 0
+        self.peak = 0
+        self.rejected = 0
+        self.spooled = 0
+        self.spooled_bytes = 0
+
+    @property
+    def frame_limit(self) -> int:
+        """Largest upstream message worth reading; 0 when unbudgeted."""
+        budgets = [budget for budget in (self.max_bytes, self.max_session_bytes) if budget]
+        return min(budgets, default=0)
+
+    def threshold_for(self, config: t.Any) -> int:  # noqa: ANN401
+        """Spool threshold for a connector's ``configurations.spool``; 0 disables it."""
+        if config is True:
+            return self.threshold
+        if isinstance(config, (int, float)) and not isinstance(config, bool):
+            return max(int(config), 0)
+        return 0
+
+    async def process(
+        self,
+        result: t.Any,  # noqa: ANN401
+        session: t.Any,  # noqa: ANN401
+        request_id: t.Any = None,  # noqa: ANN401
+        threshold: int = 0,
+    ) -> t.Any:  # noqa: ANN401
+        """Admit ``result`` for ``session``, spooling items over ``threshold``.
+
+        With a ``request_id``, the bytes stay reserved until ``release`` is
+        called for that request. Raises ``PayloadRejected`` when the result
+        exceeds a budget.
+        """
+        size = payload_size(result)
+        self._reserve(session, size)
+        spool = 0 < threshold <= size
+        try:
+            if spool:
+                result = await self._spool(result, threshold)
+        except BaseException:
+            self._release(session, size)
+            raise
+        held = payload_size(result) if spool else size
+        self._release(session, size - held)
+        if request_id is None:
+            self._release(session, held)
+            return result
+        key = (session, request_id)
+        self._pending[key] = self._pending.get(key, 0) + held
+        return result
+
+    def release(self, session: t.Hashable, request_id: t.Any) -> None:  # noqa: ANN401
+        """Release what ``process`` reserved for one request of ``session``."""
+        size = self._pending.pop((session, request_id), None)
+        if size is not None:
+            self._release(session, size)
+
+    def _reserve(self, session: t.Hashable, size: int) -> None:
+        in_session = self._sessions.get(session, 0)
+        if self.max_bytes and self.in_use + size > self.max_bytes:
+            self.rejected += 1
+            raise PayloadRejected(
+                f"Result of {size} bytes exceeds the proxy payload budget; retry later"
+            )
+        if self.max_session_bytes and in_session + size > self.max_session_bytes:
+            self.rejected += 1
+            raise PayloadRejected(
+                f"Result of {size} bytes exceeds the session payload budget"
+            )
+        self._sessions[session] = in_session + size
+        self.in_use += size
+        self.peak = max(self.peak, self.in_use)
+        PAYLOAD_BYTES.set(self.in_use)
+
+    def _release(self, session: t.Hashable, size: int) -> None:
+        if not size:
+            return
+        remaining = self._sessions.get(session, 0) - size
+        if remaining > 0:
+            self._sessions[session] = remaining
+        else:
+            self._sessions.pop(session, None)
+        self.in_use -= size
+        PAYLOAD_BYTES.set(self.in_use)
+
+    async def _spool(self, result: t.Any, threshold: int) -> t.Any:  # noqa: ANN401
+        field = "content" if hasattr(result, "content") else "contents"
+        items = []
+        for item in getattr(result, field):
+            if _item_size(item) >= threshold:
+                item = await self._spool_item(item)
+            items.append(item)
+        return result.model_copy(update={field: items})
+
+    async def _spool_item(self, item: t.Any) -> t.Any:  # noqa: ANN401
+        if isinstance(item, types.EmbeddedResource):
+            return item.model_copy(update={"resource": await self._spool_item(item.resource)})
+        if isinstance(item, (types.ImageContent, types.AudioContent)):
+            value, encoded, mime_type = item.data, True, item.mimeType
+        elif isinstance(item, types.BlobResourceContents):
+            value, encoded = item.blob, True
+            mime_type = item.mimeType or "application/octet-stream"
+        else:
+            value, encoded = item.text, False
+            mime_type = getattr(item, "mimeType", None) or "text/plain; charset=utf-8"
+
+        os.makedirs(self.directory, exist_ok=True)
+        token = uuid4().hex
+        path = os.path.join(self.directory, token)
+        size = await asyncio.to_thread(_write, path, value, encoded)
+        self._files[token] = _Spooled(path, mime_type, time.monotonic() + self.ttl)
+        self._ensure_sweeper()
+        self.spooled += 1
+        self.spooled_bytes += size
+        url = f"{self.url_prefix}{token}"
+
+        if isinstance(item, (types.TextResourceContents, types.BlobResourceContents)):
+            # Keep the original URI so the client can tell which resource it is.
+            return types.TextResourceContents(uri=item.uri, mimeType="text/uri-list", text=url)
+        return types.EmbeddedResource(
+            type="resource",
+            resource=types.TextResourceContents(
+                uri=f"urn:mcp-spool:{token}", mimeType="text/uri-list", text=url
+            ),
+            annotations=item.annotations,
+        )
+
+    def file(self, token: str) -> tuple[str, str] | None:
+        """``(path, mime_type)`` of a spooled payload that has not expired."""
+        spooled = self._files.get(token)
+        if spooled is None or spooled.expires_at < time.monotonic():
+            return None
+        return spooled.path, spooled.mime_type
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def _sweep(self) -> None:
+        interval = max(min(self.ttl / 2, 30.0), 1.0)
+        while self._files:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for token, spooled in list(self._files.items()):
+                if spooled.expires_at < now:
+                    del self._files[token]
+                    await asyncio.to_thread(_unlink, spooled.path)
+
+    def stats(self) -> dict:
+        return {
+            "in_use": self.in_use,
+            "peak": self.peak,
+            "rejected": self.rejected,
+            "spooled": self.spooled,
+            "spooled_bytes": self.spooled_bytes,
+            "spool_files": len(self._files),
+            "peak_rss": peak_rss_bytes(),
+        }
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        files, self._files = list(self._files.values()), {}
+        for spooled in files:
+            _unlink(spooled.path)
@@ -0,0 +1,87 @@
+"""Per-token throttling of progress notifications.
+
+Some tools report progress thousands of times per second. Forwarding every
+update floods the downstream stream and keeps the event loop busy on behalf
+of one session, so each progress token gets a ``ProgressThrottle`` that
+forwards at most one update per ``interval``. Updates arriving in between
+replace the pending one and are counted as dropped; the latest value is
+always delivered, and ``close()`` flushes the final update right away. Once a
+send fails the downstream is assumed gone: the throttle stops and drops
+whatever else arrives for the token.
+
+Recording an update never waits for the downstream send, so a slow client
+does not hold up the upstream's receive loop either.
+"""
+
+import asyncio
+import time
+import typing as t
+
+from log.logWrapper import get_logger
+from metrics import PROGRESS_NOTIFICATIONS
+
+clog = get_logger(__name__)
+
+Update = tuple[float, float | None, str | None]
+SendProgress = t.Callable[[float, float | None, str | None], t.Awaitable[None]]
+
+
+class ProgressThrottle:
+    """Coalesces the progress updates of one token.
+
+    Instances are ``ProgressFnT`` compatible, so they can be passed to
+    ``ClientSession.call_tool`` as ``progress_callback`` directly.
+    """
+
+    def __init__(self, send: SendProgress, interval: float, connector: str = "") -> None:
+        self._send = send
+        self.interval = interval
+        self.connector = connector
+        self._latest: Update | None = None
+        self._last_sent = 0.0
+        self._flush = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.failed = False
+        self.forwarded = 0
+        self.dropped = 0
+
+    async def __call__(self, progress: float, total: float | None, message: str | None = None) -> None:
+        if self.failed or self._latest is not None:
+            self.dropped += 1
+            PROGRESS_NOTIFICATIONS.inc(connector=self.connector, outcome="dropped")
+        if self.failed:
+            return
+        self._latest = (progress, total, message)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._drain())
+
+    @property
+    def idle(self) -> bool:
+        return self._latest is None and (self._task is None or self._task.done())
+
+    async def _drain(self) -> None:
+        while self._latest is not None:
+            wait = self._last_sent + self.interval - time.monotonic()
+            if wait > 0 and not self._flush.is_set():
+                try:
+                    await asyncio.wait_for(self._flush.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            update, self._latest = self._latest, None
+            self._last_sent = time.monotonic()
+            try:
+                await self._send(*update)
+            except Exception as err:
+                clog.info(f"Could not forward progress: {err}")
+                # Leave nothing pending so the throttle reads as idle.
+                self.failed = True
+                self._latest = None
+                return
+            self.forwarded += 1
+            PROGRESS_NOTIFICATIONS.inc(connector=self.connector, outcome="forwarded")
+
+    async def close(self) -> None:
+        """Deliver the pending update, if any, without waiting for the interval."""
+        self._flush.set()
+        if self._task is not None:
+            await self._task
@@ -1,61 +1,323 @@
 """Create an MCP server that proxies requests throgh an MCP client.
 
-This server is created independent of any transport mechanism.
+This server is created independent of any transport mechanism. Several
+such servers can be served as one with ``create_aggregate_server``.
 """
 
+import asyncio
+import contextlib
+import time
 import typing as t
 
 from mcp import server, types
 from mcp.client.session import ClientSession
+from mcp.shared.exceptions import McpError
+
+from catalog_cache import PROMPTS, RESOURCE_TEMPLATES, RESOURCES, TOOLS, Catalog, collect_pages
+from completion_cache import reference_key
+from fair_share import RateLimited, RequestGate
+from log.logWrapper import get_logger
+from metrics import ERRORS, REQUEST_SECONDS
+from multiplex import MultiplexedSession
+from payloads import PayloadGuard
+from progress import ProgressThrottle
+from result_cache import ToolResultCache
+from single_flight import flight_key
+from upstream import LazyUpstream
+
+clog = get_logger(__name__)
+
+# Strong references to fire-and-forget tasks so they are not collected early.
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _spawn(coro: t.Coroutine) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _cursor(req: t.Any) -> str | None:  # noqa: ANN401
+    return req.params.cursor if req.params is not None else None
+
+
+# Cheap metadata requests, mostly served from the catalog; they never wait
+# behind a session's in-flight limit.
+_PRIORITY_REQUESTS = (
+    types.ListToolsRequest,
+    types.ListPromptsRequest,
+    types.ListResourcesRequest,
+    types.ListResourceTemplatesRequest,
+    types.CompleteRequest,
+    types.SetLevelRequest,
+)
+
+
+def _method(request_type: type) -> str:
+    field = request_type.model_fields.get("method")
+    values = t.get_args(field.annotation) if field is not None else ()
+    return values[0] if values else request_type.__name__
+
+
+def _limited(
+    handler: t.Callable[[t.Any], t.Awaitable[types.ServerResult]],
+    slots: asyncio.Semaphore,
+) -> t.Callable[[t.Any], t.Awaitable[types.ServerResult]]:
+    async def _handler(req: t.Any) -> types.ServerResult:  # noqa: ANN401
+        async with slots:
+            return await handler(req)
+
+    return _handler
+
+
+def _throttled(
+    handler: t.Callable[[t.Any], t.Awaitable[types.ServerResult]],
+    gate: RequestGate,
+) -> t.Callable[[t.Any], t.Awaitable[types.ServerResult]]:
+    async def _handler(req: t.Any) -> types.ServerResult:  # noqa: ANN401
+        try:
+            gate.check()
+        except RateLimited as err:
+            raise err.error() from None
+        return await handler(req)
+
+    return _handler
+
+
+def _scheduled(
+    handler: t.Callable[[t.Any], t.Awaitable[types.ServerResult]],
+    gate: RequestGate,
+) -> t.Callable[[t.Any], t.Awaitable[types.ServerResult]]:
+    async def _handler(req: t.Any) -> types.ServerResult:  # noqa: ANN401
+        try:
+            async with gate.slot():
+                return await handler(req)
+        except RateLimited as err:
+            raise err.error() from None
+
+    return _handler
+
+
+def _budgeted(
+    handler: t.Callable[[t.Any], t.Awaitable[types.ServerResult]],
+    payloads: PayloadGuard,
+    app: server.Server[object],
+) -> t.Callable[[t.Any], t.Awaitable[types.ServerResult]]:
+    async def _handler(req: t.Any) -> types.ServerResult:  # noqa: ANN401
+        context = app.request_context
+        try:
+            return await handler(req)
+        finally:
+            payloads.release(context.session, context.request_id)
+
+    return _handler
+
+
+def _timed(
+    handler: t.Callable[[t.Any], t.Awaitable[types.ServerResult]],
+    method: str,
+    connector: str,
+) -> t.Callable[[t.Any], t.Awaitable[types.ServerResult]]:
+    async def _handler(req: t.Any) -> types.ServerResult:  # noqa: ANN401
+        started = time.perf_counter()
+        try:
+            result = await handler(req)
+        except Exception:
+            ERRORS.inc(connector=connector, stage="request", method=method)
+            raise
+        finally:
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started, connector=connector, method=method
+            )
+        if getattr(result.root, "isError", False):
+            ERRORS.inc(connector=connector, stage="request", method=method)
+        return result
+
+    return _handler
+
+
+class _ProxyServer(server.Server[object]):
+    """``Server`` that advertises resource subscriptions when it serves them."""
+
+    def __init__(self, name: str, subscribe: bool = False, **kwargs: t.Any) -> None:  # noqa: ANN401
+        super().__init__(name, **kwargs)
+        self.subscribe = subscribe
+
+    def get_capabilities(self, *args: t.Any, **kwargs: t.Any) -> types.ServerCapabilities:  # noqa: ANN401
+        capabilities = super().get_capabilities(*args, **kwargs)
+        if capabilities.resources is not None and self.subscribe:
+            capabilities.resources.subscribe = True
+        return capabilities
 
 
 async def create_proxy_server(
     remote_app: ClientSession,
+    initialize_result: types.InitializeResult | None = None,
+    catalog: Catalog | None = None,
+    connector: str = "",
+    tool_cache: ToolResultCache | None = None,
+    payloads: PayloadGuard | None = None,
+    progress_rate: float = 0.0,
+    max_inflight: int = 0,
+    gate: RequestGate | None = None,
+    spool_threshold: int = 0,
 ) -> server.Server[object]:  # noqa: C901
-    """Create a server instance from a remote app."""
-    response = await remote_app.initialize()
+    """Create a server instance from a remote app.
+
+    Pass ``initialize_result`` when ``remote_app`` has already been
+    initialized (e.g. it came from the warm pool) to skip the handshake.
+    When a ``catalog`` is given, list requests are answered from it (and
+    paged by it, if it has a ``page_size``) and it is filled in the
+    background right away, and identical concurrent
+    ``get_prompt``/``read_resource`` calls share one upstream request.
+    Completions are answered from the catalog's ``CompletionCache`` when a
+    cached prefix covers them. If
+    the server supports resource subscriptions, resource reads are cached
+    in the catalog's ``ResourceCache`` and downstream subscriptions share
+    one upstream subscription per URI.
+    Every handler records its latency and errors under ``connector``.
+    With a ``tool_cache``, results of tools its policy allows are cached.
+    Tool and resource results pass through ``payloads``, which holds them
+    against its budgets until the handler returns and spools content over
+    ``spool_threshold`` (0 disables it) to disk. With a
+    ``progress_rate``, progress notifications are forwarded at most that
+    many times per second per token, in both directions.
+
+    Requests are dispatched concurrently. With ``max_inflight``, at most
+    that many non-metadata requests of this session run at once and the
+    rest wait their turn; list and completion requests always go ahead.
+    The same requests pass the ``gate``, which applies the user's rate
+    limits and waits for a fair turn at the connector's upstreams.
+    """
+    response = initialize_result or await remote_app.initialize()
     capabilities = response.capabilities
 
-    app: server.Server[object] = server.Server(name=response.serverInfo.name)
+    async def _listing(
+        kind: str,
+        loader: t.Callable[..., t.Awaitable[t.Any]],
+        cursor: str | None = None,
+    ) -> t.Any:  # noqa: ANN401
+        if catalog is None:
+            return await loader(cursor)
+        return await catalog.list_page(kind, loader, cursor)
+
+    async def _coalesced(
+        method: str,
+        params: t.Any,  # noqa: ANN401
+        loader: t.Callable[[], t.Awaitable[t.Any]],
+    ) -> t.Any:  # noqa: ANN401
+        if catalog is None:
+            return await loader()
+        return await catalog.flights.run(flight_key(method, params), loader)
+
+    async def _admitted(result: t.Any) -> t.Any:  # noqa: ANN401
+        if payloads is None:
+            return result
+        context = app.request_context
+        # Held until the handler returns; see ``_budgeted``.
+        return await payloads.process(
+            result, context.session, context.request_id, spool_threshold
+        )
+
+    def _progress_callback(req: t.Any) -> t.Any:  # noqa: ANN401
+        """Forward upstream progress for ``req`` to the downstream client."""
+        meta = req.params.meta
+        token = meta.progressToken if meta is not None else None
+        if token is None:
+            return None
+        session = app.request_context.session
+        request_id = str(app.request_context.request_id)
+
+        async def _send(progress: float, total: float | None, message: str | None = None) -> None:
+            await session.send_progress_notification(
+                token, progress, total, message, related_request_id=request_id
+            )
+
+        if not progress_rate:
+            return _send
+        return ProgressThrottle(_send, 1 / progress_rate, connector)
+
+    if catalog is not None and not (isinstance(remote_app, LazyUpstream) and not remote_app.started):
+        # A lazy session's catalog comes from its snapshot, which is refreshed
+        # once the process is spawned for a real request.
+        _spawn(catalog.prefill(remote_app, capabilities))
+
+    subscribable = bool(capabilities.resources and capabilities.resources.subscribe)
+    resources = catalog.resources if catalog is not None and subscribable else None
+
+    @contextlib.asynccontextmanager
+    async def _lifespan(_: server.Server[object]) -> t.AsyncIterator[object]:
+        try:
+            yield {}
+        finally:
+            if resources is not None:
+                resources.detach(remote_app)
+
+    app: server.Server[object] = _ProxyServer(
+        name=response.serverInfo.name,
+        subscribe=resources is not None,
+        lifespan=_lifespan,
+    )
 
     if capabilities.prompts:
 
-        async def _list_prompts(_: t.Any) -> types.ServerResult:  # noqa: ANN401
-            result = await remote_app.list_prompts()
+        async def _list_prompts(req: types.ListPromptsRequest) -> types.ServerResult:
+            result = await _listing(PROMPTS, remote_app.list_prompts, _cursor(req))
             return types.ServerResult(result)
 
         app.request_handlers[types.ListPromptsRequest] = _list_prompts
 
         async def _get_prompt(req: types.GetPromptRequest) -> types.ServerResult:
-            result = await remote_app.get_prompt(req.params.name, req.params.arguments)
+            result = await _coalesced(
+                "prompts/get",
+                [req.params.name, req.params.arguments],
+                lambda: remote_app.get_prompt(req.params.name, req.params.arguments),
+            )
             return types.ServerResult(result)
 
         app.request_handlers[types.GetPromptRequest] = _get_prompt
 
     if capabilities.resources:
 
-        async def _list_resources(_: t.Any) -> types.ServerResult:  # noqa: ANN401
-            result = await remote_app.list_resources()
+        async def _list_resources(req: types.ListResourcesRequest) -> types.ServerResult:
+            result = await _listing(RESOURCES, remote_app.list_resources, _cursor(req))
             return types.ServerResult(result)
 
         app.request_handlers[types.ListResourcesRequest] = _list_resources
 
-        # list_resource_templates() is not implemented in the client
-        # async def _list_resource_templates(_: t.Any) -> types.ServerResult:
-        #     result = await remote_app.list_resource_templates()
-        #     return types.ServerResult(result)
+        async def _list_resource_templates(
+            req: types.ListResourceTemplatesRequest,
+        ) -> types.ServerResult:
+            result = await _listing(
+                RESOURCE_TEMPLATES, remote_app.list_resource_templates, _cursor(req)
+            )
+            return types.ServerResult(result)
 
-        # app.request_handlers[types.ListResourceTemplatesRequest] = _list_resource_templates
+        app.request_handlers[types.ListResourceTemplatesRequest] = _list_resource_templates
 
         async def _read_resource(req: types.ReadResourceRequest) -> types.ServerResult:
-            result = await remote_app.read_resource(req.params.uri)
-            return types.ServerResult(result)
+            uri = str(req.params.uri)
+            result = resources.get(uri) if resources is not None else None
+            if result is not None:
+                return types.ServerResult(await _admitted(result))
+
+            async def _load() -> types.ReadResourceResult:
+                if resources is None:
+                    return await remote_app.read_resource(req.params.uri)
+                return await resources.load(
+                    uri, remote_app, lambda: remote_app.read_resource(req.params.uri)
+                )
+
+            result = await _coalesced("resources/read", uri, _load)
+            return types.ServerResult(await _admitted(result))
 
         app.request_handlers[types.ReadResourceRequest] = _read_resource
 
     if capabilities.logging:
 
         async def _set_logging_level(req: types.SetLevelRequest) -> types.ServerResult:
+            if isinstance(remote_app, MultiplexedSession):
+                remote_app.bind(app.request_context.session)
             await remote_app.set_logging_level(req.params.level)
             return types.ServerResult(types.EmptyResult())
 
@@ -66,7 +328,14 @@ async def create_proxy_server(
         async def _subscribe_resource(
             req: types.SubscribeRequest,
         ) -> types.ServerResult:
-            await remote_app.subscribe_resource(req.params.uri)
+            if resources is None:
+                if isinstance(remote_app, MultiplexedSession):
+                    remote_app.bind(app.request_context.session)
+                await remote_app.subscribe_resource(req.params.uri)
+            else:
+                await resources.subscribe(
+                    str(req.params.uri), remote_app, app.request_context.session
+                )
             return types.ServerResult(types.EmptyResult())
 
         app.request_handlers[types.SubscribeRequest] = _subscribe_resource
@@ -74,26 +343,62 @@ async def create_proxy_server(
         async def _unsubscribe_resource(
             req: types.UnsubscribeRequest,
         ) -> types.ServerResult:
-            await remote_app.unsubscribe_resource(req.params.uri)
+            if resources is None:
+                await remote_app.unsubscribe_resource(req.params.uri)
+            else:
+                await resources.unsubscribe(str(req.params.uri), remote_app)
             return types.ServerResult(types.EmptyResult())
 
         app.request_handlers[types.UnsubscribeRequest] = _unsubscribe_resource
 
     if capabilities.tools:
 
-        async def _list_tools(_: t.Any) -> types.ServerResult:  # noqa: ANN401
-            tools = await remote_app.list_tools()
+        async def _list_tools(req: types.ListToolsRequest) -> types.ServerResult:
+            tools = await _listing(TOOLS, remote_app.list_tools, _cursor(req))
             return types.ServerResult(tools)
 
         app.request_handlers[types.ListToolsRequest] = _list_tools
 
+        def _tool(name: str) -> types.Tool | None:
+            listing = catalog.get(TOOLS) if catalog is not None else None
+            if listing is None:
+                return None
+            return next((tool for tool in listing.tools if tool.name == name), None)
+
+        async def _cached_call(
+            name: str,
+            arguments: dict,
+            ttl: float,
+            progress: t.Any,  # noqa: ANN401
+        ) -> types.CallToolResult:
+            key = tool_cache.key(name, arguments)
+            result = tool_cache.store.get(key)
+            if result is not None:
+                return result
+
+            async def _load() -> types.CallToolResult:
+                result = await remote_app.call_tool(name, arguments, progress_callback=progress)
+                tool_cache.store.put(key, result, ttl)
+                return result
+
+            if progress is not None:
+                # Progress goes to the caller that asked for it, so a call
+                # carrying a progressToken is never shared with other callers.
+                return await _load()
+            return await _coalesced("tools/call", [name, arguments], _load)
+
         async def _call_tool(req: types.CallToolRequest) -> types.ServerResult:
+            progress = _progress_callback(req)
             try:
-                result = await remote_app.call_tool(
-                    req.params.name,
-                    (req.params.arguments or {}),
-                )
-                return types.ServerResult(result)
+                name, arguments = req.params.name, (req.params.arguments or {})
+                ttl = tool_cache.ttl_for(_tool(name), name) if tool_cache is not None else None
+                if ttl is not None:
+                    result = await _cached_call(name, arguments, ttl, progress)
+                else:
+                    result = await remote_app.call_tool(
+                        name, arguments, progress_callback=progress
+                    )
+                return types.ServerResult(await _admitted(result))
             except Exception as e:  # noqa: BLE001
                 return types.ServerResult(
                     types.CallToolResult(
@@ -101,25 +406,321 @@ async def create_proxy_server(
                         isError=True,
                     ),
                 )
+            finally:
+                if isinstance(progress, ProgressThrottle):
+                    # The final update goes out before the response does, and
+                    # no drain task outlives a failed or cancelled call.
+                    await progress.close()
 
         app.request_handlers[types.CallToolRequest] = _call_tool
 
+    async def _forward_progress(
+        token: str | int,
+        progress: float,
+        total: float | None,
+        message: str | None = None,
+    ) -> None:
+        await remote_app.send_progress_notification(token, progress, total, message)
+
+    # Client-sent progress has no completion to flush on; each token's
+    # throttle delivers its latest value and is dropped once idle.
+    upstream_progress: dict[str | int, ProgressThrottle] = {}
+
     async def _send_progress_notification(req: types.ProgressNotification) -> None:
-        await remote_app.send_progress_notification(
-            req.params.progressToken,
-            req.params.progress,
-            req.params.total,
-        )
+        token = req.params.progressToken
+        if not progress_rate:
+            await _forward_progress(token, req.params.progress, req.params.total, req.params.message)
+            return
+        for idle in [key for key, throttle in upstream_progress.items() if throttle.idle]:
+            del upstream_progress[idle]
+        throttle = upstream_progress.get(token)
+        if throttle is None:
+            throttle = upstream_progress[token] = ProgressThrottle(
+                lambda *update: _forward_progress(token, *update),
+                1 / progress_rate,
+                connector,
+            )
+        await throttle(req.params.progress, req.params.total, req.params.message)
 
     app.notification_handlers[types.ProgressNotification] = _send_progress_notification
 
     async def _complete(req: types.CompleteRequest) -> types.ServerResult:
-        result = await remote_app.complete(
-            req.params.ref,
-            req.params.argument.model_dump(),
-        )
+        argument = req.params.argument
+        # A context (earlier arguments) or other extra params would change
+        # the answer, so such requests are neither cached nor shared.
+        context = getattr(req.params, "context", None)
+        if context is None and req.params.model_extra:
+            context = req.params.model_extra.get("context")
+        cacheable = catalog is not None and context is None and not req.params.model_extra
+        if cacheable:
+            ref = reference_key(req.params.ref)
+            completion = catalog.completions.get(ref, argument.name, argument.value)
+            if completion is not None:
+                return types.ServerResult(types.CompleteResult(completion=completion))
+
+        if cacheable:
+            result = await _coalesced(
+                "completion/complete",
+                [req.params.ref.model_dump(mode="json"), argument.model_dump()],
+                lambda: remote_app.complete(req.params.ref, argument.model_dump()),
+            )
+        else:
+            result = await remote_app.complete(req.params.ref, argument.model_dump())
+        if cacheable:
+            catalog.completions.put(ref, argument.name, argument.value, result.completion)
         return types.ServerResult(result)
 
     app.request_handlers[types.CompleteRequest] = _complete
 
+    slots = asyncio.Semaphore(max_inflight) if max_inflight > 0 else None
+    for request_type, handler in list(app.request_handlers.items()):
+        if payloads is not None and request_type in (
+            types.CallToolRequest,
+            types.ReadResourceRequest,
+        ):
+            handler = _budgeted(handler, payloads, app)
+        gated = gate is not None and not issubclass(
+            request_type, (*_PRIORITY_REQUESTS, types.PingRequest)
+        )
+        if gated:
+            handler = _scheduled(handler, gate)
+        if slots is not None and not issubclass(request_type, _PRIORITY_REQUESTS):
+            handler = _limited(handler, slots)
+        if gated:
+            # Over-limit requests are turned away before they take a slot.
+            handler = _throttled(handler, gate)
+        app.request_handlers[request_type] = _timed(handler, _method(request_type), connector)
+
+    return app
+
+
+_LIST_REQUESTS: dict[str, type] = {
+    TOOLS: types.ListToolsRequest,
+    PROMPTS: types.ListPromptsRequest,
+    RESOURCES: types.ListResourcesRequest,
+    RESOURCE_TEMPLATES: types.ListResourceTemplatesRequest,
+}
+
+
+def _renamed(req: t.Any, **params: t.Any) -> t.Any:  # noqa: ANN401
+    return req.model_copy(update={"params": req.params.model_copy(update=params)})
+
+
+def create_aggregate_server(  # noqa: C901
+    members: dict[str, server.Server[object]],
+    separator: str = "__",
+) -> server.Server[object]:
+    """Serve the proxy servers of several connectors as one server.
+
+    ``members`` maps a namespace, the connector name, to the server
+    ``create_proxy_server`` built for it. Tools and prompts are listed as
+    ``{namespace}{separator}{name}`` and routed back to their member by that
+    prefix. Resources keep their URIs and only their names are namespaced;
+    reads and subscriptions go to the member that listed the URI, or whose
+    template matches it. Member handlers run in this server's request
+    context, so their caches, budgets and progress forwarding apply as for a
+    single connector. Listings are merged in full rather than paged, and a
+    member whose listing fails is left out of it.
+    """
+
+    def _serving(request_type: type) -> list[str]:
+        return [name for name, member in members.items() if request_type in member.request_handlers]
+
+    async def _forward(namespace: str, req: t.Any) -> t.Any:  # noqa: ANN401
+        handler = members[namespace].request_handlers[type(req)]
+        return (await handler(req)).root
+
+    async def _collect(namespace: str, kind: str) -> t.Any:  # noqa: ANN401
+        request_type = _LIST_REQUESTS[kind]
+
+        async def _load(cursor: str | None = None) -> t.Any:  # noqa: ANN401
+            params = types.PaginatedRequestParams(cursor=cursor) if cursor else None
+            return await _forward(namespace, request_type(method=_method(request_type), params=params))
+
+        return await collect_pages(kind, _load)
+
+    async def _gather(kind: str) -> list[tuple[str, t.Any]]:
+        namespaces = _serving(_LIST_REQUESTS[kind])
+        results = await asyncio.gather(
+            *(_collect(namespace, kind) for namespace in namespaces), return_exceptions=True
+        )
+        listings = []
+        for namespace, result in zip(namespaces, results):
+            if isinstance(result, Exception):
+                clog.info(f"Leaving {namespace} out of the {kind} listing: {result}")
+                continue
+            listings.append((namespace, result))
+        return listings
+
+    def _qualified(namespace: str, name: str) -> str:
+        return f"{namespace}{separator}{name}"
+
+    def _split(name: str) -> tuple[str, str]:
+        namespace, found, local = name.partition(separator)
+        if not found or namespace not in members:
+            raise McpError(types.ErrorData(code=types.INVALID_PARAMS, message=f"Unknown name: {name}"))
+        return namespace, local
+
+    # Which member listed a resource URI or a resource template.
+    owners: dict[str, str] = {}
+    templates: dict[str, str] = {}
+
+    async def _resources() -> list[types.Resource]:
+        resources = []
+        for namespace, result in await _gather(RESOURCES):
+            for resource in result.resources:
+                owners[str(resource.uri)] = namespace
+                resources.append(
+                    resource.model_copy(update={"name": _qualified(namespace, resource.name)})
+                )
+        return resources
+
+    async def _templates() -> list[types.ResourceTemplate]:
+        listed = []
+        for namespace, result in await _gather(RESOURCE_TEMPLATES):
+            for template in result.resourceTemplates:
+                templates[template.uriTemplate] = namespace
+                listed.append(
+                    template.model_copy(update={"name": _qualified(namespace, template.name)})
+                )
+        return listed
+
+    def _match(uri: str) -> str | None:
+        if uri in owners:
+            return owners[uri]
+        matches = [
+            (len(prefix), namespace)
+            for template, namespace in templates.items()
+            if (prefix := template.split("{", 1)[0]) and uri.startswith(prefix)
+        ]
+        return max(matches)[1] if matches else None
+
+    async def _owner(uri: str) -> str:
+        serving = _serving(types.ReadResourceRequest)
+        if len(serving) == 1:
+            return serving[0]
+        namespace = _match(uri)
+        if namespace is None:
+            # The client may not have listed yet, or the listing changed.
+            await asyncio.gather(_resources(), _templates())
+            namespace = _match(uri)
+        if namespace is None:
+            raise McpError(types.ErrorData(code=types.INVALID_PARAMS, message=f"Unknown resource: {uri}"))
+        return namespace
+
+    @contextlib.asynccontextmanager
+    async def _lifespan(_: server.Server[object]) -> t.AsyncIterator[object]:
+        async with contextlib.AsyncExitStack() as stack:
+            for member in members.values():
+                await stack.enter_async_context(member.lifespan(member))
+            yield {}
+
+    app: server.Server[object] = _ProxyServer(
+        name=separator.join(members),
+        subscribe=any(getattr(member, "subscribe", False) for member in members.values()),
+        lifespan=_lifespan,
+    )
+
+    if _serving(types.ListToolsRequest):
+
+        async def _list_tools(req: types.ListToolsRequest) -> types.ServerResult:
+            tools = [
+                tool.model_copy(update={"name": _qualified(namespace, tool.name)})
+                for namespace, result in await _gather(TOOLS)
+                for tool in result.tools
+            ]
+            return types.ServerResult(types.ListToolsResult(tools=tools))
+
+        app.request_handlers[types.ListToolsRequest] = _list_tools
+
+        async def _call_tool(req: types.CallToolRequest) -> types.ServerResult:
+            try:
+                namespace, name = _split(req.params.name)
+            except McpError as err:
+                return types.ServerResult(
+                    types.CallToolResult(
+                        content=[types.TextContent(type="text", text=err.error.message)],
+                        isError=True,
+                    ),
+                )
+            return types.ServerResult(await _forward(namespace, _renamed(req, name=name)))
+
+        app.request_handlers[types.CallToolRequest] = _call_tool
+
+    if _serving(types.ListPromptsRequest):
+
+        async def _list_prompts(req: types.ListPromptsRequest) -> types.ServerResult:
+            prompts = [
+                prompt.model_copy(update={"name": _qualified(namespace, prompt.name)})
+                for namespace, result in await _gather(PROMPTS)
+                for prompt in result.prompts
+            ]
+            return types.ServerResult(types.ListPromptsResult(prompts=prompts))
+
+        app.request_handlers[types.ListPromptsRequest] = _list_prompts
+
+        async def _get_prompt(req: types.GetPromptRequest) -> types.ServerResult:
+            namespace, name = _split(req.params.name)
+            return types.ServerResult(await _forward(namespace, _renamed(req, name=name)))
+
+        app.request_handlers[types.GetPromptRequest] = _get_prompt
+
+    if _serving(types.ListResourcesRequest):
+
+        async def _list_resources(req: types.ListResourcesRequest) -> types.ServerResult:
+            return types.ServerResult(types.ListResourcesResult(resources=await _resources()))
+
+        app.request_handlers[types.ListResourcesRequest] = _list_resources
+
+        async def _list_resource_templates(
+            req: types.ListResourceTemplatesRequest,
+        ) -> types.ServerResult:
+            return types.ServerResult(
+                types.ListResourceTemplatesResult(resourceTemplates=await _templates())
+            )
+
+        app.request_handlers[types.ListResourceTemplatesRequest] = _list_resource_templates
+
+        async def _by_uri(req: t.Any) -> types.ServerResult:  # noqa: ANN401
+            namespace = await _owner(str(req.params.uri))
+            return types.ServerResult(await _forward(namespace, req))
+
+        for request_type in (
+            types.ReadResourceRequest,
+            types.SubscribeRequest,
+            types.UnsubscribeRequest,
+        ):
+            app.request_handlers[request_type] = _by_uri
+
+    if _serving(types.SetLevelRequest):
+
+        async def _set_logging_level(req: types.SetLevelRequest) -> types.ServerResult:
+            await asyncio.gather(
+                *(_forward(namespace, req) for namespace in _serving(types.SetLevelRequest))
+            )
+            return types.ServerResult(types.EmptyResult())
+
+        app.request_handlers[types.SetLevelRequest] = _set_logging_level
+
+    async def _complete(req: types.CompleteRequest) -> types.ServerResult:
+        ref = req.params.ref
+        if isinstance(ref, types.PromptReference):
+            namespace, name = _split(ref.name)
+            req = _renamed(req, ref=ref.model_copy(update={"name": name}))
+        else:
+            namespace = templates.get(ref.uri) or await _owner(ref.uri)
+        return types.ServerResult(await _forward(namespace, req))
+
+    app.request_handlers[types.CompleteRequest] = _complete
+
+    async def _send_progress_notification(req: types.ProgressNotification) -> None:
+        # Client progress refers to a server-initiated request; any member
+        # may have sent it.
+        for member in members.values():
+            handler = member.notification_handlers.get(types.ProgressNotification)
+            if handler is not None:
+                await handler(req)
+
+    app.notification_handlers[types.ProgressNotification] = _send_progress_notification
+
     return app
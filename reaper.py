@@ -0,0 +1,173 @@
+"""Background teardown of connector subprocesses.
+
+Closing a session hands its process to the ``ProcessReaper`` and returns
+immediately. A single reaper task sends SIGTERM to queued processes in
+batches, escalates to SIGKILL after ``grace`` seconds, and counts anything
+that survives the kill as a zombie. Every process is tracked from spawn, so
+``close()`` at shutdown leaves no orphans behind, including processes whose
+sessions were still open.
+"""
+
+import asyncio
+import time
+import typing as t
+from collections import deque
+
+from log.logWrapper import get_logger
+
+clog = get_logger(__name__)
+
+
+class _Reaping:
+    def __init__(
+        self,
+        process: t.Any,  # noqa: ANN401
+        name: str,
+        on_exit: t.Callable[[], None] | None,
+    ) -> None:
+        self.process = process
+        self.name = name
+        self.on_exit = on_exit
+        self.queued_at = time.monotonic()
+        self.terminated_at: float | None = None
+        self.killed_at: float | None = None
+        self.zombie = False
+
+
+def _signal(process: t.Any, kill: bool = False) -> None:  # noqa: ANN401
+    try:
+        process.kill() if kill else process.terminate()
+    except ProcessLookupError:
+        pass
+
+
+class ProcessReaper:
+    """Terminates handed-off processes off the request path.
+
+    Processes only need ``pid``, ``returncode``, ``terminate()`` and
+    ``kill()``, which covers both asyncio and anyio subprocesses.
+    """
+
+    def __init__(
+        self,
+        grace: float = 5.0,
+        batch_size: int = 64,
+        interval: float = 0.1,
+        zombie_after: float = 10.0,
+    ) -> None:
+        self.grace = grace
+        self.batch_size = max(batch_size, 1)
+        self.interval = interval
+        self.zombie_after = zombie_after
+        self._tracked: dict[int, t.Any] = {}
+        self._queue: deque[_Reaping] = deque()
+        self._terminating: list[_Reaping] = []
+        self._task: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._latencies: deque[float] = deque(maxlen=1024)
+        self.reaped = 0
+        self.killed = 0
+        self.zombies: set[int] = set()
+
+    def track(self, process: t.Any) -> None:  # noqa: ANN401
+        """Remember a freshly spawned process so shutdown can reap it."""
+        self._tracked[process.pid] = process
+
+    def reap(
+        self,
+        process: t.Any,  # noqa: ANN401
+        name: str = "",
+        on_exit: t.Callable[[], None] | None = None,
+    ) -> None:
+        """Hand ``process`` over for termination; never blocks.
+
+        ``on_exit`` runs once the process has actually exited.
+        """
+        self._tracked.pop(process.pid, None)
+        entry = _Reaping(process, name, on_exit)
+        if process.returncode is not None:
+            self._finish(entry)
+            return
+        self._queue.append(entry)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._queue or self._terminating:
+            self._tick()
+            await asyncio.sleep(self.interval)
+
+    def _tick(self) -> None:
+        now = time.monotonic()
+        while self._queue and len(self._terminating) < self.batch_size:
+            entry = self._queue.popleft()
+            if entry.process.returncode is None:
+                _signal(entry.process)
+            entry.terminated_at = now
+            self._terminating.append(entry)
+
+        pending = []
+        for entry in self._terminating:
+            if entry.process.returncode is not None:
+                self._finish(entry)
+                continue
+            if entry.killed_at is None:
+                if now - entry.terminated_at >= self.grace:
+                    clog.info(f"Process {entry.process.pid} ({entry.name}) ignored SIGTERM; killing")
+                    _signal(entry.process, kill=True)
+                    entry.killed_at = now
+                    self.killed += 1
+            elif not entry.zombie and now - entry.killed_at >= self.zombie_after:
+                clog.info(f"Process {entry.process.pid} ({entry.name}) survived SIGKILL")
+                entry.zombie = True
+                self.zombies.add(entry.process.pid)
+            pending.append(entry)
+        self._terminating = pending
+
+    def _finish(self, entry: _Reaping) -> None:
+        self.reaped += 1
+        self.zombies.discard(entry.process.pid)
+        self._latencies.append(time.monotonic() - entry.queued_at)
+        if entry.on_exit is not None:
+            entry.on_exit()
+        aclose = getattr(entry.process, "aclose", None)
+        if aclose is not None:
+            # anyio processes still own their pipes; the process has exited,
+            # so this returns right away.
+            task = asyncio.create_task(aclose())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def _percentile(fraction: float) -> float | None:
+            if not latencies:
+                return None
+            return round(latencies[min(int(len(latencies) * fraction), len(latencies) - 1)], 4)
+
+        return {
+            "tracked": len(self._tracked),
+            "queued": len(self._queue),
+            "terminating": len(self._terminating),
+            "reaped": self.reaped,
+            "killed": self.killed,
+            "zombies": sorted(self.zombies),
+            "latency_p50": _percentile(0.5),
+            "latency_p95": _percentile(0.95),
+            "latency_max": round(latencies[-1], 4) if latencies else None,
+        }
+
+    async def close(self) -> None:
+        """Reap everything still alive, including processes never handed over."""
+        for process in list(self._tracked.values()):
+            self.reap(process, "shutdown")
+        self.batch_size = max(self.batch_size, len(self._queue) + len(self._terminating))
+        deadline = time.monotonic() + self.grace + self.zombie_after
+        while (self._queue or self._terminating) and time.monotonic() < deadline:
+            self._tick()
+            await asyncio.sleep(self.interval)
+        if self._task is not None:
+            self._task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
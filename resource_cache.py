@@ -0,0 +1,199 @@
+"""Per-connector cache of ``resources/read`` results kept fresh by subscriptions.
+
+Contents are cached per connector (see ``catalog_cache.Catalog``) and URI, but
+only while the proxy holds an upstream subscription for that URI: the first
+read subscribes once through the reading session's upstream, and the entry is
+dropped when any upstream of the connector sends
+``notifications/resources/updated`` for it, or when the session holding the
+subscription goes away. Downstream ``resources/subscribe`` requests share the
+same upstream subscription and every update is fanned out to all of them.
+Entries that expire or are evicted give up their upstream subscription
+unless a downstream client is subscribed to the URI.
+
+Servers that do not advertise ``resources.subscribe`` are never cached, since
+nothing would tell the proxy that a cached resource changed.
+"""
+
+import asyncio
+import time
+import typing as t
+from collections import OrderedDict
+
+from mcp import types
+from mcp.server.session import ServerSession
+
+from log.logWrapper import get_logger
+
+clog = get_logger(__name__)
+
+
+class _Subscription:
+    def __init__(self, uri: str) -> None:
+        self.uri = uri
+        # The remote app whose upstream holds the subscription, if any.
+        self.holder: t.Any | None = None
+        # remote app -> downstream session subscribed through it
+        self.subscribers: dict[t.Any, ServerSession] = {}
+        # Bumped on every update so a read that started earlier is not cached.
+        self.generation = 0
+        self.lock = asyncio.Lock()
+
+
+class ResourceCache:
+    """Cached resource contents and shared upstream subscriptions of one connector."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, types.ReadResourceResult]] = OrderedDict()
+        self._subscriptions: dict[str, _Subscription] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, uri: str) -> types.ReadResourceResult | None:
+        entry = self._entries.get(uri)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._drop(uri)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(uri)
+        self.hits += 1
+        return entry[1]
+
+    async def load(
+        self,
+        uri: str,
+        remote_app: t.Any,  # noqa: ANN401
+        loader: t.Callable[[], t.Awaitable[types.ReadResourceResult]],
+    ) -> types.ReadResourceResult:
+        """Read ``uri`` through ``loader`` and cache it if a subscription is held."""
+        try:
+            subscription = await self._hold(uri, remote_app)
+        except Exception as err:
+            clog.info(f"Could not subscribe to {uri}; not caching it: {err}")
+            return await loader()
+        generation = subscription.generation
+        result = await loader()
+        if subscription.holder is not None and subscription.generation == generation:
+            self._store(uri, result)
+        return result
+
+    async def subscribe(
+        self,
+        uri: str,
+        remote_app: t.Any,  # noqa: ANN401
+        session: ServerSession,
+    ) -> None:
+        """Subscribe ``session`` to ``uri``, sharing one upstream subscription."""
+        subscription = await self._hold(uri, remote_app)
+        subscription.subscribers[remote_app] = session
+
+    async def unsubscribe(self, uri: str, remote_app: t.Any) -> None:  # noqa: ANN401
+        subscription = self._subscriptions.get(uri)
+        if subscription is None:
+            return
+        subscription.subscribers.pop(remote_app, None)
+        if not subscription.subscribers and uri not in self._entries:
+            await self._release(subscription)
+
+    async def handle_notification(self, notification: types.ServerNotification) -> None:
+        if not isinstance(notification.root, types.ResourceUpdatedNotification):
+            return
+        uri = str(notification.root.params.uri)
+        self._entries.pop(uri, None)
+        subscription = self._subscriptions.get(uri)
+        if subscription is None:
+            return
+        subscription.generation += 1
+        if subscription.subscribers:
+            # Fan out off the upstream's receive loop so a slow downstream
+            # client cannot hold up the connector.
+            self._spawn(self._fan_out(uri, dict(subscription.subscribers)))
+
+    def detach(self, remote_app: t.Any) -> None:  # noqa: ANN401
+        """Forget a session that ended, moving its subscriptions elsewhere."""
+        for uri, subscription in list(self._subscriptions.items()):
+            subscription.subscribers.pop(remote_app, None)
+            if subscription.holder is not remote_app:
+                continue
+            # The upstream subscription dies with the session's upstream.
+            subscription.holder = None
+            subscription.generation += 1
+            self._entries.pop(uri, None)
+            if subscription.subscribers:
+                self._spawn(self._resubscribe(subscription))
+            else:
+                del self._subscriptions[uri]
+
+    async def _hold(self, uri: str, remote_app: t.Any) -> _Subscription:  # noqa: ANN401
+        subscription = self._subscriptions.get(uri)
+        if subscription is None:
+            subscription = self._subscriptions[uri] = _Subscription(uri)
+        async with subscription.lock:
+            if subscription.holder is None:
+                try:
+                    await remote_app.subscribe_resource(uri)
+                except BaseException:
+                    if not subscription.subscribers and subscription.holder is None:
+                        self._subscriptions.pop(uri, None)
+                    raise
+                subscription.holder = remote_app
+        return subscription
+
+    async def _release(self, subscription: _Subscription) -> None:
+        if self._subscriptions.get(subscription.uri) is subscription:
+            del self._subscriptions[subscription.uri]
+        holder, subscription.holder = subscription.holder, None
+        if holder is None:
+            return
+        try:
+            await holder.unsubscribe_resource(subscription.uri)
+        except Exception as err:
+            clog.info(f"Could not unsubscribe from {subscription.uri}: {err}")
+
+    async def _resubscribe(self, subscription: _Subscription) -> None:
+        for remote_app in list(subscription.subscribers):
+            try:
+                await self._hold(subscription.uri, remote_app)
+                return
+            except Exception as err:
+                clog.info(f"Could not move subscription to {subscription.uri}: {err}")
+
+    async def _fan_out(self, uri: str, subscribers: dict[t.Any, ServerSession]) -> None:
+        async def _notify(remote_app: t.Any, session: ServerSession) -> None:  # noqa: ANN401
+            try:
+                await session.send_resource_updated(uri)
+            except Exception as err:
+                clog.info(f"Dropping subscriber of {uri}: {err}")
+                await self.unsubscribe(uri, remote_app)
+
+        await asyncio.gather(*(_notify(app, session) for app, session in subscribers.items()))
+
+    def _store(self, uri: str, result: types.ReadResourceResult) -> None:
+        self._entries[uri] = (time.monotonic() + self.ttl, result)
+        self._entries.move_to_end(uri)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, uri: str) -> None:
+        """Drop an expired or evicted entry and the subscription kept for it."""
+        self._entries.pop(uri, None)
+        subscription = self._subscriptions.get(uri)
+        if subscription is not None and not subscription.subscribers:
+            self._spawn(self._release(subscription))
+
+    def _spawn(self, coro: t.Coroutine) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "subscriptions": len(self._subscriptions),
+            "subscribers": sum(len(s.subscribers) for s in self._subscriptions.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
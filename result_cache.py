@@ -0,0 +1,155 @@
+"""Opt-in cache for idempotent ``tools/call`` results.
+
+Caching is enabled per connector through ``configurations.result_cache`` in
+``mcp_tool_configuration``::
+
+    "result_cache": {"tools": {"search": 60, "lookup": true}, "read_only": true, "ttl": 30}
+
+``tools`` lists cacheable tools with an optional TTL, and ``read_only`` also
+caches every tool whose annotations carry ``readOnlyHint``. Entries are keyed
+by the connector's launch key (``session_pool.pool_key``, which covers the
+resolved credentials), the tool name and the canonicalized arguments, so one
+user's results are never served to another. The store is bounded by entry
+count and total bytes and evicts by TTL, then least recently used. Results
+are copied in and out, so a caller rewriting its response never alters what
+later callers are served.
+"""
+
+import json
+import time
+import typing as t
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from mcp import types
+
+from log.logWrapper import get_logger
+from metrics import RESULT_CACHE_LOOKUPS
+
+clog = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Which tools of one connector may be cached, and for how long."""
+
+    ttl: float
+    tools: dict[str, float] = field(default_factory=dict)
+    read_only: bool = False
+
+    @classmethod
+    def from_config(cls, config: t.Any, default_ttl: float, read_only: bool = False) -> "CachePolicy | None":  # noqa: ANN401
+        """Build a policy from ``configurations.result_cache``; ``None`` disables caching."""
+        if not config and not read_only:
+            return None
+        config = config if isinstance(config, dict) else {}
+        if config.get("enabled") is False:
+            return None
+        ttl = float(config.get("ttl", default_ttl))
+        tools = config.get("tools") or {}
+        if isinstance(tools, list):
+            tools = {name: True for name in tools}
+        return cls(
+            ttl=ttl,
+            tools={
+                name: ttl if value is True else float(value)
+                for name, value in tools.items()
+                if value
+            },
+            read_only=bool(config.get("read_only", read_only)),
+        )
+
+    def ttl_for(self, tool: types.Tool | None, name: str) -> float | None:
+        if name in self.tools:
+            return self.tools[name]
+        if self.read_only and tool is not None and tool.annotations is not None:
+            if tool.annotations.readOnlyHint:
+                return self.ttl
+        return None
+
+
+def canonical_arguments(arguments: dict | None) -> str:
+    return json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ResultCache:
+    """Process-wide LRU of tool results bounded by entries and bytes."""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (expires_at, size, result)
+        self._entries: OrderedDict[tuple, tuple[float, int, types.CallToolResult]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> types.CallToolResult | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._miss(key)
+            return None
+        expires_at, size, result = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self._miss(key)
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        RESULT_CACHE_LOOKUPS.inc(connector=key[0], outcome="hit")
+        # Callers may rewrite the result (e.g. spooling); hand out a copy.
+        return result.model_copy(deep=True)
+
+    def _miss(self, key: tuple) -> None:
+        self.misses += 1
+        RESULT_CACHE_LOOKUPS.inc(connector=key[0], outcome="miss")
+
+    def put(self, key: tuple, result: types.CallToolResult, ttl: float) -> None:
+        if result.isError or ttl <= 0:
+            return
+        size = len(result.model_dump_json(by_alias=True, exclude_none=True))
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, size, result.model_copy(deep=True))
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def invalidate_connector(self, connector: str) -> None:
+        for key in [key for key in self._entries if key[0] == connector]:
+            self._remove(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+        }
+
+
+class ToolResultCache:
+    """``ResultCache`` view for one connector launch key and policy."""
+
+    def __init__(self, store: ResultCache, connector: str, launch_key: str, policy: CachePolicy) -> None:
+        self.store = store
+        self.connector = connector
+        self.launch_key = launch_key
+        self.policy = policy
+
+    def key(self, name: str, arguments: dict | None) -> tuple:
+        return (self.connector, self.launch_key, name, canonical_arguments(arguments))
+
+    def ttl_for(self, tool: types.Tool | None, name: str) -> float | None:
+        return self.policy.ttl_for(tool, name)
@@ -9,17 +9,39 @@ from dotenv import load_dotenv
 load_dotenv()
 PREFIX_URL = os.getenv("PREFIX_URL")
 
+from settings import Settings
+
+settings = Settings.from_env()
+
 from starlette.applications import Starlette
 from mcp.server.sse import SseServerTransport
 from starlette.requests import Request
-from starlette.responses import JSONResponse, Response
+from starlette.responses import FileResponse, JSONResponse, PlainTextResponse, Response
 from starlette.routing import Mount, Route
 import uvicorn
 import asyncio
-
-from mcp.client.session import ClientSession
-from mcp.client.stdio import StdioServerParameters, stdio_client
-from proxy_server import create_proxy_server
+import contextlib
+import math
+
+from proxy_server import create_aggregate_server, create_proxy_server
+from admission import AdmissionController, AdmissionRejected
+from session_pool import SessionPool, pool_key
+from catalog_cache import CatalogCache
+from snapshot_store import SnapshotStore
+from upstream import LazyUpstream, UpstreamGroup
+from passthrough import PassthroughTransport
+from supervisor import ConnectionSupervisor
+from http_transport import StreamableHTTPEndpoint
+from result_cache import CachePolicy, ResultCache, ToolResultCache
+from payloads import PayloadGuard, peak_rss_bytes
+from multiplex import MultiplexPool
+from reaper import ProcessReaper
+from metrics import ACTIVE_SESSIONS, LIVE_PROCESSES, PEAK_RSS_BYTES, registry
+from worker_routing import WorkerMessageRouter, serve_workers
+from connector_cache import ConnectorConfigCache
+from launch_plan import LaunchPlanCache, compile_launch_plan
+from launchers import ContainerLauncher, Launchers
+from fair_share import FairShare, Rate, RateLimited, RateLimits, RequestGate
 from datetime import datetime
 
 from database.mongodb import AsyncMongoConnection
@@ -27,6 +49,45 @@ from database.mongodb import AsyncMongoConnection
 from log.logWrapper import get_logger
 clog = get_logger(__name__)
 
+connector_cache = ConnectorConfigCache(
+    get_database=lambda: AsyncMongoConnection().get_connection(db_name="genai_studio"),
+    ttl=settings.config_cache_ttl,
+    max_entries=settings.config_cache_size,
+    poll_interval=settings.config_poll_interval,
+    version_field=settings.config_version_field,
+    negative_ttl=settings.config_negative_ttl,
+)
+default_rate_limits = RateLimits(
+    user_requests=Rate(settings.user_request_rate, settings.user_request_burst),
+    user_sessions=Rate(settings.user_session_rate, settings.user_session_burst),
+    connector_requests=Rate(settings.connector_request_rate, settings.connector_request_burst),
+    connector_sessions=Rate(settings.connector_session_rate, settings.connector_session_burst),
+    concurrency=settings.fair_concurrency,
+    max_queue=settings.fair_queue_size,
+    queue_timeout=settings.fair_queue_timeout,
+)
+launch_plans = LaunchPlanCache(
+    max_entries=settings.config_cache_size, ttl=settings.config_cache_ttl
+)
+connector_cache.add_invalidation_listener(launch_plans.invalidate)
+launchers = Launchers(
+    {
+        "precreated": ContainerLauncher(
+            "precreated", warm=settings.container_warm, idle_ttl=settings.pool_idle_ttl
+        ),
+        "recycled": ContainerLauncher(
+            "recycled",
+            recycle=True,
+            warm=settings.container_warm,
+            max_uses=settings.container_max_uses,
+            idle_ttl=settings.pool_idle_ttl,
+        ),
+    },
+    default=settings.launcher,
+    choose=lambda tool_name: launcher_backend(tool_name),
+    clis=settings.container_clis,
+)
+
 
 async def check_liveness(request: Request):
     output_json = {"output": "success"}
@@ -54,28 +115,11 @@ def get_secret(key, alias_keys: list, secrets: dict):
     return None
 
 
-async def get_runtime_args_and_envs(
-    connection_details: list,
-    database,
+def get_runtime_args_and_envs(
+    secrets: dict,
     runtime_args_info: list[dict],
     envs_info: list[dict],
 ):
-    if not (runtime_args_info or envs_info):
-        return [], {}, []
-
-    tool_name = connection_details[0]
-    user_id = None
-    if len(connection_details) > 1:
-        user_id = connection_details[1]
-
-    mcp_cred_collection = database.get_collection("mcp_credentials")
-    filter_conditions = [{"tool_name": tool_name}]
-    if user_id:
-        filter_conditions.append({"user_id": user_id})
-
-    credentials = await mcp_cred_collection.find_one(filter={"$and": filter_conditions})
-    secrets = credentials.get("secrets", {})
-
     runtime_args = []
     for arg in runtime_args_info:
         arg_name = arg.get("name")
@@ -96,86 +140,497 @@ async def get_runtime_args_and_envs(
     return runtime_args, envs, env_args
 
 
-async def validate_configurations(connector_split, configuration, database):
+async def validate_configurations(
+    connector_split, configuration, config_cache, config_revision=None
+):
 
     if configuration.get("transport") == "stdio":
-        args = configuration.get("args", [])
         runtime_args_info = configuration.get("runtime_args", [])
         envs_info = configuration.get("env", [])
 
-        runtime_args, envs, env_args = await get_runtime_args_and_envs(
-            connector_split, database, runtime_args_info, envs_info
-        )
+        tool_name = connector_split[0]
+        user_id = None
+        if len(connector_split) > 1:
+            user_id = connector_split[1]
+
+        credentials = None
+        if runtime_args_info or envs_info:
+            credentials = await config_cache.get_credentials(tool_name, user_id)
+            if credentials is None:
+                # Launching without the secrets the connector declares would
+                # only fail later, inside the connector.
+                raise LookupError(f"No credentials for {tool_name} and user {user_id}")
+
+        revision = (config_revision, (credentials or {}).get(settings.config_version_field))
+        plan = launch_plans.get(tool_name, user_id, configuration, credentials, revision)
+        if plan is None:
+            runtime_args, envs, env_args = get_runtime_args_and_envs(
+                (credentials or {}).get("secrets", {}), runtime_args_info, envs_info
+            )
+            plan = compile_launch_plan(
+                configuration, runtime_args, envs, env_args, revision=revision
+            )
+            launch_plans.put(tool_name, user_id, configuration, credentials, plan)
+
+        return plan.to_params()
 
-        for env in env_args:
-            args.insert(-1, env)
+    return None
 
-        args.extend(runtime_args)
 
-        return StdioServerParameters(
-            command=configuration.get("command", ""), args=args, env=envs
-        )
+async def fetch_connector_details(connector_id: str):
+    """Launch parameters for ``connector_id``.
+
+    Raises ``LookupError`` for an unknown or unusable connector; failures of
+    the configuration store propagate so callers can answer with a 5xx.
+    """
+    connector_split = connector_id.split("-", 2)
+    tool_config = await connector_cache.get_tool_config(connector_split[0])
+
+    if not tool_config:
+        raise LookupError(f"Invalid connector id: {connector_id}")
+
+    config = await validate_configurations(
+        connector_split,
+        tool_config.get("configurations", {}),
+        config_cache=connector_cache,
+        config_revision=tool_config.get(settings.config_version_field),
+    )
 
-    return None
+    if not config:
+        raise LookupError(f"Invalid connector id: {connector_id}")
+    return config
 
 
-async def fetch_connector_details(connector_id: str):
+async def uses_passthrough(connector_id: str) -> bool:
+    """Whether the connector opted into raw JSON-RPC passthrough."""
+    if settings.passthrough:
+        return True
+    tool_config = await connector_cache.get_tool_config(connector_id.split("-", 2)[0])
+    return bool((tool_config or {}).get("configurations", {}).get("passthrough"))
 
-    try:
-        database = await AsyncMongoConnection().get_connection(db_name="genai_studio")
-        connector_split = connector_id.split("-", 2)
-        collection = database.get_collection("mcp_tool_configuration")
-        tool_config = await collection.find_one(filter={"name": connector_split[0]})
 
-        if not tool_config:
-            raise ValueError(f"Invalid connector id: {connector_id}")
+async def multiplex_settings(tool_name: str) -> dict | None:
+    """Shared-upstream settings if the connector is stateless and opted in."""
+    tool_config = await connector_cache.get_tool_config(tool_name)
+    setting = (tool_config or {}).get("configurations", {}).get("multiplex")
+    if not setting:
+        return None
+    setting = setting if isinstance(setting, dict) else {}
+    return {
+        "sessions": int(setting.get("sessions", settings.multiplex_sessions)),
+        "max_inflight": int(setting.get("max_inflight", settings.multiplex_max_inflight)),
+    }
 
-        config = await validate_configurations(
-            connector_split, tool_config.get("configurations", {}), database=database
-        )
 
-        if not config:
-            raise ValueError(f"Invalid connector id: {connector_id}")
-        return config
-    except Exception as err:
-        clog.info(str(err))
+async def launcher_backend(tool_name: str) -> str | None:
+    """Launcher backend the connector asked for, if any."""
+    tool_config = await connector_cache.get_tool_config(tool_name)
+    return (tool_config or {}).get("configurations", {}).get("launcher")
+
+
+async def prepare_launch(stdio_params, tool_name: str) -> None:
+    """Start creating containers for a connection that has been admitted."""
+    launchers.prepare(stdio_params, await launcher_backend(tool_name))
+
+
+async def rate_limits(tool_name: str) -> RateLimits:
+    """Rate limits of the connector, over the ``MCP_*_RATE`` defaults."""
+    tool_config = await connector_cache.get_tool_config(tool_name)
+    return RateLimits.from_config(
+        (tool_config or {}).get("configurations", {}).get("rate_limits"), default_rate_limits
+    )
+
 
+def retry_later(err: AdmissionRejected) -> JSONResponse:
+    """503 or 429 with a ``Retry-After`` hint for connections turned away.
+
+    Connections refused for lack of process capacity get 503; those refused
+    by a rate limit get 429 and the limit's scope.
+    """
+    retry_after = max(math.ceil(err.retry_after), 1)
+    content = {"output": "failure", "message": str(err), "retry_after": retry_after}
+    if isinstance(err, RateLimited):
+        content["scope"] = err.scope
+    return JSONResponse(
+        content=content,
+        status_code=429 if isinstance(err, RateLimited) else 503,
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+def connector_error(err: Exception) -> JSONResponse:
+    """Map a failure to open a connector session to an HTTP response."""
+    if isinstance(err, AdmissionRejected):
+        return retry_later(err)
+    if isinstance(err, LookupError):
+        status_code = 404
+    elif isinstance(err, ValueError):
+        status_code = 400
+    else:
+        status_code = 502
+    return JSONResponse(
+        content={"output": "failure", "message": str(err)}, status_code=status_code
+    )
 
-async def monitor_disconnect(request: Request):
-    """Monitors the request connection and returns when disconnected."""
-    while True:
-        if await request.is_disconnected():
-            clog.info("Client disconnected detected by monitor.")
-            return
-        # Check connection status periodically
-        await asyncio.sleep(1)
 
+def create_starlette_app(
+    debug: bool = False, worker_id: int = 0, worker_count: int = 1
+) -> Starlette:
+    """Create a Starlette application that can server the provied mcp server with SSE.
 
-def create_starlette_app(debug: bool = False) -> Starlette:
-    """Create a Starlette application that can server the provied mcp server with SSE."""
+    Message endpoints embed ``worker_id`` so that, with several workers, a POST
+    can be forwarded to the worker that owns the SSE session.
+    """
     MESSAGES_PATH = f"{PREFIX_URL}/messages/"
-    sse = SseServerTransport(MESSAGES_PATH)
+    RAW_MESSAGES_PATH = f"{PREFIX_URL}/raw-messages/"
+    admission = AdmissionController(
+        max_processes=settings.max_processes,
+        max_per_connector=settings.max_processes_per_connector,
+        max_queue=settings.admission_queue_size,
+        queue_timeout=settings.admission_timeout,
+        spawn_rate=settings.spawn_rate,
+        spawn_burst=settings.spawn_burst,
+    )
+    reaper = ProcessReaper(grace=settings.reaper_grace, batch_size=settings.reaper_batch_size)
+    fair_share = FairShare()
+    sse = SseServerTransport(f"{MESSAGES_PATH}{worker_id}/")
+    passthrough = PassthroughTransport(
+        f"{RAW_MESSAGES_PATH}{worker_id}/",
+        admission=admission,
+        reaper=reaper,
+        launcher=launchers,
+    )
+    message_router = WorkerMessageRouter(
+        sse.handle_post_message, worker_id, worker_count, settings.worker_socket_dir
+    )
+    raw_message_router = WorkerMessageRouter(
+        passthrough.handle_post_message, worker_id, worker_count, settings.worker_socket_dir
+    )
+    payloads = PayloadGuard(
+        threshold=settings.spool_threshold,
+        directory=settings.spool_dir,
+        url_prefix=f"{settings.spool_base_url}{PREFIX_URL}/spool/{worker_id}/",
+        ttl=settings.spool_ttl,
+        max_bytes=settings.payload_budget,
+        max_session_bytes=settings.session_payload_budget,
+    )
+    session_pool = SessionPool(
+        min_size=settings.pool_min_size,
+        max_size=settings.pool_max_size,
+        idle_ttl=settings.pool_idle_ttl,
+        admission=admission,
+        reaper=reaper,
+        launcher=launchers,
+        max_frame_bytes=payloads.frame_limit,
+    )
+    multiplex_pool = MultiplexPool(
+        admission=admission,
+        reaper=reaper,
+        idle_ttl=settings.pool_idle_ttl,
+        launcher=launchers,
+        max_frame_bytes=payloads.frame_limit,
+    )
+    supervisor = ConnectionSupervisor()
+    catalogs = CatalogCache(
+        max_entries=settings.config_cache_size,
+        ttl=settings.catalog_cache_ttl,
+        resource_entries=settings.resource_cache_size,
+        resource_ttl=settings.resource_cache_ttl,
+        page_size=settings.list_page_size,
+        completion_entries=settings.completion_cache_size,
+        completion_ttl=settings.completion_cache_ttl,
+    )
+    snapshots = SnapshotStore(
+        get_database=connector_cache.database,
+        max_entries=settings.config_cache_size,
+        ttl=settings.config_cache_ttl,
+    )
+    connector_cache.add_invalidation_listener(snapshots.invalidate_tool)
+    result_cache = ResultCache(
+        max_entries=settings.result_cache_size, max_bytes=settings.result_cache_bytes
+    )
+    connector_cache.add_invalidation_listener(result_cache.invalidate_connector)
+
+    async def serve_spooled(scope, receive, send):
+        spooled = payloads.file(scope["path_params"]["token"])
+        if spooled is None:
+            response = Response("Not found", status_code=404)
+        else:
+            path, media_type = spooled
+            response = FileResponse(path, media_type=media_type)
+        await response(scope, receive, send)
+
+    spool_router = WorkerMessageRouter(
+        serve_spooled, worker_id, worker_count, settings.worker_socket_dir
+    )
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette):
+        await connector_cache.start()
+        try:
+            yield
+        finally:
+            await connector_cache.close()
+            await session_pool.close()
+            await multiplex_pool.close()
+            await reaper.close()
+            await launchers.close()
+            await message_router.close()
+            await raw_message_router.close()
+            await streamable_http.close()
+            await aggregate_http.close()
+            await spool_router.close()
+            await payloads.close()
+
+    async def admit_session(connector_id: str) -> RequestGate:
+        """Take a session token for the connector's user.
+
+        Returns the gate for the session's requests; raises ``RateLimited``
+        when the user or the connector is over its session rate.
+        """
+        connector_split = connector_id.split("-", 2)
+        tool_name = connector_split[0]
+        user_id = connector_split[1] if len(connector_split) > 1 else ""
+        limits = await rate_limits(tool_name)
+        fair_share.admit_session(tool_name, user_id, limits)
+        return fair_share.gate(tool_name, user_id, limits)
+
+    async def open_upstream(connector_id: str, stdio_params, tool_name: str):
+        """Prepare the upstream for one downstream session.
+
+        Returns ``(upstream, remote_app, initialize_result, catalog)``.
+        """
+        key = pool_key(stdio_params)
+        catalog = catalogs.catalog(key)
+
+        def on_upstream_start(live):
+            live.add_listener(catalog.handle_notification)
+            snapshots.capture(
+                key, tool_name, live.initialize_result, catalog, live.session
+            )
+
+        snapshot = await snapshots.get(key) if settings.lazy_spawn else None
+        multiplex = await multiplex_settings(tool_name)
+        if multiplex is not None:
+            # Stateless connector: borrow shared upstreams per request.
+            shared = multiplex_pool.session(
+                stdio_params, tool_name, on_start=on_upstream_start, **multiplex
+            )
+            if snapshot is not None:
+                snapshot.seed(catalog)
+                return shared, shared, snapshot.initialize_result, catalog
+            try:
+                return shared, shared, await shared.ready(), catalog
+            except Exception as err:
+                await shared.close()
+                if isinstance(err, AdmissionRejected):
+                    raise
+                clog.info(f"Could not start upstream for connector {connector_id}: {err}")
+                raise RuntimeError(f"Could not start connector: {connector_id}") from err
+
+        if snapshot is not None:
+            # Serve the handshake and listings from the snapshot; the
+            # process is only spawned for a call that needs it.
+            snapshot.seed(catalog)
+            upstream = LazyUpstream(
+                lambda: session_pool.acquire(stdio_params, tool_name),
+                on_start=on_upstream_start,
+            )
+            return upstream, upstream, snapshot.initialize_result, catalog
+
+        try:
+            upstream = await session_pool.acquire(stdio_params, tool_name)
+        except AdmissionRejected:
+            raise
+        except Exception as err:
+            clog.info(f"Could not start upstream for connector {connector_id}: {err}")
+            raise RuntimeError(f"Could not start connector: {connector_id}") from err
+        on_upstream_start(upstream)
+        return upstream, upstream.session, upstream.initialize_result, catalog
+
+    async def spool_threshold(tool_name: str) -> int:
+        """Spool threshold for the connector, or 0 if it did not opt in."""
+        tool_config = await connector_cache.get_tool_config(tool_name)
+        return payloads.threshold_for((tool_config or {}).get("configurations", {}).get("spool"))
+
+    async def tool_result_cache(stdio_params, tool_name: str):
+        """Result cache view for the connector, or ``None`` if it did not opt in."""
+        tool_config = await connector_cache.get_tool_config(tool_name)
+        policy = CachePolicy.from_config(
+            (tool_config or {}).get("configurations", {}).get("result_cache"),
+            default_ttl=settings.result_cache_ttl,
+            read_only=settings.result_cache_read_only,
+        )
+        if policy is None:
+            return None
+        return ToolResultCache(result_cache, tool_name, pool_key(stdio_params), policy)
+
+    async def open_http_session(connector_id: str):
+        stdio_params = await fetch_connector_details(connector_id)
+        tool_name = connector_id.split("-", 2)[0]
+        gate = await admit_session(connector_id)
+        await prepare_launch(stdio_params, tool_name)
+        upstream, remote_app, initialize_result, catalog = await open_upstream(
+            connector_id, stdio_params, tool_name
+        )
+        try:
+            mcp_server = await create_proxy_server(
+                remote_app,
+                initialize_result,
+                catalog,
+                tool_name,
+                await tool_result_cache(stdio_params, tool_name),
+                payloads,
+                settings.progress_rate,
+                settings.session_max_inflight,
+                gate,
+                await spool_threshold(tool_name),
+            )
+        except BaseException:
+            await upstream.close()
+            raise
+        return mcp_server, upstream, tool_name
+
+    async def open_aggregate_session(connector_ids: str):
+        """Open the comma-separated connectors in parallel and serve them as one.
+
+        Each connector's tools and prompts are namespaced by its tool name, so
+        the connectors must be distinct tools. Connect time is that of the
+        slowest connector; if any of them fails, the others are closed again.
+        """
+        ids = [connector_id for connector_id in (connector_ids or "").split(",") if connector_id]
+        names = [connector_id.split("-", 2)[0] for connector_id in ids]
+        if not 0 < len(ids) <= settings.aggregate_max_connectors:
+            raise ValueError(f"Expected 1 to {settings.aggregate_max_connectors} connector ids")
+        if len(set(names)) < len(names):
+            raise ValueError(f"Connectors of an aggregate must be distinct tools: {connector_ids}")
+        opened = await asyncio.gather(
+            *(open_http_session(connector_id) for connector_id in ids), return_exceptions=True
+        )
+        failed = [result for result in opened if isinstance(result, BaseException)]
+        if failed:
+            await asyncio.gather(
+                *(result[1].close() for result in opened if not isinstance(result, BaseException))
+            )
+            raise failed[0]
+        members = {tool_name: mcp_server for mcp_server, _, tool_name in opened}
+        upstream = UpstreamGroup([upstream for _, upstream, _ in opened])
+        return create_aggregate_server(members, settings.aggregate_separator), upstream, "aggregate"
+
+    streamable_http = StreamableHTTPEndpoint(
+        open_http_session,
+        connector_error,
+        worker_id=worker_id,
+        worker_count=worker_count,
+        socket_dir=settings.worker_socket_dir,
+        json_response=settings.http_json_response,
+        idle_ttl=settings.http_session_ttl,
+        max_events=settings.http_event_buffer,
+    )
+    aggregate_http = StreamableHTTPEndpoint(
+        open_aggregate_session,
+        connector_error,
+        worker_id=worker_id,
+        worker_count=worker_count,
+        socket_dir=settings.worker_socket_dir,
+        json_response=settings.http_json_response,
+        idle_ttl=settings.http_session_ttl,
+        max_events=settings.http_event_buffer,
+    )
+
+    async def check_admission(request: Request):
+        return JSONResponse(
+            content={
+                "admission": admission.stats(),
+                "pool": session_pool.stats(),
+                "multiplex": multiplex_pool.stats(),
+                "connections": supervisor.stats(),
+                "reaper": reaper.stats(),
+                "launchers": launchers.stats(),
+                "fair_share": fair_share.stats(),
+                "streamable_http": streamable_http.stats(),
+                "aggregate_http": aggregate_http.stats(),
+                "result_cache": result_cache.stats(),
+                "catalogs": catalogs.stats(),
+                "payloads": payloads.stats(),
+            },
+            status_code=200,
+        )
+
+    async def check_metrics(request: Request):
+        LIVE_PROCESSES.replace(
+            {
+                (("connector", connector),): float(count)
+                for connector, count in admission.stats()["per_connector"].items()
+            }
+        )
+        PEAK_RSS_BYTES.set(peak_rss_bytes())
+        return PlainTextResponse(
+            registry.render(), media_type="text/plain; version=0.0.4"
+        )
 
     async def handle_sse(request: Request) -> Response:
 
-        async with sse.connect_sse(
-            request.scope,
-            request.receive,
-            request._send,
-        ) as (read_stream, write_stream):
-            clog.info(f"[DEBUG] SSE connection established")
-            connector_id = request.path_params.get("connector_id")
-            clog.info(f"Connector ID: {connector_id}")
+        connector_id = request.path_params.get("connector_id")
+        clog.info(f"Connector ID: {connector_id}")
+        try:
             stdio_params = await fetch_connector_details(connector_id)
-            streams = None  # Initialize streams to None for finally block safety
+        except Exception as err:
+            clog.info(f"Connector lookup failed for {connector_id}: {err}")
+            return connector_error(err)
+        tool_name = connector_id.split("-", 2)[0]
+        try:
+            gate = await admit_session(connector_id)
+        except RateLimited as err:
+            return retry_later(err)
+        await prepare_launch(stdio_params, tool_name)
+
+        if await uses_passthrough(connector_id):
             try:
-                async with stdio_client(stdio_params) as streams_tuple, ClientSession(
-                    *streams_tuple
-                ) as session:
-                    streams = streams_tuple  # Assign streams once context is entered successfully
-                    mcp_server = await create_proxy_server(session)
+                return await passthrough.handle_sse(
+                    request,
+                    stdio_params,
+                    tool_name,
+                    gate,
+                    settings.session_max_inflight,
+                    settings.session_max_queued,
+                )
+            except AdmissionRejected as err:
+                return retry_later(err)
+
+        # Admission happens before the SSE stream opens so that a rejected
+        # connection still gets a proper 503 with Retry-After.
+        try:
+            upstream, remote_app, initialize_result, catalog = await open_upstream(
+                connector_id, stdio_params, tool_name
+            )
+        except Exception as err:
+            return connector_error(err)
+
+        receive, connection = supervisor.attach(request.receive, connector_id)
+        ACTIVE_SESSIONS.inc(connector=tool_name, transport="sse")
+        try:
+            async with sse.connect_sse(
+                request.scope,
+                receive,
+                request._send,
+            ) as (read_stream, write_stream):
+                clog.info(f"[DEBUG] SSE connection established")
+                try:
+                    mcp_server = await create_proxy_server(
+                        remote_app,
+                        initialize_result,
+                        catalog,
+                        tool_name,
+                        await tool_result_cache(stdio_params, tool_name),
+                        payloads,
+                        settings.progress_rate,
+                        settings.session_max_inflight,
+                        gate,
+                        await spool_threshold(tool_name),
+                    )
 
-                    # Create tasks for the server logic and the disconnect monitor
+                    # Run the server logic; the supervisor cancels it on disconnect
                     server_task = asyncio.create_task(
                         mcp_server.run(
                             read_stream,
@@ -203,86 +658,110 @@ def create_starlette_app(debug: bool = False) -> Starlette:
                     # check sse.py for more details
                     ########################################################
 
-                    monitor_task = asyncio.create_task(monitor_disconnect(request))
-                    # Wait for either the server task or the monitor task to complete
-                    done, pending = await asyncio.wait(
-                        {server_task, monitor_task}, return_when=asyncio.FIRST_COMPLETED
-                    )
-
-                    # If the monitor finished first, it means the client disconnected
-                    if monitor_task in done:
-                        clog.info(f"Disconnect monitor finished for connector {connector_id}. Cancelling server task...")
-                        server_task.cancel()
-                        # Await the cancellation to ensure cleanup happens
-                        try:
-                            await server_task
-                        except asyncio.CancelledError:
-                            clog.info(
-                                "Server task cancelled successfully due to disconnect."
-                            )
-                        except Exception as e_cancel:
-                            # Log errors during cancellation itself if necessary
-                            clog.info(f"Error during server task cancellation: {e_cancel}")
-                    else:
-                        # Server task finished (normally or with error), cancel the monitor
-                        monitor_task.cancel()
-                        try:
-                            await monitor_task  # Allow monitor task to clean up
-                        except asyncio.CancelledError:
-                            pass  # Expected cancellation
-                        # If server task finished with an error, retrieve and potentially raise it
-                        if server_task in done:
-                            exc = server_task.exception()
-                            if exc:
-                                clog.info(f"Server task finished with exception: {str(exc)}")
-                                # raise exc  # Propagate the original server error
+                    connection.bind(server_task)
+                    try:
+                        await server_task
+                    except asyncio.CancelledError:
+                        if not connection.disconnected:
+                            server_task.cancel()
+                            raise
+                        clog.info(
+                            f"Server task for connector {connector_id} cancelled due to disconnect."
+                        )
 
                     ############## comment ends here ##############
 
-            except Exception as e:
-                # Catches exceptions during setup, server run, cancellation, or disconnect
-                clog.info(
-                    f"Error in session or connection handling of connector {connector_id}: {str(e)}"
-                )
-                # If server_task exists and was cancelled, this might catch CancelledError
-                # or the original exception if server_task failed before cancellation.
-            finally:
-                # This block now reliably executes after disconnection or task completion/error
-                clog.info("Executing finally block for cleanup.")
-                # Ensure process is terminated if it's still running
-                # Check if streams was successfully assigned before trying to access it
-                if streams and hasattr(streams[0], "process") and streams[0].process:
-                    if streams[0].process.returncode is None:
-                        clog.info(f"Terminating process for {connector_id}")
-                        streams[0].process.terminate()
-                        try:
-                            # Use asyncio.wait_for for timeout with process wait
-                            await asyncio.wait_for(
-                                streams[0].process.wait(), timeout=5.0
-                            )
-                            clog.info(f"Process for {connector_id} terminated gracefully.")
-                        except asyncio.TimeoutError:
-                            clog.info(
-                                f"Forcibly killing process for {connector_id} after timeout."
-                            )
-                            streams[0].process.kill()
-                        except ProcessLookupError:
-                            clog.info(f"Process for {connector_id} already terminated.")
-                        except Exception as e_term:
-                            clog.info(f"Error during process termination: {e_term}")
-                else:
+                except Exception as e:
+                    # Catches exceptions during setup, server run, cancellation, or disconnect
                     clog.info(
-                        "No process found associated with streams or streams not initialized."
+                        f"Error in session or connection handling of connector {connector_id}: {str(e)}"
+                    )
+                    # If server_task exists and was cancelled, this might catch CancelledError
+                    # or the original exception if server_task failed before cancellation.
+                return Response()
+        finally:
+            # This block now reliably executes after disconnection or task completion/error
+            clog.info("Executing finally block for cleanup.")
+            # Pooled sessions are single-use; closing hands the process back to
+            # its holder task, which terminates it without blocking this handler.
+            connection.close()
+            ACTIVE_SESSIONS.dec(connector=tool_name, transport="sse")
+            clog.info(f"Releasing upstream session for {connector_id}")
+            await upstream.close()
+
+    async def handle_aggregate_sse(request: Request) -> Response:
+        connector_ids = request.path_params.get("connector_id")
+        clog.info(f"Aggregate connector IDs: {connector_ids}")
+        try:
+            mcp_server, upstream, name = await open_aggregate_session(connector_ids)
+        except Exception as err:
+            return connector_error(err)
+
+        receive, connection = supervisor.attach(request.receive, connector_ids)
+        ACTIVE_SESSIONS.inc(connector=name, transport="sse")
+        try:
+            async with sse.connect_sse(request.scope, receive, request._send) as (
+                read_stream,
+                write_stream,
+            ):
+                server_task = asyncio.create_task(
+                    mcp_server.run(
+                        read_stream,
+                        write_stream,
+                        mcp_server.create_initialization_options(),
                     )
+                )
+                connection.bind(server_task)
+                try:
+                    await server_task
+                except asyncio.CancelledError:
+                    if not connection.disconnected:
+                        server_task.cancel()
+                        raise
+                    clog.info(f"Aggregate server task for {connector_ids} cancelled due to disconnect.")
             return Response()
+        finally:
+            connection.close()
+            ACTIVE_SESSIONS.dec(connector=name, transport="sse")
+            await upstream.close()
 
     return Starlette(
         debug=debug,
+        lifespan=lifespan,
         routes=[
             Route(f"{PREFIX_URL}/ready", endpoint=check_readiness, methods=["GET"]),
             Route(f"{PREFIX_URL}/live", endpoint=check_readiness, methods=["GET"]),
+            Route(f"{PREFIX_URL}/admission", endpoint=check_admission, methods=["GET"]),
+            Route(f"{PREFIX_URL}/metrics", endpoint=check_metrics, methods=["GET"]),
             Route(PREFIX_URL + "/sse/{connector_id}", endpoint=handle_sse),
+            Route(PREFIX_URL + "/sse/aggregate/{connector_id}", endpoint=handle_aggregate_sse),
+            Route(
+                PREFIX_URL + "/mcp/aggregate/{connector_id}",
+                endpoint=aggregate_http,
+                methods=["GET", "POST", "DELETE"],
+            ),
+            Route(
+                PREFIX_URL + "/mcp/{connector_id}",
+                endpoint=streamable_http,
+                methods=["GET", "POST", "DELETE"],
+            ),
+            Route(
+                MESSAGES_PATH + "{worker_id:int}/",
+                endpoint=message_router,
+                methods=["POST"],
+            ),
+            Route(
+                RAW_MESSAGES_PATH + "{worker_id:int}/",
+                endpoint=raw_message_router,
+                methods=["POST"],
+            ),
+            Route(
+                PREFIX_URL + "/spool/{worker_id:int}/{token}",
+                endpoint=spool_router,
+                methods=["GET"],
+            ),
             Mount(MESSAGES_PATH, app=sse.handle_post_message),
+            Mount(RAW_MESSAGES_PATH, app=passthrough.handle_post_message),
         ],
     )
 
@@ -294,11 +773,25 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run MCP SSE-based server")
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
     parser.add_argument("--port", type=int, default=8200, help="Port to listen on")
+    parser.add_argument(
+        "--workers", type=int, default=settings.workers, help="Number of worker processes"
+    )
     args = parser.parse_args()
 
-    # Bind SSE request handling to MCP server
-    starlette_app = create_starlette_app(debug=True)
-    uvicorn.run(starlette_app, host=args.host, port=args.port)
+    if args.workers > 1:
+        serve_workers(
+            lambda worker_id, worker_count: create_starlette_app(
+                debug=True, worker_id=worker_id, worker_count=worker_count
+            ),
+            host=args.host,
+            port=args.port,
+            worker_count=args.workers,
+            socket_dir=settings.worker_socket_dir,
+        )
+    else:
+        # Bind SSE request handling to MCP server
+        starlette_app = create_starlette_app(debug=True)
+        uvicorn.run(starlette_app, host=args.host, port=args.port)
 
 
 # #################### below code is used to handle sse error with return Response(), monitor process is commented with this
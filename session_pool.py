@@ -0,0 +1,177 @@
+"""Warm pool of pre-spawned, initialized stdio MCP sessions.
+
+Sessions are keyed by the fully resolved launch parameters (command, args,
+env and cwd), so a warm process is only ever handed to a connection that
+would have launched the exact same process with the exact same credentials.
+Stdio servers are stateful, which makes every pooled session single-use: it
+is handed out once and a replacement is spawned in the background.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+from mcp.client.stdio import StdioServerParameters
+
+from admission import AdmissionController
+from launch_plan import pool_key
+from launchers import Launchers
+from reaper import ProcessReaper
+from upstream import UpstreamSession
+from log.logWrapper import get_logger
+
+clog = get_logger(__name__)
+
+
+class _Bucket:
+    def __init__(self, params: StdioServerParameters, connector: str, target: int) -> None:
+        self.params = params
+        self.connector = connector
+        self.idle: deque[UpstreamSession] = deque()
+        self.spawning = 0
+        self.target = target
+        # Set once a refill has made a session ready for this key.
+        self.warmed = False
+        self.last_used = time.monotonic()
+        self.refill_task: asyncio.Task | None = None
+
+
+class SessionPool:
+    """Connector-keyed pool of warm ``UpstreamSession`` objects.
+
+    A key starts warming on its first ``acquire``. Each bucket keeps
+    ``min_size`` idle sessions ready and grows towards ``max_size`` when
+    connections arrive faster than the refill can keep up. Buckets that see
+    no traffic for ``idle_ttl`` seconds are drained.
+
+    With an ``admission`` controller, cold spawns wait for capacity while
+    refills only use spare capacity and never queue. With a ``reaper``,
+    closed sessions hand their processes to it instead of waiting on them.
+    Sessions drop a server whose messages exceed ``max_frame_bytes``.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 1,
+        max_size: int = 4,
+        idle_ttl: float = 300.0,
+        admission: AdmissionController | None = None,
+        reaper: ProcessReaper | None = None,
+        launcher: Launchers | None = None,
+        max_frame_bytes: int = 0,
+    ) -> None:
+        self.min_size = max(min_size, 0)
+        self.max_size = max(max_size, self.min_size)
+        self.idle_ttl = idle_ttl
+        self.admission = admission
+        self.reaper = reaper
+        self.launcher = launcher
+        self.max_frame_bytes = max_frame_bytes
+        self._buckets: dict[str, _Bucket] = {}
+        self._sweeper: asyncio.Task | None = None
+
+    async def acquire(self, params: StdioServerParameters, connector: str = "") -> UpstreamSession:
+        """Return an initialized session, warm if one is available.
+
+        Raises ``AdmissionRejected`` when a cold spawn is not admitted.
+        """
+        key = pool_key(params)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(params, connector, self.min_size)
+        bucket.last_used = time.monotonic()
+        self._ensure_sweeper()
+
+        while bucket.idle:
+            upstream = bucket.idle.popleft()
+            if upstream.alive:
+                self._schedule_refill(key, bucket)
+                return upstream
+            await upstream.close()
+
+        if bucket.warmed:
+            # The warm set ran dry: demand is outpacing the refill, so keep
+            # more ready. A first miss only starts warming ``min_size``.
+            bucket.target = min(bucket.target + 1, self.max_size)
+        self._schedule_refill(key, bucket)
+        slot = await self.admission.acquire(connector) if self.admission else None
+        try:
+            return await UpstreamSession(
+                params, slot, self.reaper, connector, self.launcher, self.max_frame_bytes
+            ).start()
+        except BaseException:
+            if slot is not None:
+                slot.release()
+            raise
+
+    def _schedule_refill(self, key: str, bucket: _Bucket) -> None:
+        if bucket.refill_task is None or bucket.refill_task.done():
+            bucket.refill_task = asyncio.create_task(self._refill(key, bucket))
+
+    async def _refill(self, key: str, bucket: _Bucket) -> None:
+        while len(bucket.idle) + bucket.spawning < bucket.target:
+            slot = None
+            if self.admission is not None:
+                slot = self.admission.try_acquire(bucket.connector)
+                if slot is None:
+                    return
+            bucket.spawning += 1
+            try:
+                upstream = await UpstreamSession(
+                    bucket.params,
+                    slot,
+                    self.reaper,
+                    bucket.connector,
+                    self.launcher,
+                    self.max_frame_bytes,
+                ).start()
+            except Exception as err:
+                if slot is not None:
+                    slot.release()
+                clog.info(f"Warm pool refill failed for {bucket.params.command}: {err}")
+                return
+            finally:
+                bucket.spawning -= 1
+            if self._buckets.get(key) is not bucket:
+                await upstream.close()
+                return
+            bucket.idle.append(upstream)
+            bucket.warmed = True
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def _sweep(self) -> None:
+        interval = max(min(self.idle_ttl / 2, 30.0), 1.0)
+        while self._buckets:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for key, bucket in list(self._buckets.items()):
+                if now - bucket.last_used > self.idle_ttl:
+                    del self._buckets[key]
+                    await self._drain(bucket)
+                elif bucket.target > self.min_size:
+                    bucket.target -= 1
+                    while len(bucket.idle) > bucket.target:
+                        await bucket.idle.pop().close()
+
+    async def _drain(self, bucket: _Bucket) -> None:
+        if bucket.refill_task is not None:
+            bucket.refill_task.cancel()
+        while bucket.idle:
+            await bucket.idle.popleft().close()
+
+    def stats(self) -> dict:
+        return {
+            "buckets": len(self._buckets),
+            "idle": sum(len(b.idle) for b in self._buckets.values()),
+            "spawning": sum(b.spawning for b in self._buckets.values()),
+        }
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        buckets, self._buckets = list(self._buckets.values()), {}
+        for bucket in buckets:
+            await self._drain(bucket)
@@ -0,0 +1,105 @@
+"""Proxy settings read from ``MCP_*`` environment variables.
+
+Each field names its variable and default; ``Settings.from_env`` parses the
+environment once at startup so the rest of the proxy reads typed values from
+a single object instead of module-level constants.
+"""
+
+import dataclasses
+import os
+import typing as t
+
+
+def _env(name: str, default: t.Any) -> t.Any:  # noqa: ANN401
+    return dataclasses.field(default=default, metadata={"env": name})
+
+
+def _parse(raw: str, kind: t.Any) -> t.Any:  # noqa: ANN401
+    if kind is bool:
+        return raw.lower() in ("1", "true", "yes")
+    if kind is int:
+        return int(raw)
+    if kind is float or kind == float | None:
+        return float(raw)
+    if kind == tuple[str, ...]:
+        return tuple(item for item in raw.split(",") if item)
+    return raw
+
+
+@dataclasses.dataclass(frozen=True)
+class Settings:
+    """Tunables for pooling, admission, caching and rate limiting."""
+
+    pool_min_size: int = _env("MCP_POOL_MIN_SIZE", 1)
+    pool_max_size: int = _env("MCP_POOL_MAX_SIZE", 4)
+    pool_idle_ttl: float = _env("MCP_POOL_IDLE_TTL", 300.0)
+    config_cache_ttl: float = _env("MCP_CONFIG_CACHE_TTL", 300.0)
+    config_cache_size: int = _env("MCP_CONFIG_CACHE_SIZE", 1024)
+    config_poll_interval: float = _env("MCP_CONFIG_POLL_INTERVAL", 5.0)
+    config_version_field: str = _env("MCP_CONFIG_VERSION_FIELD", "updated_at")
+    config_negative_ttl: float = _env("MCP_CONFIG_NEGATIVE_TTL", 5.0)
+    catalog_cache_ttl: float = _env("MCP_CATALOG_CACHE_TTL", 300.0)
+    lazy_spawn: bool = _env("MCP_LAZY_SPAWN", True)
+    passthrough: bool = _env("MCP_PASSTHROUGH", False)
+    workers: int = _env("MCP_WORKERS", 1)
+    worker_socket_dir: str = _env("MCP_WORKER_SOCKET_DIR", "/tmp/mcp-workers")
+    max_processes: int = _env("MCP_MAX_PROCESSES", 0)
+    max_processes_per_connector: int = _env("MCP_MAX_PROCESSES_PER_CONNECTOR", 0)
+    admission_queue_size: int = _env("MCP_ADMISSION_QUEUE_SIZE", 100)
+    admission_timeout: float = _env("MCP_ADMISSION_TIMEOUT", 10.0)
+    spawn_rate: float = _env("MCP_SPAWN_RATE", 0.0)
+    spawn_burst: float | None = _env("MCP_SPAWN_BURST", None)
+    http_json_response: bool = _env("MCP_HTTP_JSON_RESPONSE", True)
+    http_session_ttl: float = _env("MCP_HTTP_SESSION_TTL", 300.0)
+    http_event_buffer: int = _env("MCP_HTTP_EVENT_BUFFER", 256)
+    list_page_size: int = _env("MCP_LIST_PAGE_SIZE", 0)
+    resource_cache_size: int = _env("MCP_RESOURCE_CACHE_SIZE", 256)
+    resource_cache_ttl: float = _env("MCP_RESOURCE_CACHE_TTL", 300.0)
+    spool_threshold: int = _env("MCP_SPOOL_THRESHOLD", 1024 * 1024)
+    spool_dir: str = _env("MCP_SPOOL_DIR", "/tmp/mcp-spool")
+    spool_ttl: float = _env("MCP_SPOOL_TTL", 600.0)
+    spool_base_url: str = _env("MCP_SPOOL_BASE_URL", "")
+    payload_budget: int = _env("MCP_PAYLOAD_BUDGET", 0)
+    session_payload_budget: int = _env("MCP_SESSION_PAYLOAD_BUDGET", 0)
+    launcher: str = _env("MCP_LAUNCHER", "exec")
+    container_clis: tuple[str, ...] = _env("MCP_CONTAINER_CLIS", ("docker", "podman"))
+    container_warm: int = _env("MCP_CONTAINER_WARM", 1)
+    container_max_uses: int = _env("MCP_CONTAINER_MAX_USES", 20)
+    aggregate_max_connectors: int = _env("MCP_AGGREGATE_MAX_CONNECTORS", 10)
+    aggregate_separator: str = _env("MCP_AGGREGATE_SEPARATOR", "__")
+    session_max_inflight: int = _env("MCP_SESSION_MAX_INFLIGHT", 32)
+    session_max_queued: int = _env("MCP_SESSION_MAX_QUEUED", 64)
+    user_request_rate: float = _env("MCP_USER_REQUEST_RATE", 0.0)
+    user_request_burst: float | None = _env("MCP_USER_REQUEST_BURST", None)
+    user_session_rate: float = _env("MCP_USER_SESSION_RATE", 0.0)
+    user_session_burst: float | None = _env("MCP_USER_SESSION_BURST", None)
+    connector_request_rate: float = _env("MCP_CONNECTOR_REQUEST_RATE", 0.0)
+    connector_request_burst: float | None = _env("MCP_CONNECTOR_REQUEST_BURST", None)
+    connector_session_rate: float = _env("MCP_CONNECTOR_SESSION_RATE", 0.0)
+    connector_session_burst: float | None = _env("MCP_CONNECTOR_SESSION_BURST", None)
+    fair_concurrency: int = _env("MCP_FAIR_CONCURRENCY", 0)
+    fair_queue_size: int = _env("MCP_FAIR_QUEUE_SIZE", 100)
+    fair_queue_timeout: float = _env("MCP_FAIR_QUEUE_TIMEOUT", 10.0)
+    progress_rate: float = _env("MCP_PROGRESS_RATE", 0.0)
+    completion_cache_size: int = _env("MCP_COMPLETION_CACHE_SIZE", 1024)
+    completion_cache_ttl: float = _env("MCP_COMPLETION_CACHE_TTL", 30.0)
+    multiplex_sessions: int = _env("MCP_MULTIPLEX_SESSIONS", 2)
+    multiplex_max_inflight: int = _env("MCP_MULTIPLEX_MAX_INFLIGHT", 16)
+    result_cache_size: int = _env("MCP_RESULT_CACHE_SIZE", 1024)
+    result_cache_bytes: int = _env("MCP_RESULT_CACHE_BYTES", 64 * 1024 * 1024)
+    result_cache_ttl: float = _env("MCP_RESULT_CACHE_TTL", 60.0)
+    result_cache_read_only: bool = _env("MCP_RESULT_CACHE_READ_ONLY", False)
+    reaper_grace: float = _env("MCP_REAPER_GRACE", 5.0)
+    reaper_batch_size: int = _env("MCP_REAPER_BATCH_SIZE", 64)
+
+    @classmethod
+    def from_env(cls, environ: t.Mapping[str, str] | None = None) -> "Settings":
+        """Build settings from ``environ`` (default ``os.environ``)."""
+        environ = os.environ if environ is None else environ
+        hints = t.get_type_hints(cls)
+        values = {}
+        for field in dataclasses.fields(cls):
+            raw = environ.get(field.metadata["env"])
+            if raw:
+                values[field.name] = _parse(raw, hints[field.name])
+        return cls(**values)
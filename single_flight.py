@@ -0,0 +1,82 @@
+"""Coalesce identical concurrent upstream calls into one.
+
+While a call for a key is in flight, later callers with the same key wait for
+it instead of issuing their own and receive a copy of its result. Keys are
+built from the method and its canonicalized params; the group itself is held
+per connector (see ``catalog_cache.Catalog``), so only sessions launched with
+the same resolved parameters and credentials ever share a result.
+"""
+
+import asyncio
+import copy
+import json
+import typing as t
+
+from log.logWrapper import get_logger
+
+clog = get_logger(__name__)
+
+
+def flight_key(method: str, params: t.Any = None) -> str:  # noqa: ANN401
+    """Canonical key for ``method`` called with ``params``."""
+    return method + ":" + json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _copy(result: t.Any) -> t.Any:  # noqa: ANN401
+    if hasattr(result, "model_copy"):
+        return result.model_copy(deep=True)
+    return copy.deepcopy(result)
+
+
+class SingleFlight:
+    """In-flight call registry shared by every session of one connector."""
+
+    def __init__(self) -> None:
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def inflight(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def run(
+        self,
+        key: str,
+        loader: t.Callable[[], t.Awaitable[t.Any]],
+    ) -> t.Any:  # noqa: ANN401
+        """Return ``loader()``'s result, sharing it with concurrent callers."""
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The leader's session went away; retry unless we were the
+                # ones cancelled.
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                continue
+            self.shared += 1
+            return _copy(result)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.calls += 1
+        try:
+            result = await loader()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as err:
+            future.set_exception(err)
+            # Mark retrieved so an unawaited failure is not logged.
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {"inflight": len(self._inflight), "calls": self.calls, "shared": self.shared}
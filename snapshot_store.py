@@ -0,0 +1,180 @@
+"""Persisted snapshots of what each connector reports at initialize time.
+
+A snapshot holds the upstream ``InitializeResult`` and its tool, prompt and
+resource listings. With a snapshot available the proxy can complete the
+downstream handshake and answer list requests without a running upstream,
+and only spawn the stdio process once a request that needs it arrives.
+
+Snapshots are keyed like the warm pool (``session_pool.pool_key``), so any
+change to the resolved command, args or credentials produces a new key. They
+are also dropped whenever the connector's configuration document changes.
+"""
+
+import asyncio
+import time
+import typing as t
+from dataclasses import dataclass
+
+from mcp import types
+
+from catalog_cache import PROMPTS, RESOURCE_TEMPLATES, RESOURCES, TOOLS, Catalog
+from connector_cache import TTLCache
+from log.logWrapper import get_logger
+
+clog = get_logger(__name__)
+
+SNAPSHOT_COLLECTION = "mcp_connector_snapshots"
+
+_RESULT_TYPES: dict[str, type] = {
+    TOOLS: types.ListToolsResult,
+    PROMPTS: types.ListPromptsResult,
+    RESOURCES: types.ListResourcesResult,
+    RESOURCE_TEMPLATES: types.ListResourceTemplatesResult,
+}
+
+_UNSET = object()
+
+
+@dataclass(frozen=True)
+class ConnectorSnapshot:
+    tool_name: str
+    initialize_result: types.InitializeResult
+    catalogs: dict[str, t.Any]
+    captured_at: float
+
+    def to_document(self, key: str) -> dict:
+        return {
+            "key": key,
+            "tool_name": self.tool_name,
+            "captured_at": self.captured_at,
+            "initialize_result": self.initialize_result.model_dump(
+                mode="json", by_alias=True, exclude_none=True
+            ),
+            "catalogs": {
+                kind: result.model_dump(mode="json", by_alias=True, exclude_none=True)
+                for kind, result in self.catalogs.items()
+            },
+        }
+
+    @classmethod
+    def from_document(cls, document: dict) -> "ConnectorSnapshot":
+        return cls(
+            tool_name=document["tool_name"],
+            initialize_result=types.InitializeResult.model_validate(
+                document["initialize_result"]
+            ),
+            catalogs={
+                kind: _RESULT_TYPES[kind].model_validate(result)
+                for kind, result in document.get("catalogs", {}).items()
+                if kind in _RESULT_TYPES
+            },
+            captured_at=document.get("captured_at", 0.0),
+        )
+
+    def same_as(self, other: "ConnectorSnapshot") -> bool:
+        """Whether both report the same handshake and listings."""
+        mine, theirs = self.to_document(""), other.to_document("")
+        mine.pop("captured_at")
+        theirs.pop("captured_at")
+        return mine == theirs
+
+    def seed(self, catalog: Catalog) -> None:
+        for kind, result in self.catalogs.items():
+            catalog.seed(kind, result)
+
+
+class SnapshotStore:
+    """Memory-fronted snapshot persistence in ``mcp_connector_snapshots``."""
+
+    def __init__(
+        self,
+        get_database: t.Callable[[], t.Awaitable[t.Any]],
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+    ) -> None:
+        self._get_database = get_database
+        self._snapshots = TTLCache(max_entries, ttl)
+        self._tasks: set[asyncio.Task] = set()
+
+    async def _collection(self) -> t.Any:  # noqa: ANN401
+        database = await self._get_database()
+        return database.get_collection(SNAPSHOT_COLLECTION)
+
+    async def get(self, key: str) -> ConnectorSnapshot | None:
+        snapshot = self._snapshots.get(key, _UNSET)
+        if snapshot is not _UNSET:
+            return snapshot
+        snapshot = None
+        try:
+            collection = await self._collection()
+            document = await collection.find_one(filter={"key": key})
+            if document:
+                snapshot = ConnectorSnapshot.from_document(document)
+        except Exception as err:
+            clog.info(f"Could not load connector snapshot: {err}")
+        self._snapshots.set(key, snapshot)
+        return snapshot
+
+    def _spawn(self, coro: t.Coroutine) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def capture(
+        self,
+        key: str,
+        tool_name: str,
+        initialize_result: types.InitializeResult,
+        catalog: Catalog,
+        remote_app: t.Any,  # noqa: ANN401
+    ) -> None:
+        """Record a live upstream's handshake and listings in the background.
+
+        The stored snapshot is only rewritten when missing or different.
+        """
+        self._spawn(self._capture(key, tool_name, initialize_result, catalog, remote_app))
+
+    async def _capture(
+        self,
+        key: str,
+        tool_name: str,
+        initialize_result: types.InitializeResult,
+        catalog: Catalog,
+        remote_app: t.Any,  # noqa: ANN401
+    ) -> None:
+        await catalog.prefill(remote_app, initialize_result.capabilities)
+        snapshot = ConnectorSnapshot(
+            tool_name=tool_name,
+            initialize_result=initialize_result,
+            catalogs={
+                kind: catalog.get(kind)
+                for kind in _RESULT_TYPES
+                if catalog.get(kind) is not None
+            },
+            captured_at=time.time(),
+        )
+        previous = await self.get(key)
+        self._snapshots.set(key, snapshot)
+        if previous is not None and previous.same_as(snapshot):
+            return
+        try:
+            collection = await self._collection()
+            await collection.replace_one(
+                {"key": key}, snapshot.to_document(key), upsert=True
+            )
+        except Exception as err:
+            clog.info(f"Could not persist connector snapshot for {tool_name}: {err}")
+
+    def invalidate_tool(self, tool_name: str) -> None:
+        for key in self._snapshots.keys():
+            snapshot = self._snapshots.get(key, None)
+            if snapshot is None or snapshot.tool_name == tool_name:
+                self._snapshots.pop(key)
+        self._spawn(self._delete(tool_name))
+
+    async def _delete(self, tool_name: str) -> None:
+        try:
+            collection = await self._collection()
+            await collection.delete_many({"tool_name": tool_name})
+        except Exception as err:
+            clog.info(f"Could not drop connector snapshots for {tool_name}: {err}")
@@ -0,0 +1,69 @@
+"""Event-driven disconnect supervision for long-lived SSE connections.
+
+Instead of a coroutine per connection polling ``request.is_disconnected()``,
+the ASGI ``receive`` callable handed to the SSE transport is wrapped. The
+transport already waits on it for ``http.disconnect``; when that message
+arrives the supervisor cancels the connection's server task directly, so an
+idle connection costs no wakeups at all.
+"""
+
+import asyncio
+
+from starlette.types import Message, Receive
+
+from log.logWrapper import get_logger
+
+clog = get_logger(__name__)
+
+
+class SupervisedConnection:
+    """Disconnect state and the task to cancel for one connection."""
+
+    def __init__(self, supervisor: "ConnectionSupervisor", name: str) -> None:
+        self._supervisor = supervisor
+        self.name = name
+        self.disconnected = False
+        self._task: asyncio.Task | None = None
+
+    def bind(self, task: asyncio.Task) -> None:
+        """Cancel ``task`` once the client goes away."""
+        self._task = task
+        if self.disconnected:
+            task.cancel()
+
+    def _on_disconnect(self) -> None:
+        if self.disconnected:
+            return
+        self.disconnected = True
+        self._supervisor.disconnects += 1
+        clog.info(f"Client disconnected from {self.name}")
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def close(self) -> None:
+        self._task = None
+        self._supervisor._connections.discard(self)
+
+
+class ConnectionSupervisor:
+    """Tracks open connections and reacts to their ``http.disconnect``."""
+
+    def __init__(self) -> None:
+        self._connections: set[SupervisedConnection] = set()
+        self.disconnects = 0
+
+    def attach(self, receive: Receive, name: str = "") -> tuple[Receive, SupervisedConnection]:
+        """Return a wrapped ``receive`` and the connection it reports to."""
+        connection = SupervisedConnection(self, name)
+        self._connections.add(connection)
+
+        async def _receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                connection._on_disconnect()
+            return message
+
+        return _receive, connection
+
+    def stats(self) -> dict:
+        return {"connections": len(self._connections), "disconnects": self.disconnects}
@@ -0,0 +1,45 @@
+import logging
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+# The modules live at the top level of the repository.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    import log.logWrapper  # noqa: F401
+except ImportError:
+    # ``log`` ships with the deployment image; stand in with stdlib logging.
+    package = sys.modules.setdefault("log", types.ModuleType("log"))
+    module = types.ModuleType("log.logWrapper")
+    module.get_logger = logging.getLogger
+    package.logWrapper = module
+    sys.modules["log.logWrapper"] = module
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+class Clock:
+    """Stand-in for ``time.monotonic`` that only moves when told to."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    """Freeze ``time.monotonic``; only for tests that do not run an event loop."""
+    clock = Clock()
+    monkeypatch.setattr("time.monotonic", clock)
+    return clock
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+pytestmark = pytest.mark.anyio
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_freed_slots_go_to_waiters_in_arrival_order() -> None:
+    admission = AdmissionController(max_processes=1)
+    held = await admission.acquire("stub")
+    first = asyncio.create_task(admission.acquire("stub"))
+    await _settle()
+    second = asyncio.create_task(admission.acquire("stub"))
+    await _settle()
+    assert admission.stats()["waiting"] == 2
+    held.release()
+    # The slot is handed over on release; nobody can take it in between.
+    assert admission.try_acquire("stub") is None
+    (await first).release()
+    (await second).release()
+    assert admission.stats()["active_processes"] == 0
+
+
+async def test_new_callers_queue_behind_waiters() -> None:
+    admission = AdmissionController(max_processes=1)
+    held = await admission.acquire("stub")
+    waiter = asyncio.create_task(admission.acquire("stub"))
+    await _settle()
+    held.release()
+    late = asyncio.create_task(admission.acquire("stub"))
+    await _settle()
+    assert waiter.done()
+    assert not late.done()
+    (await waiter).release()
+    (await late).release()
+
+
+async def test_a_connector_at_its_cap_does_not_block_others() -> None:
+    admission = AdmissionController(max_per_connector=1)
+    held = await admission.acquire("a")
+    waiter = asyncio.create_task(admission.acquire("a"))
+    await _settle()
+    other = await asyncio.wait_for(admission.acquire("b"), 1.0)
+    assert not waiter.done()
+    held.release()
+    (await waiter).release()
+    other.release()
+
+
+async def test_rejects_when_the_queue_is_full() -> None:
+    admission = AdmissionController(max_processes=1, max_queue=1)
+    held = await admission.acquire("stub")
+    waiter = asyncio.create_task(admission.acquire("stub"))
+    await _settle()
+    with pytest.raises(AdmissionRejected):
+        await admission.acquire("stub")
+    assert admission.stats()["rejected"] == {"queue_full": 1}
+    held.release()
+    (await waiter).release()
+
+
+async def test_timed_out_waiters_leave_the_queue() -> None:
+    admission = AdmissionController(max_processes=1, queue_timeout=0.01)
+    held = await admission.acquire("stub")
+    with pytest.raises(AdmissionRejected):
+        await admission.acquire("stub")
+    assert admission.stats()["waiting"] == 0
+    held.release()
+    assert admission.try_acquire("stub") is not None
+
+
+async def test_a_slot_granted_to_a_cancelled_waiter_is_passed_on() -> None:
+    admission = AdmissionController(max_processes=1)
+    held = await admission.acquire("stub")
+    cancelled = asyncio.create_task(admission.acquire("stub"))
+    await _settle()
+    nxt = asyncio.create_task(admission.acquire("stub"))
+    await _settle()
+    # The slot goes to the waiter, which is cancelled before it resumes.
+    held.release()
+    cancelled.cancel()
+    try:
+        await cancelled
+    except asyncio.CancelledError:
+        pass
+    else:
+        cancelled.result().release()
+    (await nxt).release()
+    assert admission.stats()["active_processes"] == 0
+    assert admission.stats()["waiting"] == 0
+
+
+async def test_waiting_for_a_spawn_token_holds_no_slot() -> None:
+    admission = AdmissionController(max_processes=2, spawn_rate=50.0, spawn_burst=1.0)
+    first = await admission.acquire("stub")
+    second = asyncio.create_task(admission.acquire("stub"))
+    await _settle()
+    assert admission.stats()["active_processes"] == 1
+    (await second).release()
+    first.release()
+
+
+async def test_spawn_rate_rejects_past_the_queue_timeout() -> None:
+    admission = AdmissionController(spawn_rate=1.0, spawn_burst=1.0, queue_timeout=0.1)
+    (await admission.acquire("stub")).release()
+    with pytest.raises(AdmissionRejected) as rejected:
+        await admission.acquire("stub")
+    assert rejected.value.retry_after > 0.1
+    assert admission.stats()["active_processes"] == 0
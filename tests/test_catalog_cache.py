@@ -0,0 +1,94 @@
+import pytest
+from mcp import types
+from mcp.shared.exceptions import McpError
+
+from catalog_cache import MAX_UPSTREAM_PAGES, TOOLS, Catalog, collect_pages
+
+pytestmark = pytest.mark.anyio
+
+
+def _tool(name: str) -> types.Tool:
+    return types.Tool(name=name, inputSchema={"type": "object"})
+
+
+class Upstream:
+    """Serves ``tools/list`` in pages linked by opaque cursors."""
+
+    def __init__(self, names: list[str], page_size: int) -> None:
+        self.pages = [names[i : i + page_size] for i in range(0, len(names), page_size)]
+        self.cursors: list[str | None] = []
+
+    async def list_tools(self, cursor: str | None = None) -> types.ListToolsResult:
+        self.cursors.append(cursor)
+        index = int(cursor.removeprefix("page-")) if cursor else 0
+        more = index + 1 < len(self.pages)
+        return types.ListToolsResult(
+            tools=[_tool(name) for name in self.pages[index]],
+            nextCursor=f"page-{index + 1}" if more else None,
+        )
+
+
+async def test_collect_pages_follows_every_cursor() -> None:
+    upstream = Upstream([f"t{i}" for i in range(7)], page_size=3)
+    result = await collect_pages(TOOLS, upstream.list_tools)
+    assert [tool.name for tool in result.tools] == [f"t{i}" for i in range(7)]
+    assert result.nextCursor is None
+    assert upstream.cursors == [None, "page-1", "page-2"]
+
+
+async def test_collect_pages_stops_on_a_repeated_cursor() -> None:
+    calls = []
+
+    async def loader(cursor: str | None = None) -> types.ListToolsResult:
+        calls.append(cursor)
+        return types.ListToolsResult(tools=[_tool(f"t{len(calls)}")], nextCursor="again")
+
+    result = await collect_pages(TOOLS, loader)
+    assert calls == [None, "again"]
+    assert len(result.tools) == 2
+    assert result.nextCursor is None
+
+
+async def test_collect_pages_caps_the_number_of_pages() -> None:
+    calls = 0
+
+    async def loader(cursor: str | None = None) -> types.ListToolsResult:
+        nonlocal calls
+        calls += 1
+        return types.ListToolsResult(tools=[], nextCursor=f"c{calls}")
+
+    await collect_pages(TOOLS, loader)
+    assert calls == MAX_UPSTREAM_PAGES + 1
+
+
+async def test_catalog_pages_round_trip_through_its_cursors() -> None:
+    upstream = Upstream([f"t{i}" for i in range(5)], page_size=2)
+    catalog = Catalog(ttl=60.0, page_size=3)
+    names, cursor = [], None
+    for _ in range(5):
+        page = await catalog.list_page(TOOLS, upstream.list_tools, cursor)
+        names += [tool.name for tool in page.tools]
+        cursor = page.nextCursor
+        if cursor is None:
+            break
+    assert names == [f"t{i}" for i in range(5)]
+    # The upstream listing was collected once and then served from memory.
+    assert upstream.cursors == [None, "page-1", "page-2"]
+
+
+async def test_catalog_rejects_cursors_it_did_not_issue() -> None:
+    upstream = Upstream(["t0"], page_size=1)
+    catalog = Catalog(ttl=60.0, page_size=3)
+    for cursor in ("garbage", "b2Zmc2V0Onh4"):
+        with pytest.raises(McpError) as rejected:
+            await catalog.list_page(TOOLS, upstream.list_tools, cursor)
+        assert rejected.value.error.code == types.INVALID_PARAMS
+
+
+async def test_catalog_without_page_size_passes_cursors_upstream() -> None:
+    upstream = Upstream([f"t{i}" for i in range(4)], page_size=2)
+    catalog = Catalog(ttl=60.0)
+    first = await catalog.list_page(TOOLS, upstream.list_tools)
+    second = await catalog.list_page(TOOLS, upstream.list_tools, first.nextCursor)
+    assert [tool.name for tool in first.tools + second.tools] == ["t0", "t1", "t2", "t3"]
+    assert upstream.cursors == [None, "page-1"]
@@ -0,0 +1,65 @@
+from mcp import types
+
+from completion_cache import CompletionCache, reference_key
+
+REF = reference_key(types.PromptReference(type="ref/prompt", name="greet"))
+
+
+def _completion(*values: str, **kwargs) -> types.Completion:  # noqa: ANN003
+    return types.Completion(values=list(values), **kwargs)
+
+
+def test_reference_keys_are_canonical() -> None:
+    other = types.PromptReference(type="ref/prompt", name="greet")
+    assert reference_key(other) == REF
+    assert reference_key(types.ResourceReference(type="ref/resource", uri="file:///x")) != REF
+
+
+def test_exact_prefix_hits() -> None:
+    cache = CompletionCache()
+    cache.put(REF, "name", "al", _completion("alice", "alan"))
+    assert cache.get(REF, "name", "al").values == ["alice", "alan"]
+    assert cache.get(REF, "other", "al") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_complete_prefix_results_answer_longer_prefixes() -> None:
+    cache = CompletionCache()
+    cache.put(REF, "name", "a", _completion("alice", "alan", "anne"))
+    completion = cache.get(REF, "name", "ali")
+    assert completion.values == ["alice"]
+    assert completion.total == 1
+    assert cache.stats()["prefix_hits"] == 1
+
+
+def test_truncated_or_fuzzy_results_only_answer_their_own_prefix() -> None:
+    cache = CompletionCache()
+    cache.put(REF, "name", "a", _completion("alice", hasMore=True))
+    cache.put(REF, "city", "a", _completion("alice", total=5))
+    cache.put(REF, "tag", "a", _completion("alice", "bob"))
+    cache.put(REF, "any", "", _completion("alice"))
+    assert cache.get(REF, "name", "al") is None
+    assert cache.get(REF, "city", "al") is None
+    assert cache.get(REF, "tag", "al") is None
+    assert cache.get(REF, "any", "al") is None
+    assert cache.get(REF, "tag", "a").values == ["alice", "bob"]
+
+
+def test_entries_expire_and_are_bounded(clock) -> None:
+    cache = CompletionCache(max_entries=2, ttl=10)
+    cache.put(REF, "name", "a", _completion("alice"))
+    cache.put(REF, "name", "b", _completion("bob"))
+    cache.get(REF, "name", "a")
+    cache.put(REF, "name", "c", _completion("carol"))
+    # "b" was the least recently used.
+    assert cache.get(REF, "name", "b") is None
+    assert cache.get(REF, "name", "a") is not None
+    clock.advance(11)
+    assert cache.get(REF, "name", "a") is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_disabled_cache_stores_nothing() -> None:
+    cache = CompletionCache(ttl=0)
+    cache.put(REF, "name", "a", _completion("alice"))
+    assert cache.stats()["entries"] == 0
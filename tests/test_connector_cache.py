@@ -0,0 +1,185 @@
+import asyncio
+
+import pytest
+
+from connector_cache import TOOL_COLLECTION, ConnectorConfigCache, TTLCache
+
+pytestmark = pytest.mark.anyio
+
+
+class Collection:
+    """``find_one`` that blocks until the test releases it."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.error: Exception | None = None
+        self.missing = False
+
+    async def find_one(self, filter: dict) -> dict | None:  # noqa: A002
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        if self.missing:
+            return None
+        return {"_id": self.calls, "name": filter["name"], "calls": self.calls}
+
+
+class Database:
+    def __init__(self) -> None:
+        self.collection = Collection()
+
+    def get_collection(self, name: str) -> Collection:
+        assert name == TOOL_COLLECTION
+        return self.collection
+
+
+def _cache(**kwargs: object) -> tuple[ConnectorConfigCache, Collection]:
+    database = Database()
+
+    async def get_database() -> Database:
+        return database
+
+    return ConnectorConfigCache(get_database, **kwargs), database.collection
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_ttl_cache_expires_entries(clock) -> None:
+    cache = TTLCache(max_entries=10, ttl=5.0)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    clock.advance(5.1)
+    assert cache.get("a", None) is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used(clock) -> None:
+    cache = TTLCache(max_entries=2, ttl=5.0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.keys() == ["a", "c"]
+
+
+def test_ttl_cache_caches_none(clock) -> None:
+    cache = TTLCache()
+    cache.set("missing", None)
+    assert cache.get("missing", "default") is None
+    cache.pop("missing")
+    assert cache.get("missing", "default") == "default"
+
+
+def test_ttl_cache_reports_every_eviction(clock) -> None:
+    evicted = []
+    cache = TTLCache(max_entries=2, ttl=5.0, on_evict=lambda key, value: evicted.append(key))
+    cache.set("a", 1)
+    cache.set("a", 2)
+    cache.set("b", 3)
+    cache.set("c", 4)
+    cache.pop("b")
+    clock.advance(5.1)
+    cache.get("c")
+    assert evicted == ["a", "a", "b", "c"]
+
+
+def test_ttl_cache_entry_ttl_overrides_the_default(clock) -> None:
+    cache = TTLCache(ttl=300.0)
+    cache.set("short", None, ttl=1.0)
+    cache.set("long", None)
+    clock.advance(1.1)
+    assert cache.get("short", "default") == "default"
+    assert cache.get("long", "default") is None
+
+
+async def test_concurrent_misses_share_one_lookup() -> None:
+    cache, collection = _cache()
+    lookups = [asyncio.create_task(cache.get_tool_config("stub")) for _ in range(3)]
+    await _settle()
+    collection.release.set()
+    results = await asyncio.gather(*lookups)
+    assert collection.calls == 1
+    assert results[0] == results[1] == results[2]
+    assert await cache.get_tool_config("stub") is results[0]
+    assert collection.calls == 1
+
+
+async def test_waiter_takes_over_when_the_leader_is_cancelled() -> None:
+    cache, collection = _cache()
+    leader = asyncio.create_task(cache.get_tool_config("stub"))
+    await _settle()
+    waiter = asyncio.create_task(cache.get_tool_config("stub"))
+    await _settle()
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    collection.release.set()
+    result = await waiter
+    assert result["name"] == "stub"
+    assert collection.calls == 2
+
+
+async def test_cancelled_waiter_leaves_the_leader_alone() -> None:
+    cache, collection = _cache()
+    leader = asyncio.create_task(cache.get_tool_config("stub"))
+    await _settle()
+    waiter = asyncio.create_task(cache.get_tool_config("stub"))
+    await _settle()
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    collection.release.set()
+    assert (await leader)["calls"] == 1
+    assert collection.calls == 1
+
+
+async def test_lookup_errors_reach_every_caller_and_are_not_cached() -> None:
+    cache, collection = _cache()
+    collection.error = ConnectionError("mongo down")
+    lookups = [asyncio.create_task(cache.get_tool_config("stub")) for _ in range(2)]
+    await _settle()
+    collection.release.set()
+    outcomes = await asyncio.gather(*lookups, return_exceptions=True)
+    assert all(isinstance(outcome, ConnectionError) for outcome in outcomes)
+    collection.error = None
+    assert (await cache.get_tool_config("stub"))["calls"] == 2
+
+
+async def test_invalidate_tool_notifies_listeners() -> None:
+    cache, collection = _cache()
+    collection.release.set()
+    invalidated = []
+    cache.add_invalidation_listener(invalidated.append)
+    await cache.get_tool_config("stub")
+    cache.invalidate_tool("stub")
+    assert invalidated == ["stub"]
+    await cache.get_tool_config("stub")
+    assert collection.calls == 2
+
+
+async def test_evicted_documents_leave_the_id_index() -> None:
+    cache, collection = _cache(max_entries=1)
+    collection.release.set()
+    await cache.get_tool_config("a")
+    await cache.get_tool_config("b")
+    assert list(cache._keys_by_id.values()) == [(cache.tools, "b")]
+    cache.invalidate_tool("b")
+    assert cache._keys_by_id == {}
+
+
+async def test_missing_documents_are_cached_briefly() -> None:
+    cache, collection = _cache(negative_ttl=0.05)
+    collection.release.set()
+    collection.missing = True
+    assert await cache.get_tool_config("stub") is None
+    assert await cache.get_tool_config("stub") is None
+    assert collection.calls == 1
+    await asyncio.sleep(0.06)
+    collection.missing = False
+    assert (await cache.get_tool_config("stub"))["name"] == "stub"
+    assert collection.calls == 2
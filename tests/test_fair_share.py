@@ -0,0 +1,224 @@
+import asyncio
+
+import pytest
+
+from admission import TokenBucket
+from fair_share import RETRY_LATER, FairQueue, FairShare, Rate, RateLimited, RateLimits
+
+pytestmark = pytest.mark.anyio
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_token_bucket_spends_burst_then_refills(clock) -> None:
+    bucket = TokenBucket(rate=2.0, burst=3.0)
+    assert [bucket.try_take() for _ in range(4)] == [True, True, True, False]
+    assert bucket.delay() == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert bucket.delay() == 0.0
+    assert bucket.try_take()
+    assert not bucket.try_take()
+
+
+def test_token_bucket_without_rate_is_unlimited(clock) -> None:
+    bucket = TokenBucket(rate=0.0)
+    assert all(bucket.try_take() for _ in range(1000))
+    assert bucket.delay() == 0.0
+    assert bucket.tokens is None
+
+
+def test_take_consumes_from_both_buckets_or_neither(clock) -> None:
+    share = FairShare()
+    per_user, per_connector = Rate(1.0, 5.0), Rate(1.0, 2.0)
+    share.take("requests", "stub", "u1", per_user, per_connector)
+    share.take("requests", "stub", "u2", per_user, per_connector)
+    with pytest.raises(RateLimited) as rejected:
+        share.take("requests", "stub", "u1", per_user, per_connector)
+    assert rejected.value.scope == "connector"
+    assert rejected.value.retry_after == pytest.approx(1.0)
+    # The rejected request left the user's own bucket alone.
+    assert share._buckets[("requests", "stub", "u1")].tokens == pytest.approx(4.0)
+    assert share.stats()["rejected"] == {"requests:connector": 1}
+    clock.advance(1.0)
+    share.take("requests", "stub", "u1", per_user, per_connector)
+
+
+def test_take_reports_the_user_scope(clock) -> None:
+    share = FairShare()
+    share.take("sessions", "stub", "u1", Rate(0.5, 1.0), Rate())
+    with pytest.raises(RateLimited) as rejected:
+        share.take("sessions", "stub", "u1", Rate(0.5, 1.0), Rate())
+    assert rejected.value.scope == "user"
+    assert rejected.value.retry_after == pytest.approx(2.0)
+    # Other users have buckets of their own.
+    share.take("sessions", "stub", "u2", Rate(0.5, 1.0), Rate())
+
+
+def test_take_recreates_buckets_whose_limits_changed(clock) -> None:
+    share = FairShare()
+    share.take("requests", "stub", "u1", Rate(1.0, 1.0), Rate())
+    with pytest.raises(RateLimited):
+        share.take("requests", "stub", "u1", Rate(1.0, 1.0), Rate())
+    share.take("requests", "stub", "u1", Rate(10.0, 10.0), Rate())
+
+
+def test_rate_limited_error_carries_retry_after_and_scope() -> None:
+    error = RateLimited("slow down", 1.23456, "queue").error().error
+    assert error.code == RETRY_LATER
+    assert error.data == {"retry_after": 1.235, "scope": "queue"}
+
+
+def test_rate_limits_from_config_fall_back_to_defaults() -> None:
+    defaults = RateLimits(user_requests=Rate(5.0, 10.0), concurrency=4)
+    limits = RateLimits.from_config(
+        {"user": {"requests": 1}, "queue": 3, "weights": {"batch": 0.5, "off": 0}}, defaults
+    )
+    assert limits.user_requests == Rate(1.0, 10.0)
+    assert limits.concurrency == 4
+    assert limits.max_queue == 3
+    assert limits.weight("batch") == 0.5
+    assert limits.weight("off") == 1.0
+    assert RateLimits.from_config(None, defaults) is defaults
+
+
+async def test_fair_queue_admits_up_to_concurrency_without_waiting() -> None:
+    queue = FairQueue("stub", concurrency=2, max_queue=10)
+    await queue.acquire("u1")
+    await queue.acquire("u2")
+    assert queue.stats()["active"] == 2
+    queue.release()
+    queue.release()
+    assert queue.stats()["active"] == 0
+
+
+async def test_fair_queue_serves_a_light_user_before_a_backlog() -> None:
+    queue = FairQueue("stub", concurrency=1, max_queue=10)
+    order = []
+
+    async def request(user: str, name: str) -> None:
+        async with queue.slot(user):
+            order.append(name)
+
+    await queue.acquire("u0")
+    tasks = [asyncio.create_task(request("u1", f"u1-{i}")) for i in range(3)]
+    await _settle()
+    tasks.append(asyncio.create_task(request("u2", "u2-0")))
+    await _settle()
+    assert queue.waiting == 4
+    queue.release()
+    await asyncio.gather(*tasks)
+    assert order == ["u1-0", "u2-0", "u1-1", "u1-2"]
+    assert queue.stats()["active"] == 0
+    assert queue.stats()["waiting"] == 0
+
+
+async def test_fair_queue_gives_heavier_users_more_turns() -> None:
+    queue = FairQueue("stub", concurrency=1, max_queue=10)
+    order = []
+
+    async def request(user: str, weight: float) -> None:
+        async with queue.slot(user, weight):
+            order.append(user)
+
+    await queue.acquire("u0")
+    tasks = [asyncio.create_task(request("light", 1.0)) for _ in range(2)]
+    tasks += [asyncio.create_task(request("heavy", 2.0)) for _ in range(4)]
+    await _settle()
+    queue.release()
+    await asyncio.gather(*tasks)
+    assert order == ["light", "heavy", "heavy", "light", "heavy", "heavy"]
+
+
+async def test_fair_queue_rejects_when_full() -> None:
+    queue = FairQueue("stub", concurrency=1, max_queue=1)
+    await queue.acquire("u1")
+    waiter = asyncio.create_task(queue.acquire("u2"))
+    await _settle()
+    with pytest.raises(RateLimited) as rejected:
+        await queue.acquire("u3", timeout=5.0)
+    assert rejected.value.scope == "queue"
+    assert rejected.value.retry_after == 5.0
+    assert queue.stats()["rejected"] == 1
+    queue.release()
+    await waiter
+    queue.release()
+    assert queue.stats()["active"] == 0
+
+
+async def test_fair_queue_times_out_and_skips_the_expired_waiter() -> None:
+    queue = FairQueue("stub", concurrency=1, max_queue=10)
+    await queue.acquire("u1")
+    with pytest.raises(RateLimited) as rejected:
+        await queue.acquire("u2", timeout=0.01)
+    assert rejected.value.scope == "queue"
+    assert queue.waiting == 0
+    waiter = asyncio.create_task(queue.acquire("u3"))
+    await _settle()
+    queue.release()
+    await waiter
+    assert queue.stats()["active"] == 1
+    assert queue.stats()["dispatched"] == 2
+    queue.release()
+
+
+async def test_fair_queue_cancelled_waiter_does_not_take_a_slot() -> None:
+    queue = FairQueue("stub", concurrency=1, max_queue=10)
+    await queue.acquire("u1")
+    cancelled = asyncio.create_task(queue.acquire("u2"))
+    waiter = asyncio.create_task(queue.acquire("u3"))
+    await _settle()
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    assert queue.waiting == 1
+    queue.release()
+    await waiter
+    assert queue.stats()["active"] == 1
+    queue.release()
+    assert queue.stats()["active"] == 0
+
+
+async def test_fair_queue_passes_on_a_slot_granted_to_a_cancelled_waiter() -> None:
+    queue = FairQueue("stub", concurrency=1, max_queue=10)
+    await queue.acquire("u1")
+    granted = asyncio.create_task(queue.acquire("u2"))
+    await _settle()
+    # The slot goes to the waiter, which is cancelled before it resumes.
+    queue.release()
+    granted.cancel()
+    try:
+        await granted
+    except asyncio.CancelledError:
+        pass
+    else:
+        queue.release()
+    assert queue.stats()["active"] == 0
+    assert queue.stats()["waiting"] == 0
+
+
+async def test_fair_queue_reconfigure_dispatches_waiters() -> None:
+    queue = FairQueue("stub", concurrency=1, max_queue=10)
+    await queue.acquire("u1")
+    waiter = asyncio.create_task(queue.acquire("u2"))
+    await _settle()
+    queue.configure(2, 10)
+    await waiter
+    assert queue.stats()["active"] == 2
+
+
+async def test_gate_applies_the_fair_queue_of_its_connector() -> None:
+    share = FairShare()
+    limits = RateLimits(concurrency=1, queue_timeout=0.01)
+    first = share.gate("stub", "u1", limits)
+    second = share.gate("stub", "u2", limits)
+    async with first.slot():
+        with pytest.raises(RateLimited):
+            async with second.slot():
+                pass
+    release = await second.acquire()
+    assert share.stats()["queues"]["stub"]["active"] == 1
+    release()
+    assert share.stats()["queues"]["stub"]["active"] == 0
@@ -0,0 +1,133 @@
+import asyncio
+
+import httpx
+import pytest
+from mcp import server, types
+from mcp.server.streamable_http import MCP_SESSION_ID_HEADER
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from http_transport import InMemoryEventStore, StreamableHTTPEndpoint
+
+pytestmark = pytest.mark.anyio
+
+HEADERS = {"accept": "application/json, text/event-stream", "content-type": "application/json"}
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2025-03-26",
+        "capabilities": {},
+        "clientInfo": {"name": "test", "version": "1"},
+    },
+}
+
+
+def _message(text: str) -> types.JSONRPCMessage:
+    return types.JSONRPCMessage(
+        types.JSONRPCNotification(jsonrpc="2.0", method="notifications/message", params={"data": text})
+    )
+
+
+class Upstream:
+    def __init__(self) -> None:
+        self.closed = False
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class Sessions:
+    """``open_session`` serving a proxy with one tool."""
+
+    def __init__(self) -> None:
+        self.upstreams: list[Upstream] = []
+
+    async def __call__(self, connector_id: str):  # noqa: ANN204
+        if connector_id == "missing":
+            raise LookupError(f"Invalid connector id: {connector_id}")
+        app: server.Server = server.Server("stub")
+
+        @app.list_tools()
+        async def _list_tools() -> list[types.Tool]:
+            return [types.Tool(name="echo", inputSchema={"type": "object"})]
+
+        upstream = Upstream()
+        self.upstreams.append(upstream)
+        return app, upstream, connector_id
+
+
+def _on_error(err: Exception) -> JSONResponse:
+    return JSONResponse({"message": str(err)}, status_code=404)
+
+
+def _client(endpoint: StreamableHTTPEndpoint) -> httpx.AsyncClient:
+    app = Starlette(
+        routes=[Route("/mcp/{connector_id}", endpoint, methods=["GET", "POST", "DELETE"])]
+    )
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://proxy")
+
+
+async def test_event_store_replays_what_follows_an_event() -> None:
+    store = InMemoryEventStore(max_events=2)
+    first = await store.store_event("s", _message("a"))
+    await store.store_event("s", _message("b"))
+    await store.store_event("s", _message("c"))
+    replayed = []
+
+    async def _collect(event) -> None:  # noqa: ANN001
+        replayed.append(event.message.root.params["data"])
+
+    assert await store.replay_events_after(first, _collect) == "s"
+    # Only the last two events are kept.
+    assert replayed == ["b", "c"]
+    assert await store.replay_events_after("other/0", _collect) is None
+    assert await store.replay_events_after("s/x", _collect) is None
+
+
+async def test_requests_without_a_known_session_are_refused() -> None:
+    endpoint = StreamableHTTPEndpoint(Sessions(), _on_error)
+    async with _client(endpoint) as client:
+        missing_id = await client.get("/mcp/stub", headers=HEADERS)
+        unknown = await client.post(
+            "/mcp/stub", json=INITIALIZE, headers={**HEADERS, MCP_SESSION_ID_HEADER: "0.nope"}
+        )
+        failed = await client.post("/mcp/missing", json=INITIALIZE, headers=HEADERS)
+    assert missing_id.status_code == 400
+    assert unknown.status_code == 404
+    assert failed.status_code == 404
+    assert failed.json() == {"message": "Invalid connector id: missing"}
+    await endpoint.close()
+
+
+async def test_a_session_serves_json_requests_until_deleted() -> None:
+    sessions = Sessions()
+    endpoint = StreamableHTTPEndpoint(sessions, _on_error, json_response=True)
+    async with _client(endpoint) as client:
+        response = await client.post("/mcp/stub", json=INITIALIZE, headers=HEADERS)
+        assert response.status_code == 200
+        session_id = response.headers[MCP_SESSION_ID_HEADER]
+        assert session_id.startswith("0.")
+        headers = {**HEADERS, MCP_SESSION_ID_HEADER: session_id}
+        await client.post(
+            "/mcp/stub",
+            json={"jsonrpc": "2.0", "method": "notifications/initialized"},
+            headers=headers,
+        )
+        listed = await client.post(
+            "/mcp/stub", json={"jsonrpc": "2.0", "id": 2, "method": "tools/list"}, headers=headers
+        )
+        assert listed.json()["result"]["tools"][0]["name"] == "echo"
+        assert endpoint.stats() == {"sessions": 1}
+
+        deleted = await client.delete("/mcp/stub", headers=headers)
+        assert deleted.status_code == 200
+        for _ in range(50):
+            if sessions.upstreams[0].closed:
+                break
+            await asyncio.sleep(0.01)
+    assert sessions.upstreams[0].closed
+    assert endpoint.stats() == {"sessions": 0}
+    await endpoint.close()
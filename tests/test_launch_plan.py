@@ -0,0 +1,38 @@
+from launch_plan import LaunchPlanCache, compile_launch_plan
+
+CONFIGURATION = {"command": "docker", "args": ["run", "-i", "--rm", "image"]}
+
+
+def test_compile_splices_env_flags_before_the_image() -> None:
+    plan = compile_launch_plan(
+        CONFIGURATION, ["--token=x"], {"KEY": "v"}, ["-e", "KEY=v"], revision=(1, 2)
+    )
+    assert plan.args == ("run", "-i", "--rm", "-e", "KEY=v", "image", "--token=x")
+    params = plan.to_params()
+    params.args.append("mutated")
+    assert plan.to_params().args[-1] == "--token=x"
+    assert CONFIGURATION["args"] == ["run", "-i", "--rm", "image"]
+
+
+def test_plans_are_only_current_for_their_documents_and_revision() -> None:
+    cache = LaunchPlanCache()
+    credentials = {"secrets": {}}
+    plan = compile_launch_plan(CONFIGURATION, [], {}, [], revision=(1, 1))
+    cache.put("stub", "u1", CONFIGURATION, credentials, plan)
+    assert cache.get("stub", "u1", CONFIGURATION, credentials, (1, 1)) is plan
+    assert cache.get("stub", "u1", CONFIGURATION, credentials, (2, 1)) is None
+    assert cache.get("stub", "u1", dict(CONFIGURATION), credentials, (1, 1)) is None
+    assert cache.get("stub", "u1", CONFIGURATION, {"secrets": {}}, (1, 1)) is None
+
+
+def test_invalidate_drops_every_user_of_a_tool() -> None:
+    cache = LaunchPlanCache()
+    plan = compile_launch_plan(CONFIGURATION, [], {}, [])
+    for user in ("u1", "u2"):
+        cache.put("stub", user, CONFIGURATION, None, plan)
+    cache.put("other", "u1", CONFIGURATION, None, plan)
+    cache.invalidate("stub", "u1")
+    assert len(cache) == 2
+    cache.invalidate("stub")
+    assert len(cache) == 1
+    assert cache.get("other", "u1", CONFIGURATION, None) is plan
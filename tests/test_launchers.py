@@ -0,0 +1,90 @@
+import asyncio
+import os
+import stat
+
+import pytest
+from mcp.client.stdio import StdioServerParameters
+
+from launchers import EXEC, ContainerLauncher, Launchers, container_run
+
+pytestmark = pytest.mark.anyio
+
+# Stands in for ``docker``: ``create`` prints a new id, everything is logged.
+FAKE_CLI = """#!/bin/sh
+echo "$@" >> "$(dirname "$0")/calls"
+if [ "$1" = create ] || [ "$3" = create ]; then
+    echo "created-$$"
+fi
+"""
+
+
+def _params(*args: str, command: str = "docker") -> StdioServerParameters:
+    return StdioServerParameters(command=command, args=list(args))
+
+
+@pytest.fixture
+def docker(tmp_path) -> str:
+    path = tmp_path / "docker"
+    path.write_text(FAKE_CLI)
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+def _calls(docker: str) -> list[str]:
+    path = os.path.join(os.path.dirname(docker), "calls")
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return file.read().splitlines()
+
+
+@pytest.mark.parametrize(
+    ("args", "expected"),
+    [
+        (["run", "-i", "image"], 0),
+        (["--debug", "run", "image"], 1),
+        (["--context", "remote", "run", "image"], 2),
+        (["--context=remote", "run", "image"], 1),
+        (["-H", "tcp://host:2375", "--tls", "run", "image"], 3),
+        (["exec", "-i", "box", "run"], None),
+        (["--unknown", "value", "run", "image"], None),
+    ],
+)
+def test_container_run_skips_global_options(args: list[str], expected: int | None) -> None:
+    assert container_run(_params(*args)) == expected
+
+
+def test_container_run_only_applies_to_container_clis() -> None:
+    assert container_run(_params("run", "image", command="/usr/bin/podman")) == 0
+    assert container_run(_params("run", "image", command="npx")) is None
+
+
+async def test_exec_connectors_launch_as_configured() -> None:
+    launchers = Launchers({"precreated": ContainerLauncher()}, default="precreated")
+    params = _params("-y", "server", command="npx")
+    launch = await launchers.launch(params)
+    assert launch.backend == EXEC
+    assert launch.params is params
+    await launchers.close()
+
+
+async def test_prepared_containers_are_started_warm(docker) -> None:
+    backend = ContainerLauncher(warm=1, idle_ttl=60)
+    launchers = Launchers({"precreated": backend}, default="precreated", clis=["docker"])
+    params = _params("--context", "remote", "run", "--rm", "--name", "x", "image", command=docker)
+    launchers.prepare(params)
+    launch = await launchers.launch(params)
+    assert launch.backend == "precreated"
+    assert launch.params.args[:4] == ["--context", "remote", "start", "-a"]
+    container_id = launch.params.args[-1]
+    assert container_id.startswith("created-")
+    assert _calls(docker)[0] == "--context remote create -i image"
+
+    launch.on_exit()
+    removed = f"--context remote rm -f {container_id}"
+    for _ in range(100):
+        if removed in _calls(docker):
+            break
+        await asyncio.sleep(0.05)
+    assert removed in _calls(docker)
+    await launchers.close()
@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+from mcp import types
+
+from multiplex import MultiplexGroup, MultiplexedSession
+
+pytestmark = pytest.mark.anyio
+
+
+class ClientSession:
+    def __init__(self) -> None:
+        self.levels: list[str] = []
+        self.subscribed: list[str] = []
+
+    async def set_logging_level(self, level: str) -> types.EmptyResult:
+        self.levels.append(level)
+        return types.EmptyResult()
+
+    async def subscribe_resource(self, uri: str) -> types.EmptyResult:
+        self.subscribed.append(uri)
+        return types.EmptyResult()
+
+
+class Upstream:
+    """The part of ``UpstreamSession`` the group uses."""
+
+    def __init__(self) -> None:
+        self.session = ClientSession()
+        self.alive = True
+        self.initialize_result = None
+        self.listeners: list = []
+
+    def add_listener(self, listener) -> None:  # noqa: ANN001
+        self.listeners.append(listener)
+
+    async def notify(self, notification: types.ServerNotification) -> None:
+        for listener in self.listeners:
+            await listener(notification)
+
+    async def close(self) -> None:
+        self.alive = False
+
+
+class Downstream:
+    """The part of ``ServerSession`` notifications are delivered on."""
+
+    def __init__(self) -> None:
+        self.logs: list[tuple] = []
+        self.updated: list[str] = []
+
+    async def send_log_message(self, level, data, logger=None) -> None:  # noqa: ANN001
+        self.logs.append((level, data))
+
+    async def send_resource_updated(self, uri) -> None:  # noqa: ANN001
+        self.updated.append(str(uri))
+
+
+class Starter:
+    def __init__(self) -> None:
+        self.upstreams: list[Upstream] = []
+
+    async def __call__(self) -> Upstream:
+        upstream = Upstream()
+        self.upstreams.append(upstream)
+        return upstream
+
+
+def _log(level: str, data: str) -> types.ServerNotification:
+    return types.ServerNotification(
+        types.LoggingMessageNotification(
+            method="notifications/message",
+            params=types.LoggingMessageNotificationParams(level=level, data=data),
+        )
+    )
+
+
+def _updated(uri: str) -> types.ServerNotification:
+    return types.ServerNotification(
+        types.ResourceUpdatedNotification(
+            method="notifications/resources/updated",
+            params=types.ResourceUpdatedNotificationParams(uri=uri),
+        )
+    )
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _client(group: MultiplexGroup) -> tuple[MultiplexedSession, Downstream]:
+    client, downstream = MultiplexedSession(group), Downstream()
+    client.bind(downstream)
+    return client, downstream
+
+
+async def test_log_messages_go_to_clients_whose_level_admits_them() -> None:
+    start = Starter()
+    group = MultiplexGroup(start, sessions=1, max_inflight=4)
+    verbose, verbose_out = _client(group)
+    quiet, quiet_out = _client(group)
+    _, silent_out = _client(group)
+    await verbose.ready()
+    await verbose.set_logging_level("debug")
+    await quiet.set_logging_level("error")
+    upstream = start.upstreams[0]
+    # The upstream runs at the most verbose level asked for.
+    assert upstream.session.levels == ["debug"]
+
+    await upstream.notify(_log("info", "progress"))
+    await upstream.notify(_log("error", "failed"))
+    await _settle()
+    assert verbose_out.logs == [("info", "progress"), ("error", "failed")]
+    assert quiet_out.logs == [("error", "failed")]
+    assert silent_out.logs == []
+
+
+async def test_new_upstreams_start_at_the_group_level() -> None:
+    start = Starter()
+    group = MultiplexGroup(start, sessions=2, max_inflight=1)
+    client, _ = _client(group)
+    await client.set_logging_level("warning")
+    await client.ready()
+    assert start.upstreams[0].session.levels == ["warning"]
+
+
+async def test_resource_updates_go_to_the_subscribers_of_that_upstream() -> None:
+    start = Starter()
+    group = MultiplexGroup(start, sessions=1, max_inflight=4)
+    subscriber, subscriber_out = _client(group)
+    _, other_out = _client(group)
+    await subscriber.subscribe_resource("file:///a")
+    upstream = start.upstreams[0]
+
+    await upstream.notify(_updated("file:///a"))
+    await upstream.notify(_updated("file:///b"))
+    await _settle()
+    assert subscriber_out.updated == ["file:///a"]
+    assert other_out.updated == []
+
+
+async def test_closed_clients_receive_nothing() -> None:
+    start = Starter()
+    group = MultiplexGroup(start, sessions=1, max_inflight=4)
+    group.leases += 1
+    client, downstream = _client(group)
+    await client.set_logging_level("debug")
+    await client.ready()
+    await client.close()
+    await start.upstreams[0].notify(_log("error", "late"))
+    await _settle()
+    assert downstream.logs == []
+
+
+async def test_configure_adopts_the_current_settings() -> None:
+    first, second = Starter(), Starter()
+    group = MultiplexGroup(first, sessions=1, max_inflight=1)
+    async with group.lease():
+        pass
+    group.configure(second, sessions=2, max_inflight=1)
+    async with group.lease(), group.lease():
+        assert len(first.upstreams) == 1
+        assert len(second.upstreams) == 1
+    assert group.max_inflight == 1
+    assert group.sessions == 2
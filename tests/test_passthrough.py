@@ -0,0 +1,183 @@
+import asyncio
+import json
+
+import pytest
+
+from fair_share import RETRY_LATER, FairShare, Rate, RateLimits
+from passthrough import PassthroughSession
+
+pytestmark = pytest.mark.anyio
+
+
+class Stdin:
+    def __init__(self) -> None:
+        self.frames: list[dict] = []
+
+    def write(self, data: bytes) -> None:
+        self.frames.extend(json.loads(line) for line in data.splitlines())
+
+    async def drain(self) -> None:
+        pass
+
+
+class Process:
+    def __init__(self) -> None:
+        self.stdin = Stdin()
+
+
+def _request(request_id: object, method: str = "tools/call") -> bytes:
+    return json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method}).encode()
+
+
+def _cancel(request_id: object) -> bytes:
+    return json.dumps(
+        {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": request_id}}
+    ).encode()
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_requests_get_proxy_ids_and_responses_get_theirs_back() -> None:
+    session = PassthroughSession("s1", Process())
+    await session.send(_request("a"))
+    await session.send(_request(7))
+    await _settle()
+    assert [frame["id"] for frame in session.process.stdin.frames] == [0, 1]
+    # Python SDK key order, id first.
+    assert session.rewrite_incoming(b'{"jsonrpc":"2.0","id":1,"result":{}}') == (
+        b'{"jsonrpc":"2.0","id":7,"result":{}}'
+    )
+    # TypeScript SDK key order, id last.
+    assert session.rewrite_incoming(b'{"result":{"x":[1]},"jsonrpc":"2.0","id":0}') == (
+        b'{"result":{"x":[1]},"jsonrpc":"2.0","id":"a"}'
+    )
+
+
+async def test_unusual_key_orders_fall_back_to_parsing() -> None:
+    session = PassthroughSession("s1", Process())
+    await session.send(_request({"nested": True}))
+    await _settle()
+    frame = session.rewrite_incoming(b'{"jsonrpc":"2.0","result":{},"id":0,"extra":1}')
+    assert json.loads(frame)["id"] == {"nested": True}
+
+
+async def test_server_requests_and_unknown_ids_pass_unchanged() -> None:
+    session = PassthroughSession("s1", Process())
+    request = b'{"jsonrpc":"2.0","id":0,"method":"roots/list"}'
+    assert session.rewrite_incoming(request) == request
+    unknown = b'{"jsonrpc":"2.0","id":42,"result":{}}'
+    assert session.rewrite_incoming(unknown) == unknown
+    assert session.rewrite_incoming(b"not json") is None
+
+
+async def test_cancellations_refer_to_the_proxy_id() -> None:
+    session = PassthroughSession("s1", Process())
+    await session.send(_request("call-1"))
+    await _settle()
+    await session.send(_cancel("call-1"))
+    assert session.process.stdin.frames[1]["params"]["requestId"] == 0
+
+
+async def test_listings_skip_the_in_flight_cap() -> None:
+    session = PassthroughSession("s1", Process(), max_inflight=1)
+    for request_id in range(3):
+        await session.send(_request(request_id, "tools/list"))
+    assert len(session.process.stdin.frames) == 3
+
+
+async def test_in_flight_slot_is_held_until_the_response() -> None:
+    session = PassthroughSession("s1", Process(), max_inflight=1)
+    await session.send(_request("a"))
+    await session.send(_request("b"))
+    await _settle()
+    frames = session.process.stdin.frames
+    assert [frame["id"] for frame in frames] == [0]
+    response = session.rewrite_incoming(b'{"jsonrpc":"2.0","id":0,"result":{}}')
+    assert json.loads(response)["id"] == "a"
+    await _settle()
+    assert [frame["id"] for frame in frames] == [0, 1]
+    session.close()
+
+
+async def test_cancelling_a_queued_request_drops_it() -> None:
+    session = PassthroughSession("s1", Process(), max_inflight=1)
+    await session.send(_request(1))
+    await session.send(_request(2))
+    await _settle()
+    await session.send(_cancel(2))
+    session.rewrite_incoming(b'{"jsonrpc":"2.0","id":0,"result":{}}')
+    await _settle()
+    # Neither the queued request nor its cancellation reached the server.
+    assert [frame.get("id") for frame in session.process.stdin.frames] == [0]
+    await session.send(_request(3))
+    await _settle()
+    assert [frame.get("id") for frame in session.process.stdin.frames] == [0, 1]
+
+
+async def test_cancelling_a_forwarded_request_frees_its_slot() -> None:
+    session = PassthroughSession("s1", Process(), max_inflight=1)
+    await session.send(_request(1))
+    await _settle()
+    await session.send(_cancel(1))
+    await session.send(_request(2))
+    await _settle()
+    frames = session.process.stdin.frames
+    assert frames[1]["params"]["requestId"] == 0
+    assert frames[2]["id"] == 1
+    # A late response to the cancelled request still gets the client's id.
+    assert json.loads(session.rewrite_incoming(b'{"jsonrpc":"2.0","id":0,"result":{}}'))["id"] == 1
+
+
+async def test_requests_beyond_the_queue_bound_are_answered_by_the_proxy() -> None:
+    session = PassthroughSession("s1", Process(), max_inflight=1, max_queued=1)
+    for request_id in range(1, 4):
+        await session.send(_request(request_id))
+        await _settle()
+    reply = json.loads(session.outbox.get_nowait())
+    assert reply["id"] == 3
+    assert reply["error"]["code"] == RETRY_LATER
+    assert reply["error"]["data"]["scope"] == "session"
+    await _settle()
+    assert [frame["id"] for frame in session.process.stdin.frames] == [0]
+    session.close()
+
+
+def _gated(share: FairShare, limits: RateLimits, user: str = "u1") -> PassthroughSession:
+    return PassthroughSession(
+        f"s-{user}", Process(), connector="stub", gate=share.gate("stub", user, limits)
+    )
+
+
+async def test_requests_over_the_rate_limit_are_answered_by_the_proxy() -> None:
+    session = _gated(FairShare(), RateLimits(user_requests=Rate(1.0, 1.0)))
+    await session.send(_request(1))
+    await session.send(_request(2))
+    await _settle()
+    assert [frame["id"] for frame in session.process.stdin.frames] == [0]
+    reply = json.loads(session.outbox.get_nowait())
+    assert reply["id"] == 2
+    assert reply["error"]["code"] == RETRY_LATER
+    assert reply["error"]["data"]["scope"] == "user"
+
+
+async def test_listings_skip_the_rate_limit() -> None:
+    session = _gated(FairShare(), RateLimits(user_requests=Rate(1.0, 1.0)))
+    for request_id in range(3):
+        await session.send(_request(request_id, "tools/list"))
+    assert len(session.process.stdin.frames) == 3
+
+
+async def test_fair_queue_timeout_is_answered_with_retry_later() -> None:
+    share = FairShare()
+    limits = RateLimits(concurrency=1, queue_timeout=0.01)
+    first, second = _gated(share, limits, "u1"), _gated(share, limits, "u2")
+    await first.send(_request(1))
+    await second.send(_request(1))
+    reply = json.loads(await asyncio.wait_for(second.outbox.get(), 1.0))
+    assert reply["error"]["data"]["scope"] == "queue"
+    assert second.process.stdin.frames == []
+    first.close()
+    assert share.stats()["queues"]["stub"]["active"] == 0
@@ -0,0 +1,136 @@
+import base64
+import os
+
+import pytest
+from mcp import types
+
+import payloads
+from payloads import PayloadGuard, PayloadRejected, payload_size
+
+pytestmark = pytest.mark.anyio
+
+
+class Session:
+    """Stands in for a ``ServerSession``; the guard only uses it as a key."""
+
+
+def _text(text: str) -> types.CallToolResult:
+    return types.CallToolResult(content=[types.TextContent(type="text", text=text)])
+
+
+def test_payload_size_counts_utf8_bytes() -> None:
+    assert payload_size(_text("abc")) == 3
+    assert payload_size(_text("é" * 10)) == 20
+    blob = types.BlobResourceContents(uri="file:///a", blob="QUJD")
+    assert payload_size(types.ReadResourceResult(contents=[blob])) == 4
+
+
+async def test_reservation_is_held_until_released() -> None:
+    guard = PayloadGuard(max_bytes=100)
+    session = Session()
+    await guard.process(_text("x" * 60), session, 1)
+    assert guard.in_use == 60
+    with pytest.raises(PayloadRejected):
+        await guard.process(_text("x" * 60), session, 2)
+    guard.release(session, 1)
+    assert guard.in_use == 0
+    await guard.process(_text("x" * 60), session, 3)
+    assert guard.in_use == 60
+
+
+async def test_session_budget_is_separate_from_the_global_one() -> None:
+    guard = PayloadGuard(max_bytes=1000, max_session_bytes=50)
+    first, second = Session(), Session()
+    await guard.process(_text("x" * 40), first, 1)
+    with pytest.raises(PayloadRejected):
+        await guard.process(_text("x" * 40), first, 2)
+    await guard.process(_text("x" * 40), second, 1)
+    assert guard.in_use == 80
+    assert guard.stats()["rejected"] == 1
+
+
+async def test_release_only_frees_its_own_request_once() -> None:
+    guard = PayloadGuard(max_bytes=100)
+    session = Session()
+    await guard.process(_text("x" * 30), session, 1)
+    await guard.process(_text("x" * 20), session, 2)
+    guard.release(session, 1)
+    guard.release(session, 1)
+    guard.release(Session(), 2)
+    assert guard.in_use == 20
+
+
+async def test_without_request_id_the_reservation_ends_with_the_call() -> None:
+    guard = PayloadGuard(max_bytes=100)
+    await guard.process(_text("x" * 60), Session())
+    assert guard.in_use == 0
+    assert guard.peak == 60
+
+
+async def test_failed_spool_releases_the_reservation(monkeypatch, tmp_path) -> None:
+    guard = PayloadGuard(directory=str(tmp_path), max_bytes=100)
+
+    async def _fail(result, threshold):  # noqa: ANN001, ANN202
+        raise OSError("disk full")
+
+    monkeypatch.setattr(guard, "_spool", _fail)
+    with pytest.raises(OSError):
+        await guard.process(_text("x" * 50), Session(), 1, threshold=10)
+    assert guard.in_use == 0
+
+
+async def test_spooled_base64_with_line_breaks_decodes_intact(monkeypatch, tmp_path) -> None:
+    # Small chunks so the data spans many slices.
+    monkeypatch.setattr(payloads, "CHUNK_SIZE", 16)
+    raw = os.urandom(1000)
+    data = base64.encodebytes(raw).decode()
+    assert "\n" in data
+    guard = PayloadGuard(directory=str(tmp_path), max_bytes=10_000)
+    session = Session()
+    image = types.ImageContent(type="image", data=data, mimeType="image/png")
+    result = await guard.process(
+        types.CallToolResult(content=[image]), session, 1, threshold=100
+    )
+    link = result.content[0].resource
+    assert link.mimeType == "text/uri-list"
+    path, mime_type = guard.file(link.text.removeprefix(guard.url_prefix))
+    assert mime_type == "image/png"
+    with open(path, "rb") as file:
+        assert file.read() == raw
+    # Only the link is held until the handler releases it.
+    assert guard.in_use == len(link.text)
+    guard.release(session, 1)
+    assert guard.in_use == 0
+    await guard.close()
+
+
+async def test_spooled_text_keeps_multibyte_characters(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr(payloads, "CHUNK_SIZE", 7)
+    text = "naïve café " * 20
+    guard = PayloadGuard(directory=str(tmp_path))
+    result = await guard.process(_text(text), Session(), threshold=50)
+    path, _ = guard.file(result.content[0].resource.text.removeprefix(guard.url_prefix))
+    with open(path, "rb") as file:
+        assert file.read().decode() == text
+    await guard.close()
+
+
+async def test_nothing_is_spooled_without_a_threshold(tmp_path) -> None:
+    guard = PayloadGuard(threshold=10, directory=str(tmp_path))
+    result = await guard.process(_text("x" * 50), Session())
+    assert result.content[0].text == "x" * 50
+    assert guard.stats()["spooled"] == 0
+
+
+def test_connectors_opt_into_spooling() -> None:
+    guard = PayloadGuard(threshold=1000)
+    assert guard.threshold_for(None) == 0
+    assert guard.threshold_for(False) == 0
+    assert guard.threshold_for(True) == 1000
+    assert guard.threshold_for(200) == 200
+
+
+def test_frame_limit_follows_the_smallest_budget() -> None:
+    assert PayloadGuard().frame_limit == 0
+    assert PayloadGuard(max_bytes=500).frame_limit == 500
+    assert PayloadGuard(max_bytes=500, max_session_bytes=100).frame_limit == 100
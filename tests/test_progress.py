@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from progress import ProgressThrottle
+
+pytestmark = pytest.mark.anyio
+
+
+class Sink:
+    def __init__(self, fail: bool = False) -> None:
+        self.sent: list[tuple] = []
+        self.fail = fail
+
+    async def __call__(self, progress, total, message=None) -> None:  # noqa: ANN001
+        if self.fail:
+            raise ConnectionError("client went away")
+        self.sent.append((progress, total, message))
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_updates_within_an_interval_collapse_to_the_latest() -> None:
+    sink = Sink()
+    throttle = ProgressThrottle(sink, interval=60)
+    await throttle(1, 10)
+    await _settle()
+    for step in range(2, 6):
+        await throttle(step, 10)
+    assert sink.sent == [(1, 10, None)]
+    await throttle.close()
+    assert sink.sent == [(1, 10, None), (5, 10, None)]
+    assert (throttle.forwarded, throttle.dropped) == (2, 3)
+    assert throttle.idle
+
+
+async def test_updates_are_spaced_by_the_interval() -> None:
+    sink = Sink()
+    throttle = ProgressThrottle(sink, interval=0.05)
+    await throttle(1, None)
+    await _settle()
+    await throttle(2, None)
+    await _settle()
+    assert len(sink.sent) == 1
+    await asyncio.sleep(0.1)
+    assert [update[0] for update in sink.sent] == [1, 2]
+    assert throttle.idle
+
+
+async def test_a_failed_send_leaves_the_throttle_idle() -> None:
+    throttle = ProgressThrottle(Sink(fail=True), interval=60)
+    await throttle(1, None)
+    await _settle()
+    assert throttle.failed
+    assert throttle.idle
+    await throttle(2, None)
+    assert throttle.idle
+    assert throttle.dropped == 1
+    await throttle.close()
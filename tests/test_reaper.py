@@ -0,0 +1,120 @@
+import asyncio
+import itertools
+
+import pytest
+
+from reaper import ProcessReaper, _Reaping
+
+_pids = itertools.count(1000)
+
+
+class Process:
+    """Exits on SIGTERM unless ``stubborn``; always exits on SIGKILL unless ``stuck``."""
+
+    def __init__(self, stubborn: bool = False, stuck: bool = False) -> None:
+        self.pid = next(_pids)
+        self.returncode: int | None = None
+        self.stubborn = stubborn
+        self.stuck = stuck
+        self.signals: list[str] = []
+
+    def terminate(self) -> None:
+        self.signals.append("term")
+        if not self.stubborn:
+            self.returncode = -15
+
+    def kill(self) -> None:
+        self.signals.append("kill")
+        if not self.stuck:
+            self.returncode = -9
+
+
+def _queue(reaper: ProcessReaper, process: Process, exited: list | None = None) -> None:
+    """Queue ``process`` without starting the reaper task, to drive ticks by hand."""
+    on_exit = (lambda: exited.append(process.pid)) if exited is not None else None
+    reaper._queue.append(_Reaping(process, "stub", on_exit))
+
+
+def test_terminated_processes_are_finished_on_the_next_tick(clock) -> None:
+    reaper = ProcessReaper()
+    exited = []
+    process = Process()
+    _queue(reaper, process, exited)
+    reaper._tick()
+    reaper._tick()
+    assert process.signals == ["term"]
+    assert exited == [process.pid]
+    assert reaper.stats()["reaped"] == 1
+
+
+def test_stubborn_processes_are_killed_after_the_grace_period(clock) -> None:
+    reaper = ProcessReaper(grace=5.0)
+    process = Process(stubborn=True)
+    _queue(reaper, process)
+    reaper._tick()
+    clock.advance(4.9)
+    reaper._tick()
+    assert process.signals == ["term"]
+    clock.advance(0.2)
+    reaper._tick()
+    reaper._tick()
+    assert process.signals == ["term", "kill"]
+    assert reaper.stats()["killed"] == 1
+    assert reaper.stats()["terminating"] == 0
+
+
+def test_processes_surviving_the_kill_are_counted_as_zombies(clock) -> None:
+    reaper = ProcessReaper(grace=1.0, zombie_after=2.0)
+    process = Process(stubborn=True, stuck=True)
+    _queue(reaper, process)
+    reaper._tick()
+    clock.advance(1.0)
+    reaper._tick()
+    clock.advance(2.0)
+    reaper._tick()
+    assert reaper.stats()["zombies"] == [process.pid]
+    process.returncode = -9
+    reaper._tick()
+    assert reaper.stats()["zombies"] == []
+
+
+def test_batches_bound_the_processes_signalled_per_tick(clock) -> None:
+    reaper = ProcessReaper(batch_size=2)
+    processes = [Process(stubborn=True) for _ in range(3)]
+    for process in processes:
+        _queue(reaper, process)
+    reaper._tick()
+    assert [len(process.signals) for process in processes] == [1, 1, 0]
+
+
+@pytest.mark.anyio
+async def test_reap_returns_at_once_and_runs_on_exit_later() -> None:
+    reaper = ProcessReaper(interval=0.001)
+    exited = asyncio.Event()
+    process = Process()
+    reaper.track(process)
+    reaper.reap(process, "stub", exited.set)
+    assert reaper.stats()["tracked"] == 0
+    await asyncio.wait_for(exited.wait(), 1.0)
+    await reaper.close()
+
+
+@pytest.mark.anyio
+async def test_already_exited_processes_finish_immediately() -> None:
+    reaper = ProcessReaper()
+    exited = []
+    process = Process()
+    process.returncode = 0
+    reaper.reap(process, "stub", lambda: exited.append(True))
+    assert exited == [True]
+    assert process.signals == []
+
+
+@pytest.mark.anyio
+async def test_close_reaps_processes_that_were_never_handed_over() -> None:
+    reaper = ProcessReaper(interval=0.001)
+    process = Process()
+    reaper.track(process)
+    await reaper.close()
+    assert process.signals == ["term"]
+    assert reaper.stats()["reaped"] == 1
@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+import pytest
+from mcp import types
+
+from resource_cache import ResourceCache
+
+pytestmark = pytest.mark.anyio
+
+URI = "file:///a"
+
+
+class RemoteApp:
+    def __init__(self) -> None:
+        self.subscribed: list[str] = []
+        self.unsubscribed: list[str] = []
+        self.reads = 0
+
+    async def subscribe_resource(self, uri: str) -> None:
+        self.subscribed.append(uri)
+
+    async def unsubscribe_resource(self, uri: str) -> None:
+        self.unsubscribed.append(uri)
+
+    async def read(self) -> types.ReadResourceResult:
+        self.reads += 1
+        return types.ReadResourceResult(
+            contents=[types.TextResourceContents(uri=URI, text=f"v{self.reads}")]
+        )
+
+
+class Downstream:
+    def __init__(self) -> None:
+        self.updated: list[str] = []
+
+    async def send_resource_updated(self, uri: str) -> None:
+        self.updated.append(str(uri))
+
+
+def _updated(uri: str) -> types.ServerNotification:
+    return types.ServerNotification(
+        types.ResourceUpdatedNotification(
+            method="notifications/resources/updated",
+            params=types.ResourceUpdatedNotificationParams(uri=uri),
+        )
+    )
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_reads_are_cached_while_subscribed_and_dropped_on_update() -> None:
+    cache = ResourceCache()
+    remote = RemoteApp()
+    assert cache.get(URI) is None
+    await cache.load(URI, remote, remote.read)
+    assert remote.subscribed == [URI]
+    assert cache.get(URI).contents[0].text == "v1"
+
+    await cache.handle_notification(_updated(URI))
+    assert cache.get(URI) is None
+    await cache.load(URI, remote, remote.read)
+    # The upstream subscription is reused.
+    assert remote.subscribed == [URI]
+    assert cache.get(URI).contents[0].text == "v2"
+
+
+async def test_a_read_overtaken_by_an_update_is_not_cached() -> None:
+    cache = ResourceCache()
+    remote = RemoteApp()
+
+    async def _read() -> types.ReadResourceResult:
+        await cache.handle_notification(_updated(URI))
+        return await remote.read()
+
+    await cache.load(URI, remote, _read)
+    assert cache.get(URI) is None
+
+
+async def test_subscribers_share_one_upstream_subscription() -> None:
+    cache = ResourceCache()
+    first, second = RemoteApp(), RemoteApp()
+    first_out, second_out = Downstream(), Downstream()
+    await cache.subscribe(URI, first, first_out)
+    await cache.subscribe(URI, second, second_out)
+    assert first.subscribed == [URI]
+    assert second.subscribed == []
+
+    await cache.handle_notification(_updated(URI))
+    await _settle()
+    assert first_out.updated == [URI]
+    assert second_out.updated == [URI]
+    assert cache.stats()["subscribers"] == 2
+
+
+async def test_the_subscription_moves_when_its_holder_goes_away() -> None:
+    cache = ResourceCache()
+    first, second = RemoteApp(), RemoteApp()
+    await cache.subscribe(URI, first, Downstream())
+    await cache.subscribe(URI, second, Downstream())
+    cache.detach(first)
+    await _settle()
+    assert second.subscribed == [URI]
+
+
+async def test_expired_entries_give_up_their_subscription(monkeypatch) -> None:
+    cache = ResourceCache(ttl=10)
+    remote = RemoteApp()
+    await cache.load(URI, remote, remote.read)
+    monotonic = time.monotonic
+    monkeypatch.setattr("time.monotonic", lambda: monotonic() + 60)
+    assert cache.get(URI) is None
+    await _settle()
+    assert remote.unsubscribed == [URI]
+    assert cache.stats()["subscriptions"] == 0
@@ -0,0 +1,96 @@
+from mcp import types
+
+from result_cache import CachePolicy, ResultCache, ToolResultCache
+
+
+def _result(text: str, is_error: bool = False) -> types.CallToolResult:
+    return types.CallToolResult(
+        content=[types.TextContent(type="text", text=text)], isError=is_error
+    )
+
+
+def _tool(name: str, read_only: bool) -> types.Tool:
+    return types.Tool(
+        name=name,
+        inputSchema={"type": "object"},
+        annotations=types.ToolAnnotations(readOnlyHint=read_only),
+    )
+
+
+def test_policy_is_off_unless_configured() -> None:
+    assert CachePolicy.from_config(None, default_ttl=60) is None
+    assert CachePolicy.from_config({"enabled": False, "tools": ["a"]}, default_ttl=60) is None
+
+
+def test_policy_ttls_per_tool_and_read_only_hint() -> None:
+    policy = CachePolicy.from_config(
+        {"tools": {"search": 5, "lookup": True, "write": False}, "read_only": True, "ttl": 30},
+        default_ttl=60,
+    )
+    assert policy.ttl_for(None, "search") == 5.0
+    assert policy.ttl_for(None, "lookup") == 30.0
+    assert policy.ttl_for(None, "write") is None
+    assert policy.ttl_for(_tool("get", read_only=True), "get") == 30.0
+    assert policy.ttl_for(_tool("put", read_only=False), "put") is None
+
+
+def test_keys_cover_connector_launch_and_canonical_arguments() -> None:
+    policy = CachePolicy(ttl=1)
+    first = ToolResultCache(ResultCache(), "c", "launch-1", policy)
+    second = ToolResultCache(ResultCache(), "c", "launch-2", policy)
+    assert first.key("t", {"a": 1, "b": 2}) == first.key("t", {"b": 2, "a": 1})
+    assert first.key("t", {}) != second.key("t", {})
+
+
+def test_entries_expire(clock) -> None:
+    cache = ResultCache()
+    cache.put(("c", "k"), _result("x"), ttl=10)
+    clock.advance(5)
+    assert cache.get(("c", "k")) is not None
+    clock.advance(6)
+    assert cache.get(("c", "k")) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_errors_and_zero_ttl_are_not_cached() -> None:
+    cache = ResultCache()
+    cache.put(("c", "a"), _result("x", is_error=True), ttl=10)
+    cache.put(("c", "b"), _result("x"), ttl=0)
+    assert cache.stats()["entries"] == 0
+
+
+def test_results_are_copied_in_and_out() -> None:
+    cache = ResultCache()
+    stored = _result("original")
+    cache.put(("c", "k"), stored, ttl=10)
+    stored.content[0].text = "changed by the caller"
+    served = cache.get(("c", "k"))
+    assert served.content[0].text == "original"
+    served.content[0].text = "spooled"
+    assert cache.get(("c", "k")).content[0].text == "original"
+
+
+def test_bounded_by_bytes_and_entries_in_lru_order() -> None:
+    size = len(_result("x").model_dump_json(by_alias=True, exclude_none=True))
+    cache = ResultCache(max_entries=10, max_bytes=2 * size)
+    cache.put(("c", 1), _result("x"), ttl=10)
+    cache.put(("c", 2), _result("y"), ttl=10)
+    assert cache.get(("c", 1)) is not None
+    cache.put(("c", 3), _result("z"), ttl=10)
+    assert cache.get(("c", 2)) is None
+    assert cache.get(("c", 1)) is not None
+    assert cache.stats()["evictions"] == 1
+
+    cache = ResultCache(max_entries=1)
+    cache.put(("c", 1), _result("x"), ttl=10)
+    cache.put(("c", 2), _result("y"), ttl=10)
+    assert cache.stats()["entries"] == 1
+
+
+def test_invalidate_connector_only_drops_its_entries() -> None:
+    cache = ResultCache()
+    cache.put(("a", 1), _result("x"), ttl=10)
+    cache.put(("b", 1), _result("x"), ttl=10)
+    cache.invalidate_connector("a")
+    assert cache.get(("a", 1)) is None
+    assert cache.get(("b", 1)) is not None
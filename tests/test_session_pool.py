@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+from mcp.client.stdio import StdioServerParameters
+
+import session_pool
+from session_pool import SessionPool
+
+pytestmark = pytest.mark.anyio
+
+PARAMS = StdioServerParameters(command="stub", args=["--x"])
+
+
+class Upstream:
+    """Stands in for ``UpstreamSession``; records every start."""
+
+    started: list["Upstream"] = []
+
+    def __init__(self, params: StdioServerParameters, slot: object = None, *args: object) -> None:
+        self.params = params
+        self.slot = slot
+        self.alive = True
+        self.closed = False
+
+    async def start(self) -> "Upstream":
+        Upstream.started.append(self)
+        return self
+
+    async def close(self) -> None:
+        self.alive = False
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def upstreams(monkeypatch: pytest.MonkeyPatch) -> list[Upstream]:
+    Upstream.started = []
+    monkeypatch.setattr(session_pool, "UpstreamSession", Upstream)
+    return Upstream.started
+
+
+async def _settle() -> None:
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+async def test_first_acquire_spawns_one_cold_session_and_warms_min_size(upstreams) -> None:
+    pool = SessionPool(min_size=1, max_size=4)
+    cold = await pool.acquire(PARAMS, "stub")
+    await _settle()
+    assert len(upstreams) == 2
+    assert pool.stats()["idle"] == 1
+    assert cold is upstreams[0]
+    await pool.close()
+
+
+async def test_warm_hit_hands_out_the_idle_session_and_refills(upstreams) -> None:
+    pool = SessionPool(min_size=1, max_size=4)
+    await pool.acquire(PARAMS, "stub")
+    await _settle()
+    warm = upstreams[1]
+    assert await pool.acquire(PARAMS, "stub") is warm
+    await _settle()
+    assert len(upstreams) == 3
+    assert pool.stats()["idle"] == 1
+    await pool.close()
+
+
+async def test_miss_after_the_warm_set_ran_dry_grows_the_target(upstreams) -> None:
+    pool = SessionPool(min_size=1, max_size=4)
+    await pool.acquire(PARAMS, "stub")
+    await _settle()
+    # Take the warm session, then miss before the refill has run.
+    await pool.acquire(PARAMS, "stub")
+    await pool.acquire(PARAMS, "stub")
+    await _settle()
+    assert pool.stats()["idle"] == 2
+    await pool.close()
+
+
+async def test_dead_idle_sessions_are_closed_and_skipped(upstreams) -> None:
+    pool = SessionPool(min_size=1, max_size=1)
+    await pool.acquire(PARAMS, "stub")
+    await _settle()
+    dead = upstreams[1]
+    dead.alive = False
+    fresh = await pool.acquire(PARAMS, "stub")
+    assert fresh is not dead
+    assert dead.closed
+    await pool.close()
+
+
+async def test_refill_only_uses_spare_admission_capacity(upstreams) -> None:
+    class Admission:
+        def __init__(self) -> None:
+            self.spare = 0
+
+        async def acquire(self, connector: str) -> str:
+            return "slot"
+
+        def try_acquire(self, connector: str) -> str | None:
+            if not self.spare:
+                return None
+            self.spare -= 1
+            return "spare"
+
+    admission = Admission()
+    pool = SessionPool(min_size=2, max_size=4, admission=admission)
+    await pool.acquire(PARAMS, "stub")
+    await _settle()
+    assert [upstream.slot for upstream in upstreams] == ["slot"]
+    admission.spare = 1
+    await pool.acquire(PARAMS, "stub")
+    await _settle()
+    assert [upstream.slot for upstream in upstreams] == ["slot", "slot", "spare"]
+    await pool.close()
+
+
+async def test_close_drains_idle_sessions(upstreams) -> None:
+    pool = SessionPool(min_size=2, max_size=4)
+    await pool.acquire(PARAMS, "stub")
+    await _settle()
+    await pool.close()
+    assert all(upstream.closed for upstream in upstreams[1:])
+    assert pool.stats() == {"buckets": 0, "idle": 0, "spawning": 0}
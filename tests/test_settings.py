@@ -0,0 +1,49 @@
+import dataclasses
+
+import pytest
+
+from settings import Settings
+
+
+def test_defaults_apply_when_the_environment_is_empty() -> None:
+    settings = Settings.from_env({})
+    assert settings == Settings()
+    assert settings.lazy_spawn is True
+    assert settings.spawn_burst is None
+    assert settings.container_clis == ("docker", "podman")
+
+
+def test_values_are_parsed_by_field_type() -> None:
+    settings = Settings.from_env(
+        {
+            "MCP_POOL_MAX_SIZE": "8",
+            "MCP_POOL_IDLE_TTL": "30",
+            "MCP_SPAWN_BURST": "2.5",
+            "MCP_PASSTHROUGH": "Yes",
+            "MCP_LAZY_SPAWN": "0",
+            "MCP_CONTAINER_CLIS": "podman,nerdctl",
+            "MCP_LAUNCHER": "container",
+        }
+    )
+    assert settings.pool_max_size == 8
+    assert settings.pool_idle_ttl == 30.0
+    assert settings.spawn_burst == 2.5
+    assert settings.passthrough is True
+    assert settings.lazy_spawn is False
+    assert settings.container_clis == ("podman", "nerdctl")
+    assert settings.launcher == "container"
+
+
+def test_empty_values_keep_the_default() -> None:
+    assert Settings.from_env({"MCP_POOL_MIN_SIZE": ""}).pool_min_size == 1
+
+
+def test_malformed_values_fail_at_startup() -> None:
+    with pytest.raises(ValueError):
+        Settings.from_env({"MCP_WORKERS": "many"})
+
+
+def test_every_field_names_a_distinct_variable() -> None:
+    names = [field.metadata["env"] for field in dataclasses.fields(Settings)]
+    assert len(names) == len(set(names))
+    assert all(name.startswith("MCP_") for name in names)
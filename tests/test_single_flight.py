@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight, flight_key
+
+pytestmark = pytest.mark.anyio
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class Loader:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> dict:
+        self.calls += 1
+        await self.release.wait()
+        return {"call": self.calls}
+
+
+def test_flight_key_ignores_param_order() -> None:
+    assert flight_key("tools/call", {"a": 1, "b": 2}) == flight_key("tools/call", {"b": 2, "a": 1})
+    assert flight_key("tools/call", {"a": 1}) != flight_key("resources/read", {"a": 1})
+
+
+async def test_concurrent_callers_share_one_call_and_get_copies() -> None:
+    flight, loader = SingleFlight(), Loader()
+    calls = [asyncio.create_task(flight.run("k", loader)) for _ in range(3)]
+    await _settle()
+    loader.release.set()
+    results = await asyncio.gather(*calls)
+    assert loader.calls == 1
+    assert results[0] == results[1] == results[2] == {"call": 1}
+    assert results[1] is not results[0]
+    assert flight.stats() == {"inflight": 0, "calls": 1, "shared": 2}
+
+
+async def test_errors_reach_every_caller() -> None:
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def failing() -> None:
+        await release.wait()
+        raise ConnectionError("upstream gone")
+
+    calls = [asyncio.create_task(flight.run("k", failing)) for _ in range(2)]
+    await _settle()
+    release.set()
+    outcomes = await asyncio.gather(*calls, return_exceptions=True)
+    assert all(isinstance(outcome, ConnectionError) for outcome in outcomes)
+    assert not flight.inflight("k")
+
+
+async def test_a_waiter_takes_over_when_the_leader_is_cancelled() -> None:
+    flight, loader = SingleFlight(), Loader()
+    leader = asyncio.create_task(flight.run("k", loader))
+    await _settle()
+    waiter = asyncio.create_task(flight.run("k", loader))
+    await _settle()
+    leader.cancel()
+    await _settle()
+    loader.release.set()
+    assert await waiter == {"call": 2}
+    assert leader.cancelled()
+
+
+async def test_a_cancelled_waiter_does_not_take_over() -> None:
+    flight, loader = SingleFlight(), Loader()
+    leader = asyncio.create_task(flight.run("k", loader))
+    await _settle()
+    waiter = asyncio.create_task(flight.run("k", loader))
+    await _settle()
+    # Both go at once, e.g. when their sessions share a task group.
+    leader.cancel()
+    waiter.cancel()
+    await _settle()
+    assert waiter.cancelled()
+    assert loader.calls == 1
+    assert not flight.inflight("k")
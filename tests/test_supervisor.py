@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from supervisor import ConnectionSupervisor
+
+pytestmark = pytest.mark.anyio
+
+
+class Receive:
+    def __init__(self) -> None:
+        self.messages: asyncio.Queue = asyncio.Queue()
+
+    async def __call__(self) -> dict:
+        return await self.messages.get()
+
+
+async def test_disconnect_cancels_the_bound_task() -> None:
+    supervisor = ConnectionSupervisor()
+    receive = Receive()
+    wrapped, connection = supervisor.attach(receive, "c1")
+    task = asyncio.create_task(asyncio.sleep(60))
+    connection.bind(task)
+
+    receive.messages.put_nowait({"type": "http.request", "body": b""})
+    assert (await wrapped())["type"] == "http.request"
+    assert not task.cancelled()
+
+    receive.messages.put_nowait({"type": "http.disconnect"})
+    assert (await wrapped())["type"] == "http.disconnect"
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert connection.disconnected
+    assert supervisor.stats() == {"connections": 1, "disconnects": 1}
+
+
+async def test_a_task_bound_after_the_disconnect_is_cancelled_at_once() -> None:
+    supervisor = ConnectionSupervisor()
+    receive = Receive()
+    wrapped, connection = supervisor.attach(receive)
+    receive.messages.put_nowait({"type": "http.disconnect"})
+    await wrapped()
+    task = asyncio.create_task(asyncio.sleep(60))
+    connection.bind(task)
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+async def test_repeated_disconnects_are_counted_once_and_close_forgets() -> None:
+    supervisor = ConnectionSupervisor()
+    receive = Receive()
+    wrapped, connection = supervisor.attach(receive)
+    for _ in range(2):
+        receive.messages.put_nowait({"type": "http.disconnect"})
+        await wrapped()
+    assert supervisor.disconnects == 1
+    connection.close()
+    assert supervisor.stats()["connections"] == 0
@@ -0,0 +1,178 @@
+import asyncio
+import sys
+from importlib.metadata import version
+
+import anyio
+import pytest
+from mcp import types
+from mcp.client.stdio import StdioServerParameters
+
+from reaper import ProcessReaper
+from upstream import MCP_SDK_VERSION, ForwardingClientSession, LazyUpstream, reaped_stdio_client
+
+pytestmark = pytest.mark.anyio
+
+
+class Session:
+    def __init__(self) -> None:
+        self.calls: list[tuple] = []
+
+    async def set_logging_level(self, level: str) -> None:
+        self.calls.append(("set_logging_level", level))
+
+    async def send_progress_notification(self, *args: object) -> None:
+        self.calls.append(("progress", *args))
+
+    async def list_tools(self) -> str:
+        self.calls.append(("list_tools",))
+        return "tools"
+
+
+class Upstream:
+    def __init__(self) -> None:
+        self.session = Session()
+        self.closed = False
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class Spawner:
+    """``acquire`` callable that can be held back by the test."""
+
+    def __init__(self) -> None:
+        self.started = 0
+        self.release = asyncio.Event()
+        self.release.set()
+        self.upstream = Upstream()
+
+    async def __call__(self) -> Upstream:
+        self.started += 1
+        await self.release.wait()
+        return self.upstream
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_spawns_on_first_request_and_applies_the_logging_level() -> None:
+    spawner = Spawner()
+    started = []
+    lazy = LazyUpstream(spawner, started.append)
+    await lazy.set_logging_level("debug")
+    await lazy.send_progress_notification("token", 1.0)
+    assert spawner.started == 0
+    assert await lazy.list_tools() == "tools"
+    assert await lazy.list_tools() == "tools"
+    assert spawner.started == 1
+    assert started == [spawner.upstream]
+    assert spawner.upstream.session.calls == [
+        ("set_logging_level", "debug"),
+        ("list_tools",),
+        ("list_tools",),
+    ]
+
+
+async def test_concurrent_requests_share_one_spawn() -> None:
+    spawner = Spawner()
+    spawner.release.clear()
+    lazy = LazyUpstream(spawner)
+    calls = [asyncio.create_task(lazy.list_tools()) for _ in range(3)]
+    await _settle()
+    spawner.release.set()
+    assert await asyncio.gather(*calls) == ["tools"] * 3
+    assert spawner.started == 1
+
+
+async def test_close_during_spawn_leaves_the_requesting_task_alone() -> None:
+    spawner = Spawner()
+    spawner.release.clear()
+    lazy = LazyUpstream(spawner)
+    request = asyncio.create_task(lazy.list_tools())
+    await _settle()
+    await lazy.close()
+    with pytest.raises(RuntimeError):
+        await request
+    assert not request.cancelled()
+    assert not spawner.upstream.closed
+
+
+async def test_close_stops_a_started_upstream() -> None:
+    spawner = Spawner()
+    lazy = LazyUpstream(spawner)
+    await lazy.list_tools()
+    await lazy.close()
+    assert spawner.upstream.closed
+    with pytest.raises(RuntimeError):
+        await lazy.list_tools()
+
+
+def test_installed_sdk_matches_the_stdio_transport() -> None:
+    assert version("mcp").startswith(MCP_SDK_VERSION + ".")
+
+
+async def test_abandoned_requests_are_cancelled_upstream() -> None:
+    to_session, session_reads = anyio.create_memory_object_stream(10)
+    session_writes, from_session = anyio.create_memory_object_stream(10)
+    async with ForwardingClientSession(session_reads, session_writes) as session:
+        call = asyncio.create_task(session.list_tools())
+        request = (await from_session.receive()).message.root
+        assert request.method == "tools/list"
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        cancel = (await from_session.receive()).message.root
+        assert cancel.method == "notifications/cancelled"
+        assert cancel.params["requestId"] == request.id
+    await to_session.aclose()
+    await from_session.aclose()
+
+
+async def test_requests_cancelled_before_they_are_sent_are_not_cancelled_upstream() -> None:
+    to_session, session_reads = anyio.create_memory_object_stream(10)
+    # Nobody reads the session's output, so the request never gets written.
+    session_writes, from_session = anyio.create_memory_object_stream(0)
+    async with ForwardingClientSession(session_reads, session_writes) as session:
+        call = asyncio.create_task(session.list_tools())
+        await _settle()
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        with pytest.raises(anyio.WouldBlock):
+            from_session.receive_nowait()
+    await to_session.aclose()
+    await from_session.aclose()
+
+
+async def _frames(script: str, max_frame_bytes: int) -> list:
+    params = StdioServerParameters(command=sys.executable, args=["-c", script])
+    reaper = ProcessReaper(grace=0.1)
+    received = []
+    try:
+        with anyio.fail_after(10):
+            async with reaped_stdio_client(params, reaper, None, max_frame_bytes) as (read, _):
+                async for message in read:
+                    received.append(message)
+    finally:
+        await reaper.close()
+    return received
+
+
+PING = '{"jsonrpc": "2.0", "id": 1, "method": "ping"}'
+
+
+async def test_messages_within_the_frame_limit_are_delivered() -> None:
+    script = f"import time; print({PING!r}, flush=True); time.sleep(0.2)"
+    received = await _frames(script, 1000)
+    assert [message.message.root.method for message in received] == ["ping"]
+
+
+async def test_an_oversized_message_closes_the_read_side() -> None:
+    script = (
+        f"import sys, time; print({PING!r}, flush=True); "
+        "sys.stdout.write('x' * 100000); sys.stdout.flush(); time.sleep(30)"
+    )
+    received = await _frames(script, 1000)
+    assert len(received) == 1
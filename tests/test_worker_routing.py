@@ -0,0 +1,77 @@
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from worker_routing import FORWARDED_HEADER, WorkerMessageRouter, worker_socket_path
+
+pytestmark = pytest.mark.anyio
+
+
+def _worker(worker_id: int):  # noqa: ANN202
+    """ASGI app answering as worker ``worker_id``."""
+
+    async def _app(scope, receive, send) -> None:  # noqa: ANN001
+        request = Request(scope, receive)
+        response = JSONResponse(
+            {
+                "worker": worker_id,
+                "body": (await request.body()).decode(),
+                "session_id": request.query_params.get("session_id"),
+                "forwarded_by": request.headers.get(FORWARDED_HEADER),
+            },
+            status_code=202,
+        )
+        await response(scope, receive, send)
+
+    return _app
+
+
+def _client(router: WorkerMessageRouter) -> httpx.AsyncClient:
+    app = Starlette(routes=[Route("/messages/{worker_id:int}/", router, methods=["POST"])])
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://proxy")
+
+
+async def test_requests_for_this_worker_are_served_locally(tmp_path) -> None:
+    router = WorkerMessageRouter(_worker(0), 0, 2, str(tmp_path))
+    async with _client(router) as client:
+        response = await client.post("/messages/0/?session_id=s", content="hello")
+    assert response.status_code == 202
+    assert response.json()["worker"] == 0
+
+
+async def test_requests_for_another_worker_are_forwarded(tmp_path) -> None:
+    router = WorkerMessageRouter(_worker(0), 0, 2, str(tmp_path))
+    router._clients[1] = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=_worker(1)), base_url="http://worker"
+    )
+    async with _client(router) as client:
+        response = await client.post("/messages/1/?session_id=s", content="hello")
+    await router.close()
+    assert response.status_code == 202
+    assert response.json() == {
+        "worker": 1,
+        "body": "hello",
+        "session_id": "s",
+        "forwarded_by": "0",
+    }
+
+
+async def test_unknown_workers_and_forwarding_loops_are_not_found(tmp_path) -> None:
+    router = WorkerMessageRouter(_worker(0), 0, 2, str(tmp_path))
+    async with _client(router) as client:
+        unknown = await client.post("/messages/5/?session_id=s")
+        looped = await client.post("/messages/1/?session_id=s", headers={FORWARDED_HEADER: "1"})
+    assert unknown.status_code == 404
+    assert looped.status_code == 404
+
+
+async def test_an_unreachable_worker_is_reported_unavailable(tmp_path) -> None:
+    router = WorkerMessageRouter(_worker(0), 0, 2, str(tmp_path))
+    assert worker_socket_path(str(tmp_path), 1) == str(tmp_path / "mcp-worker-1.sock")
+    async with _client(router) as client:
+        response = await client.post("/messages/1/?session_id=s")
+    await router.close()
+    assert response.status_code == 503
@@ -0,0 +1,412 @@
+"""Own the lifetime of one stdio MCP subprocess and its client session.
+
+anyio requires ``stdio_client`` and ``ClientSession`` to be entered and exited
+from the same task, so every upstream runs inside a dedicated holder task and
+is handed out as an already-initialized session.
+
+With a ``ProcessReaper`` the process is spawned here rather than through
+``stdio_client``, so that leaving the context hands it to the reaper instead
+of waiting for it to exit. ``reaped_stdio_client`` speaks the same line
+protocol as ``mcp.client.stdio`` in mcp 1.9 (``MCP_SDK_VERSION``); check it
+against the SDK's transport when upgrading.
+
+Requests abandoned by the proxy, e.g. because the downstream client
+cancelled them or went away, are cancelled upstream as well.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import sys
+import time
+import typing as t
+
+import anyio
+from anyio.streams.text import TextReceiveStream
+from mcp import types
+from mcp.client.session import ClientSession
+from mcp.client.stdio import StdioServerParameters, get_default_environment, stdio_client
+from mcp.shared.message import SessionMessage
+
+from admission import Slot
+from launchers import Launch, Launchers
+from log.logWrapper import get_logger
+from metrics import ERRORS, INITIALIZE_SECONDS, PROCESS_SPAWN_SECONDS
+from reaper import ProcessReaper
+
+clog = get_logger(__name__)
+
+NotificationListener = t.Callable[[types.ServerNotification], t.Awaitable[None]]
+
+# The mcp release whose stdio transport reaped_stdio_client follows.
+MCP_SDK_VERSION = "1.9"
+
+# Ids of the requests written by the current send_request call.
+_sent_ids: contextvars.ContextVar[list[types.RequestId]] = contextvars.ContextVar("_sent_ids")
+
+
+class _RequestRecorder:
+    """Write stream that notes the id of every request it has handed on."""
+
+    def __init__(self, stream: t.Any) -> None:  # noqa: ANN401
+        self._stream = stream
+
+    async def send(self, message: SessionMessage) -> None:
+        await self._stream.send(message)
+        sent = _sent_ids.get(None)
+        if sent is not None and isinstance(message.message.root, types.JSONRPCRequest):
+            sent.append(message.message.root.id)
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+    async def __aenter__(self) -> "_RequestRecorder":
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info: t.Any) -> t.Any:  # noqa: ANN401
+        return await self._stream.__aexit__(*exc_info)
+
+
+class ForwardingClientSession(ClientSession):
+    """``ClientSession`` that sends ``notifications/cancelled`` for abandoned requests."""
+
+    def __init__(self, read_stream: t.Any, write_stream: t.Any, *args: t.Any, **kwargs: t.Any) -> None:  # noqa: ANN401
+        super().__init__(read_stream, _RequestRecorder(write_stream), *args, **kwargs)
+
+    async def send_request(self, request: t.Any, *args: t.Any, **kwargs: t.Any) -> t.Any:  # noqa: ANN401
+        sent: list[types.RequestId] = []
+        token = _sent_ids.set(sent)
+        try:
+            return await super().send_request(request, *args, **kwargs)
+        except anyio.get_cancelled_exc_class():
+            # Nothing to cancel if the request never reached the server.
+            if sent and not isinstance(request.root, types.InitializeRequest):
+                with anyio.CancelScope(shield=True):
+                    await self._cancel_upstream(sent[0])
+            raise
+        finally:
+            _sent_ids.reset(token)
+
+    async def _cancel_upstream(self, request_id: types.RequestId) -> None:
+        try:
+            await self.send_notification(
+                types.ClientNotification(
+                    types.CancelledNotification(
+                        method="notifications/cancelled",
+                        params=types.CancelledNotificationParams(
+                            requestId=request_id, reason="Cancelled by the client"
+                        ),
+                    )
+                )
+            )
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+            pass
+
+
+@contextlib.asynccontextmanager
+async def reaped_stdio_client(
+    params: StdioServerParameters,
+    reaper: ProcessReaper,
+    on_exit: t.Callable[[], None] | None = None,
+    max_frame_bytes: int = 0,
+) -> t.AsyncIterator[tuple[t.Any, t.Any]]:
+    """``stdio_client`` that leaves process teardown to ``reaper``.
+
+    ``on_exit`` runs once the process has exited, or right away if it could
+    not be spawned. With ``max_frame_bytes``, a message longer than that many
+    characters is not buffered any further: the read side is closed as if
+    the server had exited, which fails the requests still waiting on it.
+    """
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+    streams = (read_stream, write_stream, read_stream_writer, write_stream_reader)
+
+    env = get_default_environment()
+    env.update(params.env or {})
+    try:
+        process = await anyio.open_process(
+            [params.command, *params.args], env=env, stderr=sys.stderr, cwd=params.cwd
+        )
+    except BaseException:
+        for stream in streams:
+            await stream.aclose()
+        if on_exit is not None:
+            on_exit()
+        raise
+    reaper.track(process)
+
+    def _oversized(size: int) -> None:
+        clog.info(
+            f"{params.command} sent a message of over {size} characters, more than the "
+            f"{max_frame_bytes} allowed; closing the session"
+        )
+
+    async def stdout_reader() -> None:
+        try:
+            async with read_stream_writer:
+                # Partial line as a list of chunks: re-joining a growing
+                # string per chunk is quadratic for multi-megabyte results.
+                pending: list[str] = []
+                pending_size = 0
+                async for chunk in TextReceiveStream(
+                    process.stdout,
+                    encoding=params.encoding,
+                    errors=params.encoding_error_handler,
+                ):
+                    if "\n" not in chunk:
+                        pending.append(chunk)
+                        pending_size += len(chunk)
+                        if max_frame_bytes and pending_size > max_frame_bytes:
+                            _oversized(pending_size)
+                            return
+                        continue
+                    lines = chunk.split("\n")
+                    lines[0] = "".join(pending) + lines[0]
+                    tail = lines.pop()
+                    pending = [tail] if tail else []
+                    pending_size = len(tail)
+                    for line in lines:
+                        if max_frame_bytes and len(line) > max_frame_bytes:
+                            _oversized(len(line))
+                            return
+                        try:
+                            message = types.JSONRPCMessage.model_validate_json(line)
+                        except Exception as exc:
+                            await read_stream_writer.send(exc)
+                            continue
+                        await read_stream_writer.send(SessionMessage(message))
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+            await anyio.lowlevel.checkpoint()
+
+    async def stdin_writer() -> None:
+        try:
+            async with write_stream_reader:
+                async for session_message in write_stream_reader:
+                    json = session_message.message.model_dump_json(by_alias=True, exclude_none=True)
+                    await process.stdin.send(
+                        (json + "\n").encode(
+                            encoding=params.encoding,
+                            errors=params.encoding_error_handler,
+                        )
+                    )
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+            await anyio.lowlevel.checkpoint()
+
+    try:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(stdout_reader)
+            tg.start_soon(stdin_writer)
+            try:
+                yield read_stream, write_stream
+            finally:
+                tg.cancel_scope.cancel()
+    finally:
+        for stream in streams:
+            await stream.aclose()
+        reaper.reap(process, params.command, on_exit)
+
+
+class UpstreamSession:
+    """A started and initialized stdio MCP server."""
+
+    def __init__(
+        self,
+        params: StdioServerParameters,
+        slot: Slot | None = None,
+        reaper: ProcessReaper | None = None,
+        connector: str = "",
+        launcher: Launchers | None = None,
+        max_frame_bytes: int = 0,
+    ) -> None:
+        self.params = params
+        self.slot = slot
+        self.reaper = reaper
+        self.connector = connector
+        self.launcher = launcher
+        self.max_frame_bytes = max_frame_bytes
+        self._launch: Launch | None = None
+        self.session: ClientSession | None = None
+        self.initialize_result: types.InitializeResult | None = None
+        self._closing = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._listeners: list[NotificationListener] = []
+
+    @property
+    def alive(self) -> bool:
+        return (
+            self.session is not None
+            and self._task is not None
+            and not self._task.done()
+            and not self._closing.is_set()
+        )
+
+    def add_listener(self, listener: NotificationListener) -> None:
+        """Call ``listener`` for every notification the server sends."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: NotificationListener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    async def _handle_message(self, message: t.Any) -> None:  # noqa: ANN401
+        if not isinstance(message, types.ServerNotification):
+            return
+        for listener in list(self._listeners):
+            try:
+                await listener(message)
+            except Exception as err:
+                clog.info(f"Upstream notification listener failed: {err}")
+
+    async def start(self) -> "UpstreamSession":
+        """Spawn the process and return once ``initialize()`` has completed."""
+        ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run(ready))
+        try:
+            await ready
+        except BaseException:
+            self._task.cancel()
+            raise
+        return self
+
+    async def _run(self, ready: asyncio.Future) -> None:
+        client = None
+        try:
+            if self.launcher is not None:
+                self._launch = await self.launcher.launch(self.params, self.connector)
+            params = self._launch.params if self._launch is not None else self.params
+            backend = self._launch.backend if self._launch is not None else "exec"
+            if self.reaper is not None:
+                client = reaped_stdio_client(
+                    params, self.reaper, self._exited, self.max_frame_bytes
+                )
+            else:
+                client = stdio_client(params)
+            started = time.perf_counter()
+            async with client as streams, ForwardingClientSession(
+                *streams, message_handler=self._handle_message
+            ) as session:
+                PROCESS_SPAWN_SECONDS.observe(
+                    time.perf_counter() - started, connector=self.connector, backend=backend
+                )
+                with INITIALIZE_SECONDS.time(connector=self.connector, backend=backend):
+                    self.initialize_result = await session.initialize()
+                self.session = session
+                ready.set_result(None)
+                await self._closing.wait()
+        except Exception as err:
+            if not ready.done():
+                ERRORS.inc(connector=self.connector, stage="spawn")
+                ready.set_exception(err)
+            else:
+                clog.info(f"Upstream session for {self.params.command} exited: {err}")
+        finally:
+            self.session = None
+            if self.reaper is None or client is None:
+                self._exited()
+            if not ready.done():
+                ready.cancel()
+
+    def _exited(self) -> None:
+        # Admission counts live processes, so with a reaper the slot is only
+        # released once the process has really exited.
+        if self.slot is not None:
+            self.slot.release()
+        if self._launch is not None:
+            self._launch.on_exit()
+
+    async def close(self) -> None:
+        """Ask the holder task to tear the process down.
+
+        Returns without waiting for the process to exit; the reaper (or
+        ``stdio_client``) terminates it when the holder task leaves its
+        context.
+        """
+        self._closing.set()
+
+
+class LazyUpstream:
+    """Stand-in for a ``ClientSession`` that spawns the server on first use.
+
+    ``acquire`` is called at most once, when the first request that actually
+    needs the server arrives. Until then, notifications the server would only
+    care about while running are dropped and the logging level is remembered
+    and applied once the session exists.
+    """
+
+    def __init__(
+        self,
+        acquire: t.Callable[[], t.Awaitable[UpstreamSession]],
+        on_start: t.Callable[[UpstreamSession], None] | None = None,
+    ) -> None:
+        self._acquire = acquire
+        self._on_start = on_start
+        self._lock = asyncio.Lock()
+        self._logging_level: types.LoggingLevel | None = None
+        self._starting: asyncio.Task | None = None
+        self._closed = False
+        self.upstream: UpstreamSession | None = None
+
+    @property
+    def started(self) -> bool:
+        return self.upstream is not None
+
+    async def ensure(self) -> ClientSession:
+        async with self._lock:
+            if self._closed:
+                raise RuntimeError("Upstream session is closed")
+            if self.upstream is None:
+                # Spawn in a task of its own, so close() can abandon it
+                # without cancelling the request that triggered it.
+                self._starting = asyncio.create_task(self._acquire())
+                try:
+                    upstream = await self._starting
+                except asyncio.CancelledError:
+                    if self._closed and not asyncio.current_task().cancelling():
+                        raise RuntimeError("Upstream session is closed") from None
+                    raise
+                finally:
+                    self._starting = None
+                if self._on_start is not None:
+                    self._on_start(upstream)
+                self.upstream = upstream
+                if self._logging_level is not None:
+                    await upstream.session.set_logging_level(self._logging_level)
+        return self.upstream.session
+
+    async def set_logging_level(self, level: types.LoggingLevel) -> types.EmptyResult:
+        if self.upstream is None:
+            self._logging_level = level
+            return types.EmptyResult()
+        return await self.upstream.session.set_logging_level(level)
+
+    async def send_progress_notification(self, *args: t.Any, **kwargs: t.Any) -> None:  # noqa: ANN401
+        if self.upstream is not None:
+            await self.upstream.session.send_progress_notification(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> t.Callable[..., t.Awaitable[t.Any]]:
+        async def _forward(*args: t.Any, **kwargs: t.Any) -> t.Any:  # noqa: ANN401
+            session = await self.ensure()
+            return await getattr(session, name)(*args, **kwargs)
+
+        return _forward
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._starting is not None:
+            # A spawn for this session is under way; nobody will use it now.
+            self._starting.cancel()
+        async with self._lock:
+            upstream, self.upstream = self.upstream, None
+        if upstream is not None:
+            await upstream.close()
+
+
+class UpstreamGroup:
+    """The upstreams behind one aggregate session, closed together."""
+
+    def __init__(self, upstreams: list[t.Any]) -> None:
+        self.upstreams = upstreams
+
+    async def close(self) -> None:
+        await asyncio.gather(*(upstream.close() for upstream in self.upstreams))
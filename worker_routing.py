@@ -0,0 +1,185 @@
+"""Run several uvicorn workers per pod while keeping SSE sessions sticky.
+
+SSE session state lives in the worker that holds the stream, but the
+client's follow-up POSTs land on whichever worker the kernel hands the
+connection to. Every worker therefore advertises a message endpoint that
+embeds its index (``/messages/<worker>/?session_id=...``). A worker that
+receives a POST for another index forwards it, unchanged, over that worker's
+Unix socket. Responses are streamed back, so forwarded requests may also be
+long-lived streams (e.g. Streamable HTTP GETs).
+
+All workers accept on one shared TCP socket bound by the parent process and
+each additionally serves on ``<socket_dir>/mcp-worker-<index>.sock``.
+"""
+
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import socket
+import typing as t
+
+import httpx
+import uvicorn
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from log.logWrapper import get_logger
+
+clog = get_logger(__name__)
+
+FORWARDED_HEADER = "x-mcp-forwarded-by"
+
+
+def worker_socket_path(socket_dir: str, worker_id: int) -> str:
+    return os.path.join(socket_dir, f"mcp-worker-{worker_id}.sock")
+
+
+class WorkerMessageRouter:
+    """ASGI app for ``/messages/{worker_id:int}/`` style routes.
+
+    The owning worker is taken from the ``worker_id`` path parameter.
+    """
+
+    def __init__(
+        self,
+        local_app: ASGIApp,
+        worker_id: int,
+        worker_count: int,
+        socket_dir: str,
+    ) -> None:
+        self.local_app = local_app
+        self.worker_id = worker_id
+        self.worker_count = worker_count
+        self.socket_dir = socket_dir
+        self._clients: dict[int, httpx.AsyncClient] = {}
+
+    def _client(self, worker_id: int) -> httpx.AsyncClient:
+        client = self._clients.get(worker_id)
+        if client is None:
+            transport = httpx.AsyncHTTPTransport(
+                uds=worker_socket_path(self.socket_dir, worker_id)
+            )
+            client = httpx.AsyncClient(transport=transport, base_url="http://worker")
+            self._clients[worker_id] = client
+        return client
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        owner = scope.get("path_params", {}).get("worker_id", self.worker_id)
+        if owner == self.worker_id:
+            await self.local_app(scope, receive, send)
+            return
+
+        request = Request(scope, receive)
+        if not 0 <= owner < self.worker_count or FORWARDED_HEADER in request.headers:
+            response = Response("Could not find session", status_code=404)
+            await response(scope, receive, send)
+            return
+
+        headers = {
+            key: value
+            for key, value in request.headers.items()
+            if key not in ("host", "content-length", "connection")
+        }
+        headers[FORWARDED_HEADER] = str(self.worker_id)
+        client = self._client(owner)
+        try:
+            upstream = await client.send(
+                client.build_request(
+                    request.method,
+                    request.url.path,
+                    params=request.query_params,
+                    content=await request.body(),
+                    headers=headers,
+                ),
+                stream=True,
+            )
+            response = StreamingResponse(
+                upstream.aiter_raw(),
+                status_code=upstream.status_code,
+                headers={
+                    key: value
+                    for key, value in upstream.headers.items()
+                    if key not in ("content-length", "transfer-encoding", "connection")
+                },
+                background=BackgroundTask(upstream.aclose),
+            )
+        except httpx.HTTPError as err:
+            clog.info(f"Forwarding message to worker {owner} failed: {err}")
+            response = Response("Session worker unavailable", status_code=503)
+        await response(scope, receive, send)
+
+    async def close(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+
+def _run_worker(
+    app_factory: t.Callable[[int, int], ASGIApp],
+    worker_id: int,
+    worker_count: int,
+    tcp_socket: socket.socket,
+    socket_dir: str,
+) -> None:
+    path = worker_socket_path(socket_dir, worker_id)
+    if os.path.exists(path):
+        os.unlink(path)
+    unix_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    unix_socket.bind(path)
+
+    app = app_factory(worker_id, worker_count)
+    server = uvicorn.Server(uvicorn.Config(app))
+    clog.info(f"Worker {worker_id} serving on shared TCP socket and {path}")
+    server.run(sockets=[tcp_socket, unix_socket])
+
+
+def serve_workers(
+    app_factory: t.Callable[[int, int], ASGIApp],
+    host: str,
+    port: int,
+    worker_count: int,
+    socket_dir: str,
+) -> None:
+    """Fork ``worker_count`` workers sharing one listening socket."""
+    os.makedirs(socket_dir, exist_ok=True)
+    tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    tcp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    tcp_socket.bind((host, port))
+    tcp_socket.set_inheritable(True)
+
+    context = multiprocessing.get_context("fork")
+
+    def _start(worker_id: int) -> multiprocessing.Process:
+        worker = context.Process(
+            target=_run_worker,
+            args=(app_factory, worker_id, worker_count, tcp_socket, socket_dir),
+            name=f"mcp-worker-{worker_id}",
+        )
+        worker.start()
+        return worker
+
+    workers = [_start(worker_id) for worker_id in range(worker_count)]
+    stopping = False
+
+    def _stop(signum: int, _frame: t.Any) -> None:  # noqa: ANN401
+        nonlocal stopping
+        stopping = True
+        for worker in workers:
+            if worker.is_alive():
+                os.kill(worker.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    while not stopping:
+        multiprocessing.connection.wait([worker.sentinel for worker in workers])
+        for worker_id, worker in enumerate(workers):
+            if not stopping and not worker.is_alive():
+                # The index is baked into live session URLs; reuse it.
+                clog.info(f"Worker {worker_id} exited with {worker.exitcode}; restarting")
+                workers[worker_id] = _start(worker_id)
+    for worker in workers:
+        worker.join()
+    tcp_socket.close()